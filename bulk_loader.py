@@ -0,0 +1,276 @@
+import csv
+import gzip
+import json
+import time
+import uuid
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import text
+
+from config import settings
+from database import engine
+from geo_service import geocode
+from models import ContractorCreate
+
+logger = logging.getLogger(__name__)
+
+# Column order of the staging table and of every COPY record
+STAGING_COLUMNS = [
+    "id", "name", "website", "phone", "email", "address", "city", "province", "postal", "country",
+    "bio_text", "services_text", "has_license", "has_insurance",
+    "hourly_rate_min", "hourly_rate_max", "rating", "latitude", "longitude", "match_id",
+]
+
+CREATE_STAGING_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS contractor_staging (
+    id UUID, name TEXT, website TEXT, phone TEXT, email TEXT, address TEXT,
+    city TEXT, province TEXT, postal TEXT, country TEXT,
+    bio_text TEXT, services_text TEXT, has_license BOOLEAN, has_insurance BOOLEAN,
+    hourly_rate_min FLOAT8, hourly_rate_max FLOAT8, rating FLOAT8, latitude FLOAT8, longitude FLOAT8,
+    match_id UUID
+) ON COMMIT DELETE ROWS
+"""
+
+# match_id is pre-set for rows the dedupe index resolved; the rest are
+# matched to existing contractors by website
+MATCH_BY_WEBSITE_SQL = """
+UPDATE contractor_staging s SET match_id = c.id
+FROM contractor c
+WHERE s.match_id IS NULL AND s.website IS NOT NULL AND lower(c.website) = lower(s.website)
+"""
+
+# Matched rows update their contractor in place, but only with the values
+# they have: a sparse or near-duplicate row never clears a field, and
+# license/insurance flags are only ever set, as in ingest_service's merge.
+# The old texts are read in the subquery so only rows whose bio or services
+# actually changed are sent for re-embedding.
+MERGE_UPDATE_SQL = """
+UPDATE contractor c SET
+    name = m.name, phone = COALESCE(m.phone, c.phone), email = COALESCE(m.email, c.email),
+    website = COALESCE(m.website, c.website), address = COALESCE(m.address, c.address),
+    city = COALESCE(m.city, c.city), province = COALESCE(m.province, c.province),
+    postal = COALESCE(m.postal, c.postal), country = COALESCE(m.country, c.country),
+    bio_text = COALESCE(m.bio_text, c.bio_text), services_text = COALESCE(m.services_text, c.services_text),
+    has_license = COALESCE(c.has_license, FALSE) OR COALESCE(m.has_license, FALSE),
+    has_insurance = COALESCE(c.has_insurance, FALSE) OR COALESCE(m.has_insurance, FALSE),
+    hourly_rate_min = COALESCE(m.hourly_rate_min, c.hourly_rate_min),
+    hourly_rate_max = COALESCE(m.hourly_rate_max, c.hourly_rate_max),
+    rating = COALESCE(m.rating, c.rating),
+    latitude = COALESCE(m.latitude, c.latitude), longitude = COALESCE(m.longitude, c.longitude),
+    updated_at = NOW()
+FROM (
+    SELECT s.*, t.id AS target_id,
+           (s.bio_text IS NOT NULL AND s.bio_text IS DISTINCT FROM t.bio_text
+            OR s.services_text IS NOT NULL AND s.services_text IS DISTINCT FROM t.services_text) AS text_changed
+    FROM contractor_staging s
+    JOIN contractor t ON t.id = s.match_id
+) m
+WHERE c.id = m.target_id
+RETURNING c.id, m.text_changed, c.bio_text, c.services_text
+"""
+
+MERGE_INSERT_SQL = """
+INSERT INTO contractor (
+    id, name, website, phone, email, address, city, province, postal, country,
+    bio_text, services_text, has_license, has_insurance,
+    hourly_rate_min, hourly_rate_max, rating, latitude, longitude, created_at, updated_at
+)
+SELECT
+    s.id, s.name, s.website, s.phone, s.email, s.address, s.city, s.province, s.postal, s.country,
+    s.bio_text, s.services_text, s.has_license, s.has_insurance,
+    s.hourly_rate_min, s.hourly_rate_max, s.rating, s.latitude, s.longitude, NOW(), NOW()
+FROM contractor_staging s
+WHERE s.match_id IS NULL
+RETURNING id, bio_text, services_text
+"""
+
+
+def _open(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def _file_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if name.endswith(".csv"):
+        return "csv"
+    raise ValueError(f"Unsupported file type for {path}, expected .csv or .jsonl")
+
+
+def iter_rows(path: str, file_format: Optional[str] = None) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    """Yield ``(line_number, row)`` from a CSV or JSONL file without reading it into memory."""
+    file_format = file_format or _file_format(path)
+    with _open(path) as f:
+        if file_format == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                # Empty CSV cells are missing values, not empty strings
+                yield reader.line_num, {key: value for key, value in row.items() if key and value != ""}
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError:
+                    # Counted as invalid instead of aborting a multi-million row load
+                    yield line_number, None
+
+
+_FLAG_COLUMNS = {STAGING_COLUMNS.index("has_license"), STAGING_COLUMNS.index("has_insurance")}
+
+
+def _combine(first: tuple, later: tuple) -> tuple:
+    """Merge two staged rows like MERGE_UPDATE_SQL: later values win unless missing, flags are OR-ed.
+
+    Keeps the first row's id, which is the one the dedupe index knows.
+    """
+    combined = [
+        (old or new) if column in _FLAG_COLUMNS else (old if new is None else new)
+        for column, (old, new) in enumerate(zip(first, later))
+    ]
+    combined[0] = first[0]
+    return tuple(combined)
+
+
+class BulkLoader:
+    """Load contractors from large CSV/JSONL files.
+
+    Rows are streamed and validated against ContractorCreate, COPYed into a
+    temporary staging table ``batch_size`` rows at a time and merged into
+    ``contractor``: rows that the dedupe index (when given) resolves to an
+    existing contractor, or whose website matches one, fill in its fields;
+    the rest are inserted. New rows, and updated rows whose text changed,
+    are embedded with one batched encode per ``embedding_batch_size`` rows.
+    Memory use is bounded by the batch size, not the file size.
+    """
+
+    def __init__(self, embeddings=None, batch_size: Optional[int] = None, dedupe=None):
+        self.embeddings = embeddings
+        self.dedupe = dedupe
+        self.batch_size = batch_size or settings.bulk_load_batch_size
+        self.stats = self._empty_stats()
+
+    def _empty_stats(self) -> Dict[str, Any]:
+        return {"read": 0, "invalid": 0, "inserted": 0, "updated": 0, "duplicates": 0, "embedded": 0, "errors": []}
+
+    def _record(self, line_number: int, row: Optional[Dict[str, Any]]) -> Optional[tuple]:
+        try:
+            if row is None:
+                raise ValueError("malformed JSON")
+            contractor = ContractorCreate.model_validate(row)
+        except (ValidationError, ValueError) as e:
+            self.stats["invalid"] += 1
+            if len(self.stats["errors"]) < 100:
+                if isinstance(e, ValidationError):
+                    error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+                else:
+                    error = str(e)
+                self.stats["errors"].append({"line": line_number, "error": error})
+            return None
+
+        data = contractor.model_dump()
+        if data["latitude"] is None or data["longitude"] is None:
+            data["latitude"], data["longitude"] = geocode(data["city"], data["postal"]) or (None, None)
+        data["id"] = uuid.uuid4()
+        data["match_id"] = None
+
+        if self.dedupe is not None:
+            match = self.dedupe.find(data)
+            if match is None:
+                self.dedupe.add(data["id"], data)
+            else:
+                # Merged into the matching contractor instead of inserted
+                data["match_id"] = match[0]
+                self.stats["duplicates"] += 1
+        return tuple(data[column] for column in STAGING_COLUMNS)
+
+    async def _merge_batch(self, conn, records: List[tuple]) -> List[Tuple[Any, Optional[str], Optional[str]]]:
+        """COPY one batch into staging and merge it, returning rows that need embedding."""
+        async with conn.begin():
+            # Starts the transaction, so COPY and the merge see the same staging rows
+            await conn.execute(text(CREATE_STAGING_SQL))
+
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                "contractor_staging", records=records, columns=STAGING_COLUMNS
+            )
+
+            await conn.execute(text(MATCH_BY_WEBSITE_SQL))
+            # Inserts first, so duplicates of rows new in this batch merge into them
+            inserted = (await conn.execute(text(MERGE_INSERT_SQL))).fetchall()
+            updated = (await conn.execute(text(MERGE_UPDATE_SQL))).fetchall()
+
+        self.stats["updated"] += len(updated)
+        self.stats["inserted"] += len(inserted)
+        return [tuple(row) for row in inserted] + [(row[0], row[2], row[3]) for row in updated if row[1]]
+
+    async def _embed(self, rows: List[Tuple[Any, Optional[str], Optional[str]]]):
+        if self.embeddings is None:
+            return
+        step = settings.embedding_batch_size
+        for start in range(0, len(rows), step):
+            self.stats["embedded"] += await self.embeddings.update_embeddings_batch(rows[start:start + step])
+
+    def _dedupe(self, records: List[tuple]) -> List[tuple]:
+        # One staged row per target contractor: UPDATE ... FROM applies only
+        # one of several rows joined to the same contractor. Rows resolved by
+        # the dedupe index are keyed by match_id, unresolved ones by
+        # lower(website), which MATCH_BY_WEBSITE_SQL matches on.
+        website = STAGING_COLUMNS.index("website")
+        match_id = STAGING_COLUMNS.index("match_id")
+        collapsed: Dict[tuple, tuple] = {}
+        unkeyed = []
+        for record in records:
+            if record[match_id] is not None:
+                key = ("match_id", record[match_id])
+            elif record[website]:
+                key = ("website", record[website].lower())
+            else:
+                unkeyed.append(record)
+                continue
+            previous = collapsed.get(key)
+            collapsed[key] = record if previous is None else _combine(previous, record)
+        return list(collapsed.values()) + unkeyed
+
+    async def load(self, path: str, file_format: Optional[str] = None) -> Dict[str, Any]:
+        self.stats = self._empty_stats()
+        start = time.perf_counter()
+
+        async def flush(conn, batch):
+            to_embed = await self._merge_batch(conn, self._dedupe(batch))
+            await self._embed(to_embed)
+            elapsed = time.perf_counter() - start
+            logger.info(
+                f"Loaded {self.stats['read']} rows "
+                f"({self.stats['inserted']} inserted, {self.stats['updated']} updated, "
+                f"{self.stats['duplicates']} duplicates, "
+                f"{self.stats['invalid']} invalid) at {self.stats['read'] / elapsed:.0f} rows/s"
+            )
+
+        try:
+            async with engine.connect() as conn:
+                batch: List[tuple] = []
+                for line_number, row in iter_rows(path, file_format):
+                    self.stats["read"] += 1
+                    record = self._record(line_number, row)
+                    if record is not None:
+                        batch.append(record)
+                    if len(batch) >= self.batch_size:
+                        await flush(conn, batch)
+                        batch = []
+                if batch:
+                    await flush(conn, batch)
+        except Exception as e:
+            logger.error(f"Bulk load of {path} failed after {self.stats['read']} rows: {e}")
+            raise
+
+        elapsed = time.perf_counter() - start
+        self.stats["seconds"] = round(elapsed, 2)
+        self.stats["rows_per_second"] = round(self.stats["read"] / elapsed, 1) if elapsed > 0 else 0.0
+        return self.stats
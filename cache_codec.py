@@ -0,0 +1,154 @@
+import struct
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+import json_codec
+from json_codec import EncodedRows
+
+try:
+    import msgpack
+except ImportError:  # falls back to JSON
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # compression is optional
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # compression is optional
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+# First byte of every encoded value: serialization format + compression.
+# All are below 0x20, so values written before the codec existed (plain
+# JSON text) are still recognised and decoded as JSON.
+_HEADERS = {
+    ("msgpack", None): 0x01,
+    ("msgpack", "zstd"): 0x02,
+    ("msgpack", "lz4"): 0x03,
+    ("json", None): 0x04,
+    ("json", "zstd"): 0x05,
+    ("json", "lz4"): 0x06,
+}
+_FORMATS = {header: key for key, header in _HEADERS.items()}
+
+# msgpack extension types: float32 vectors as raw little-endian bytes, and
+# EncodedRows as a uint32 row count followed by the JSON array already
+# encoded for the HTTP response
+_EXT_FLOAT32 = 1
+_EXT_JSON_ROWS = 2
+_ROW_COUNT = struct.Struct("<I")
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, EncodedRows):
+        return msgpack.ExtType(_EXT_JSON_ROWS, _ROW_COUNT.pack(len(value)) + value.json)
+    if isinstance(value, np.ndarray):
+        if msgpack is not None:
+            return msgpack.ExtType(_EXT_FLOAT32, np.ascontiguousarray(value, dtype="<f4").tobytes())
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    # Same fallback the JSON cache always used (default=str)
+    return str(value)
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code == _EXT_FLOAT32:
+        return np.frombuffer(data, dtype="<f4")
+    if code == _EXT_JSON_ROWS:
+        # Parsed only if the rows are needed, not to send them on
+        (count,) = _ROW_COUNT.unpack_from(data)
+        return EncodedRows(encoded=data[_ROW_COUNT.size:], count=count)
+    return msgpack.ExtType(code, data)
+
+
+class CacheCodec:
+    """Serialize cache values to compact bytes.
+
+    msgpack by default (JSON when msgpack is not installed or configured),
+    compressed with zstd or lz4 once the payload reaches ``min_compress_bytes``.
+    numpy vectors round-trip as float32 arrays instead of float lists.
+    """
+
+    def __init__(self, serializer: str = "msgpack", compression: Optional[str] = "zstd", min_compress_bytes: int = 1024, level: int = 3):
+        if serializer == "msgpack" and msgpack is None:
+            logger.warning("msgpack is not installed, caching as JSON")
+            serializer = "json"
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed, cache compression disabled")
+            compression = None
+        if compression == "lz4" and lz4_frame is None:
+            logger.warning("lz4 is not installed, cache compression disabled")
+            compression = None
+
+        self.serializer = serializer
+        self.compression = compression if compression in ("zstd", "lz4") else None
+        self.min_compress_bytes = min_compress_bytes
+        self.level = level
+
+        self._zstd_compressor = zstandard.ZstdCompressor(level=level) if zstandard is not None else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+    def _serialize(self, value: Any) -> bytes:
+        if self.serializer == "msgpack":
+            return msgpack.packb(value, default=_default, use_bin_type=True)
+        return json_codec.dumps(value)
+
+    def _compress(self, data: bytes, compression: str) -> bytes:
+        if compression == "zstd":
+            return self._zstd_compressor.compress(data)
+        return lz4_frame.compress(data)
+
+    def _decompress(self, data: bytes, compression: str) -> bytes:
+        if compression == "zstd":
+            if self._zstd_decompressor is None:
+                raise ValueError("zstd-compressed cache value but zstandard is not installed")
+            return self._zstd_decompressor.decompress(data)
+        if lz4_frame is None:
+            raise ValueError("lz4-compressed cache value but lz4 is not installed")
+        return lz4_frame.decompress(data)
+
+    def encode(self, value: Any) -> bytes:
+        data = self._serialize(value)
+        compression = None
+        if self.compression and len(data) >= self.min_compress_bytes:
+            compressed = self._compress(data, self.compression)
+            # Small or already dense payloads can grow; keep whichever is smaller
+            if len(compressed) < len(data):
+                data, compression = compressed, self.compression
+
+        return bytes([_HEADERS[(self.serializer, compression)]]) + data
+
+    def decode(self, data: bytes) -> Any:
+        if isinstance(data, str):
+            data = data.encode()
+
+        fmt = _FORMATS.get(data[0]) if data else None
+        if fmt is None:
+            return json_codec.loads(data)
+
+        serializer, compression = fmt
+        payload = data[1:]
+        if compression:
+            payload = self._decompress(payload, compression)
+        if serializer == "msgpack":
+            if msgpack is None:
+                raise ValueError("msgpack-encoded cache value but msgpack is not installed")
+            return msgpack.unpackb(payload, raw=False, ext_hook=_ext_hook, strict_map_key=False)
+        return json_codec.loads(payload)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "serializer": self.serializer,
+            "compression": self.compression,
+            "min_compress_bytes": self.min_compress_bytes
+        }
@@ -1,46 +1,233 @@
 import json
+import time
+import uuid
 import asyncio
 import logging
-from typing import Any, Optional, Dict, List
+from typing import Any, Awaitable, Callable, Optional, Dict, List, Tuple
 import redis.asyncio as redis
 from datetime import datetime, timedelta
 import hashlib
 
+import numpy as np
+
+from cache_codec import CacheCodec
+from json_codec import EncodedRows
+from config import settings
+from local_cache import LRUCache
+from metrics import CACHE_REQUESTS, cache_namespace, timed
+from single_flight import SingleFlight
+
 logger = logging.getLogger(__name__)
 
+# Every worker subscribes here to drop L1 entries invalidated elsewhere
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+def _contractor_tag(contractor_id, generation: int) -> str:
+    # Tags live under the search generation of the entries they index, so a
+    # bump leaves the old sets to expire instead of growing them forever
+    return f"tag:contractor:v{generation}:{contractor_id}"
+
+
+def _contractor_ids(value: Any) -> List[str]:
+    if isinstance(value, dict) and isinstance(value.get("contractors"), (list, EncodedRows)):
+        return [str(c["id"]) for c in value["contractors"] if isinstance(c, dict) and c.get("id")]
+    return []
+
+
 class CacheService:
-    def __init__(self, redis_url: str = "redis://localhost:6379"):
-        self.redis_url = redis_url
+    """Redis-backed cache with a small in-process L1 in front of it.
+
+    ``get``/``set`` go through an LRU of decoded values (``CACHE_L1_SIZE``
+    entries, at most ``CACHE_L1_TTL`` seconds old) before Redis, so hot
+    keys skip the round trip and the JSON decode. Values returned from L1
+    are shared between callers and must not be mutated. Invalidations are
+    applied locally and published on ``INVALIDATION_CHANNEL`` so every
+    other worker drops the same entries. ``client`` lets tests inject a
+    fakeredis instance.
+    """
+    
+    def __init__(self, redis_url: Optional[str] = None, client=None):
+        self.redis_url = redis_url or settings.redis_url
         self.redis_client = None
+        self._client = client
         self.default_ttl = 3600  # 1 hour default TTL
+        self.stale_ttl = settings.cache_stale_ttl
+        self.single_flight = SingleFlight()
+        self._refresh_tasks = set()
+        
+        self.codec = CacheCodec(
+            serializer=settings.cache_serializer,
+            compression=settings.cache_compression,
+            min_compress_bytes=settings.cache_compress_min_bytes
+        )
+        self.l1 = LRUCache(maxsize=settings.cache_l1_size, ttl=settings.cache_l1_ttl) if settings.cache_l1_size > 0 else None
+        self._origin = uuid.uuid4().hex
+        self._listener = None
+        self._subscribed = False
+        # Namespace generations known to this worker; kept current by pub/sub
+        self._generations: Dict[str, Tuple[int, float]] = {}
+        self._invalidation_callbacks: List[Callable[[Dict[str, Any]], None]] = []
         
     async def connect(self):
         try:
-            self.redis_client = redis.from_url(self.redis_url)
+            self.redis_client = self._client or redis.from_url(self.redis_url)
             await self.redis_client.ping()
             logger.info("Connected to Redis")
+            self._listener = asyncio.create_task(self._listen())
         except Exception as e:
             logger.error(f"Failed to connect to Redis: {e}")
             self.redis_client = None
     
     async def disconnect(self):
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
         if self.redis_client:
             await self.redis_client.close()
             self.redis_client = None
     
+    def on_invalidation(self, callback: Callable[[Dict[str, Any]], None]):
+        """Register a callback for invalidation messages (local and remote)."""
+        self._invalidation_callbacks.append(callback)
+    
+    async def _listen(self):
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Anything published while we were not subscribed is lost
+                self._clear_local()
+                self._subscribed = True
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    event = json.loads(message["data"])
+                    if event.get("origin") != self._origin:
+                        self._apply_invalidation(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation listener failed: {e}")
+            finally:
+                self._subscribed = False
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(1)
+    
+    def _clear_local(self):
+        if self.l1 is not None:
+            self.l1.clear()
+        self._generations.clear()
+    
+    def _apply_invalidation(self, event: Dict[str, Any]):
+        if event["type"] == "generation":
+            self._generations[event["namespace"]] = (event["value"], time.monotonic())
+        elif event["type"] == "keys" and self.l1 is not None:
+            for key in event["keys"]:
+                self.l1.delete(key)
+        
+        for callback in self._invalidation_callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Cache invalidation callback failed: {e}")
+    
+    async def _invalidate(self, event: Dict[str, Any]):
+        self._apply_invalidation(event)
+        if not self.redis_client:
+            return
+        
+        try:
+            await self.redis_client.publish(INVALIDATION_CHANNEL, json.dumps({**event, "origin": self._origin}))
+        except Exception as e:
+            logger.error(f"Error publishing cache invalidation: {e}")
+    
     def _generate_key(self, prefix: str, *args) -> str:
-        key_parts = [prefix] + [str(arg) for arg in args]
-        key_string = ":".join(key_parts)
-        return hashlib.md5(key_string.encode()).hexdigest()
+        # The prefix stays readable so keys can be told apart (and scanned)
+        # by namespace; only the variable part is hashed
+        key_string = ":".join(str(arg) for arg in args)
+        return f"{prefix}:{hashlib.md5(key_string.encode()).hexdigest()}"
+    
+    async def _generation(self, namespace: str) -> int:
+        if not self.redis_client:
+            return 0
+        
+        # While subscribed, bumps from any worker arrive over pub/sub, so the
+        # local copy is only re-read from Redis after the L1 TTL as a backstop
+        known = self._generations.get(namespace)
+        if self._subscribed and known and time.monotonic() - known[1] < settings.cache_l1_ttl:
+            return known[0]
+        
+        try:
+            value = await self.redis_client.get(f"gen:{namespace}")
+            generation = int(value) if value else 0
+            self._generations[namespace] = (generation, time.monotonic())
+            return generation
+        except Exception as e:
+            logger.error(f"Error reading cache generation: {e}")
+            return 0
+    
+    async def _versioned_key(self, namespace: str, prefix: str, *args) -> str:
+        """Key embedding the namespace generation, so bumping it orphans every
+        existing entry at once; orphans simply expire with their TTL."""
+        generation = await self._generation(namespace)
+        return self._generate_key(f"{prefix}:v{generation}", *args)
+    
+    async def bump_generation(self, namespace: str) -> int:
+        if not self.redis_client:
+            await self._invalidate({"type": "generation", "namespace": namespace, "value": 0})
+            return 0
+        generation = await self.redis_client.incr(f"gen:{namespace}")
+        await self._invalidate({"type": "generation", "namespace": namespace, "value": generation})
+        return generation
+    
+    def _record(self, key: str, tier: str, hit: bool):
+        CACHE_REQUESTS.inc(namespace=cache_namespace(key), tier=tier, result="hit" if hit else "miss")
     
     async def get(self, key: str) -> Optional[Any]:
+        if self.l1 is not None:
+            value = self.l1.get(key)
+            if value is not None:
+                self._record(key, "l1", True)
+                return value
+            self._record(key, "l1", False)
+        
         if not self.redis_client:
             return None
         
         try:
-            value = await self.redis_client.get(key)
+            if self.l1 is None:
+                with timed("cache_get"):
+                    value = await self.redis_client.get(key)
+                    self._record(key, "redis", bool(value))
+                    return self.codec.decode(value) if value else None
+            
+            # Fetch the remaining TTL in the same round trip so the L1 copy
+            # never outlives the Redis entry
+            with timed("cache_get"):
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    pipe.get(key)
+                    pipe.ttl(key)
+                    value, ttl = await pipe.execute()
+            self._record(key, "redis", bool(value))
             if value:
-                return json.loads(value)
+                value = self.codec.decode(value)
+                if ttl > 0:
+                    self.l1.set(key, value, min(ttl, settings.cache_l1_ttl))
+                return value
             return None
         except Exception as e:
             logger.error(f"Error getting from cache: {e}")
@@ -52,66 +239,336 @@ class CacheService:
         
         try:
             ttl = ttl or self.default_ttl
-            serialized_value = json.dumps(value, default=str)
-            await self.redis_client.setex(key, ttl, serialized_value)
+            with timed("cache_set"):
+                await self.redis_client.setex(key, ttl, self.codec.encode(value))
+            if self.l1 is not None:
+                self.l1.set(key, value, min(ttl, settings.cache_l1_ttl))
             return True
         except Exception as e:
             logger.error(f"Error setting cache: {e}")
             return False
     
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """Batched ``get``: L1 first, then one pipelined round trip for the rest."""
+        values: List[Optional[Any]] = [None] * len(keys)
+        missing = []
+        for i, key in enumerate(keys):
+            value = self.l1.get(key) if self.l1 is not None else None
+            if value is not None:
+                values[i] = value
+            else:
+                missing.append(i)
+            if self.l1 is not None:
+                self._record(key, "l1", value is not None)
+        
+        if not missing or not self.redis_client:
+            return values
+        
+        try:
+            with timed("cache_mget"):
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    for i in missing:
+                        pipe.get(keys[i])
+                        pipe.ttl(keys[i])
+                    replies = await pipe.execute()
+            
+            for n, i in enumerate(missing):
+                raw, ttl = replies[2 * n], replies[2 * n + 1]
+                self._record(keys[i], "redis", bool(raw))
+                if not raw:
+                    continue
+                values[i] = self.codec.decode(raw)
+                if self.l1 is not None and ttl > 0:
+                    self.l1.set(keys[i], values[i], min(ttl, settings.cache_l1_ttl))
+            return values
+        except Exception as e:
+            logger.error(f"Error getting multiple keys from cache: {e}")
+            return values
+    
+    async def mset(self, items: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """Batched ``set`` in one pipelined round trip."""
+        if not self.redis_client or not items:
+            return False
+        
+        try:
+            ttl = ttl or self.default_ttl
+            with timed("cache_mset"):
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    for key, value in items.items():
+                        pipe.setex(key, ttl, self.codec.encode(value))
+                    await pipe.execute()
+            if self.l1 is not None:
+                for key, value in items.items():
+                    self.l1.set(key, value, min(ttl, settings.cache_l1_ttl))
+            return True
+        except Exception as e:
+            logger.error(f"Error setting multiple keys in cache: {e}")
+            return False
+    
+    async def get_raw(self, key: str) -> Optional[bytes]:
+        if not self.redis_client:
+            return None
+        
+        try:
+            with timed("cache_get"):
+                value = await self.redis_client.get(key)
+            self._record(key, "redis", value is not None)
+            return value
+        except Exception as e:
+            logger.error(f"Error getting raw value from cache: {e}")
+            return None
+    
+    async def set_raw(self, key: str, value: bytes, ttl: Optional[int] = None) -> bool:
+        if not self.redis_client:
+            return False
+        
+        try:
+            with timed("cache_set"):
+                await self.redis_client.setex(key, ttl or self.default_ttl, value)
+            return True
+        except Exception as e:
+            logger.error(f"Error setting raw cache value: {e}")
+            return False
+    
     async def delete(self, key: str) -> bool:
         if not self.redis_client:
             return False
         
         try:
             await self.redis_client.delete(key)
+            await self._invalidate({"type": "keys", "keys": [key]})
             return True
         except Exception as e:
             logger.error(f"Error deleting from cache: {e}")
             return False
     
     async def delete_pattern(self, pattern: str) -> int:
+        """Delete keys matching ``pattern`` incrementally with SCAN.
+
+        Walks the whole keyspace, so it is meant for maintenance only; the
+        request path invalidates through generations and tag sets instead.
+        """
         if not self.redis_client:
             return 0
         
         try:
-            keys = await self.redis_client.keys(pattern)
-            if keys:
-                return await self.redis_client.delete(*keys)
-            return 0
+            deleted = 0
+            batch = []
+            async for key in self.redis_client.scan_iter(match=pattern, count=1000):
+                batch.append(key)
+                if len(batch) >= 1000:
+                    deleted += await self.redis_client.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += await self.redis_client.unlink(*batch)
+            return deleted
         except Exception as e:
             logger.error(f"Error deleting pattern from cache: {e}")
             return 0
     
+    # Stale-while-revalidate envelopes: the value is stored with the time it
+    # stops being fresh and kept in Redis for ``stale_ttl`` longer, so an
+    # expired entry can still be served while one caller refreshes it.
+    async def set_fresh(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """Store an envelope; search/RAG payloads are also tagged with the
+        contractors they contain so they can be invalidated per contractor."""
+        ttl = ttl or self.default_ttl
+        envelope = {"value": value, "fresh_until": time.time() + ttl}
+        stored = await self.set(key, envelope, ttl + self.stale_ttl)
+        if stored:
+            await self._tag_contractors(key, _contractor_ids(value), ttl + self.stale_ttl)
+        return stored
+    
+    async def _tag_contractors(self, key: str, contractor_ids: List[str], ttl: int):
+        """Index ``key`` under each contractor's tag, a sorted set scored by
+        when the entry expires; members past their expiry are trimmed on
+        every write, so a hot tag only holds entries that still exist."""
+        if not contractor_ids:
+            return
+        
+        try:
+            generation = await self._generation("search")
+            now = time.time()
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for contractor_id in contractor_ids:
+                    tag = _contractor_tag(contractor_id, generation)
+                    pipe.zadd(tag, {key: now + ttl})
+                    pipe.zremrangebyscore(tag, "-inf", now)
+                    # A tag set outlives every entry it points at
+                    pipe.expire(tag, ttl, gt=True)
+                    pipe.expire(tag, ttl, nx=True)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Error tagging cache entry: {e}")
+    
+    async def get_fresh(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """Return ``(value, is_fresh)``, or None if there is no usable entry."""
+        envelope = await self.get(key)
+        if not isinstance(envelope, dict) or "fresh_until" not in envelope:
+            return None
+        fresh = envelope["fresh_until"] > time.time()
+        if not fresh and self.l1 is not None:
+            # Keep reading stale entries from Redis so a refresh done by any
+            # worker is picked up as soon as it lands
+            self.l1.delete(key)
+        return envelope["value"], fresh
+    
+    # Cross-worker lock so only one process recomputes a missing entry
+    async def acquire_lock(self, key: str, ttl_ms: Optional[int] = None) -> Optional[str]:
+        """Return a lock token, or None if another worker holds the lock.
+
+        Without Redis every caller gets a token; coalescing is then only
+        per process.
+        """
+        token = uuid.uuid4().hex
+        if not self.redis_client:
+            return token
+        
+        try:
+            acquired = await self.redis_client.set(
+                f"lock:{key}", token, nx=True, px=ttl_ms or settings.cache_lock_ttl_ms
+            )
+            return token if acquired else None
+        except Exception as e:
+            logger.error(f"Error acquiring cache lock: {e}")
+            return token
+    
+    async def release_lock(self, key: str, token: str) -> bool:
+        if not self.redis_client:
+            return False
+        
+        try:
+            # Only delete the lock if it is still ours (it may have expired and been re-taken)
+            released = await self.redis_client.eval(RELEASE_LOCK_SCRIPT, 1, f"lock:{key}", token)
+            return bool(released)
+        except Exception as e:
+            logger.error(f"Error releasing cache lock: {e}")
+            return False
+    
+    async def _wait_for(self, key: str) -> Optional[Any]:
+        deadline = time.monotonic() + settings.cache_lock_wait_ms / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(settings.cache_lock_poll_ms / 1000)
+            cached = await self.get_fresh(key)
+            if cached is not None:
+                return cached[0]
+        return None
+    
+    async def _compute_and_store(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: Optional[int]) -> Tuple[Any, bool]:
+        token = await self.acquire_lock(key)
+        if token is None:
+            # Another worker is computing it; wait for its result before
+            # giving up and computing locally
+            value = await self._wait_for(key)
+            if value is not None:
+                return value, True
+        
+        try:
+            if token is not None:
+                cached = await self.get_fresh(key)
+                if cached is not None and cached[1]:
+                    return cached[0], True
+            value = await compute()
+            await self.set_fresh(key, value, ttl)
+            return value, False
+        finally:
+            if token is not None:
+                await self.release_lock(key, token)
+    
+    async def compute_once(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None
+    ) -> Tuple[Any, bool]:
+        """Compute and cache a missing entry once across callers and workers.
+
+        Returns ``(value, shared)``; ``shared`` is True when this caller got
+        the result of a computation started by another request.
+        """
+        (value, reused), shared = await self.single_flight.do(
+            key, lambda: self._compute_and_store(key, compute, ttl)
+        )
+        return value, shared or reused
+    
+    def refresh_in_background(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: Optional[int] = None):
+        """Recompute a stale entry without blocking the caller serving it."""
+        refresh_key = f"refresh:{key}"
+        if self.single_flight.in_flight(refresh_key):
+            return
+        
+        async def refresh():
+            token = await self.acquire_lock(key)
+            if token is None:
+                return
+            try:
+                await self.set_fresh(key, await compute(), ttl)
+            except Exception as e:
+                logger.error(f"Background cache refresh failed: {e}")
+            finally:
+                await self.release_lock(key, token)
+        
+        task = asyncio.create_task(self.single_flight.do(refresh_key, refresh))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+    
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None
+    ) -> Tuple[Any, bool]:
+        """Fresh hit, stale hit with a background refresh, or a coalesced compute.
+
+        Returns ``(value, from_cache)``.
+        """
+        cached = await self.get_fresh(key)
+        if cached is not None:
+            value, fresh = cached
+            if not fresh:
+                self.refresh_in_background(key, compute, ttl)
+            return value, True
+        
+        value, shared = await self.compute_once(key, compute, ttl)
+        return value, shared
+    
     # Search-specific caching methods
-    async def cache_search_result(self, query: str, results: Dict[str, Any], ttl: Optional[int] = None) -> bool:
-        key = self._generate_key("search", query)
-        return await self.set(key, results, ttl)
+    # ``scope`` distinguishes results for the same query under different filters
+    async def search_key(self, query: str, scope: str = "") -> str:
+        return await self._versioned_key("search", "search", query, scope)
     
-    async def get_cached_search_result(self, query: str) -> Optional[Dict[str, Any]]:
-        key = self._generate_key("search", query)
-        return await self.get(key)
+    async def rag_key(self, query: str, scope: str = "") -> str:
+        return await self._versioned_key("search", "rag", query, scope)
+    
+    async def cache_search_result(self, query: str, results: Dict[str, Any], ttl: Optional[int] = None, scope: str = "") -> bool:
+        return await self.set_fresh(await self.search_key(query, scope), results, ttl)
+    
+    async def get_cached_search_result(self, query: str, scope: str = "") -> Optional[Dict[str, Any]]:
+        cached = await self.get_fresh(await self.search_key(query, scope))
+        return cached[0] if cached else None
     
-    async def cache_embedding(self, contractor_id: int, embedding: List[float], ttl: Optional[int] = None) -> bool:
+    # Embeddings are stored as raw float32 bytes (1.5KB for 384 dims) rather
+    # than through the codec
+    async def cache_embedding(self, contractor_id, embedding: List[float], ttl: Optional[int] = None) -> bool:
         key = self._generate_key("embedding", contractor_id)
-        return await self.set(key, embedding, ttl)
+        return await self.set_raw(key, np.asarray(embedding, dtype="<f4").tobytes(), ttl)
     
-    async def get_cached_embedding(self, contractor_id: int) -> Optional[List[float]]:
+    async def get_cached_embedding(self, contractor_id) -> Optional[List[float]]:
         key = self._generate_key("embedding", contractor_id)
-        return await self.get(key)
+        raw = await self.get_raw(key)
+        return np.frombuffer(raw, dtype="<f4").tolist() if raw else None
     
-    async def cache_rag_result(self, query: str, contractors: List[Dict], rag_result: Dict[str, Any], ttl: Optional[int] = None) -> bool:
-        key = self._generate_key("rag", query)
+    async def cache_rag_result(self, query: str, contractors: List[Dict], rag_result: Dict[str, Any], ttl: Optional[int] = None, scope: str = "") -> bool:
         cache_data = {
-            "contractors": contractors,
+            "contractors": EncodedRows.of(contractors),
             "rag_result": rag_result,
             "cached_at": datetime.utcnow().isoformat()
         }
-        return await self.set(key, cache_data, ttl)
+        return await self.set_fresh(await self.rag_key(query, scope), cache_data, ttl)
     
-    async def get_cached_rag_result(self, query: str) -> Optional[Dict[str, Any]]:
-        key = self._generate_key("rag", query)
-        return await self.get(key)
+    async def get_cached_rag_result(self, query: str, scope: str = "") -> Optional[Dict[str, Any]]:
+        cached = await self.get_fresh(await self.rag_key(query, scope))
+        return cached[0] if cached else None
     
     async def cache_contractor_data(self, contractor_id: int, contractor_data: Dict[str, Any], ttl: Optional[int] = None) -> bool:
         key = self._generate_key("contractor", contractor_id)
@@ -121,19 +578,36 @@ class CacheService:
         key = self._generate_key("contractor", contractor_id)
         return await self.get(key)
     
-    async def invalidate_contractor_cache(self, contractor_id: int) -> bool:
+    async def invalidate_contractor_cache(self, contractor_id) -> bool:
+        """Drop the contractor's own entries and every cached result listing it.
+
+        Costs one ZRANGE plus one DEL, proportional to the live results that
+        mention this contractor rather than to the size of the cache. Only
+        the current generation's tag is read; older entries are already
+        orphaned by their versioned keys.
+        """
+        keys = [
+            self._generate_key("contractor", contractor_id),
+            self._generate_key("embedding", contractor_id)
+        ]
+        if not self.redis_client:
+            await self._invalidate({"type": "keys", "keys": keys, "contractor_id": str(contractor_id)})
+            return False
+        
         try:
-            await self.delete_pattern(f"*contractor:{contractor_id}*")
-            await self.delete_pattern(f"*embedding:{contractor_id}*")
+            tag = _contractor_tag(contractor_id, await self._generation("search"))
+            keys += [key.decode() if isinstance(key, bytes) else key for key in await self.redis_client.zrange(tag, 0, -1)]
+            await self.redis_client.delete(tag, *keys)
+            await self._invalidate({"type": "keys", "keys": keys, "contractor_id": str(contractor_id)})
             return True
         except Exception as e:
             logger.error(f"Error invalidating contractor cache: {e}")
             return False
     
     async def invalidate_search_cache(self) -> bool:
+        """Orphan every cached search and RAG result with one INCR."""
         try:
-            await self.delete_pattern("*search:*")
-            await self.delete_pattern("*rag:*")
+            await self.bump_generation("search")
             return True
         except Exception as e:
             logger.error(f"Error invalidating search cache: {e}")
@@ -151,7 +625,12 @@ class CacheService:
                 "connected_clients": info.get("connected_clients", 0),
                 "total_commands_processed": info.get("total_commands_processed", 0),
                 "keyspace_hits": info.get("keyspace_hits", 0),
-                "keyspace_misses": info.get("keyspace_misses", 0)
+                "keyspace_misses": info.get("keyspace_misses", 0),
+                "search_generation": await self._generation("search"),
+                "single_flight": self.single_flight.stats(),
+                "l1": self.l1.stats() if self.l1 is not None else None,
+                "codec": self.codec.stats(),
+                "invalidation_subscribed": self._subscribed
             }
         except Exception as e:
             logger.error(f"Error getting cache stats: {e}")
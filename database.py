@@ -5,13 +5,25 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sess
 from pgvector.sqlalchemy import Vector
 from datetime import datetime
 import uuid
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict, List
 
 from config import settings
+from metrics import DB_POOL_CONNECTIONS, DB_POOL_SATURATION
 
 engine = create_async_engine(
     settings.database_url.replace("postgresql://", "postgresql+asyncpg://"),
-    echo=False
+    echo=False,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    connect_args={
+        # SQLAlchemy's per-connection cache of prepared statements, and asyncpg's
+        # own cache used by repository.QueryRepository on the raw connection
+        "prepared_statement_cache_size": settings.db_statement_cache_size,
+        "statement_cache_size": settings.db_statement_cache_size
+    }
 )
 
 # AsyncSessionLocal = async_sessionmaker(engine, class_=async_sessionmaker, expire_on_commit=True)
@@ -38,11 +50,111 @@ class ContractorDB(Base):
     has_insurance = Column(Boolean, default=False)
     hourly_rate_min = Column(Float)
     hourly_rate_max = Column(Float)
+    rating = Column(Float)
+    latitude = Column(Float)
+    longitude = Column(Float)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     embedding = Column(Vector(384))
 
+# Full-text and trigram indexes used by LexicalSearchService. unaccent() is only
+# STABLE, so it is wrapped in an IMMUTABLE function to be usable in a generated column.
+LEXICAL_SEARCH_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text AS
+    $$ SELECT public.unaccent('public.unaccent', $1) $$
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    """,
+    """
+    ALTER TABLE contractor ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', immutable_unaccent(coalesce(name, ''))), 'A') ||
+        setweight(to_tsvector('english', immutable_unaccent(coalesce(services_text, ''))), 'B') ||
+        setweight(to_tsvector('english', immutable_unaccent(coalesce(city, ''))), 'B') ||
+        setweight(to_tsvector('english', immutable_unaccent(coalesce(bio_text, ''))), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS contractor_search_tsv_idx ON contractor USING gin (search_tsv)",
+    "CREATE INDEX IF NOT EXISTS contractor_name_trgm_idx ON contractor USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS contractor_city_trgm_idx ON contractor USING gin (city gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS contractor_services_trgm_idx ON contractor USING gin (services_text gin_trgm_ops)",
+]
+
+# Columns and indexes backing the structured /search filters (models.SearchFilters)
+SEARCH_FILTER_DDL = [
+    "ALTER TABLE contractor ADD COLUMN IF NOT EXISTS rating FLOAT",
+    "CREATE INDEX IF NOT EXISTS contractor_rating_idx ON contractor (rating)",
+    "CREATE INDEX IF NOT EXISTS contractor_rate_min_idx ON contractor (hourly_rate_min)",
+    "CREATE INDEX IF NOT EXISTS contractor_licensed_idx ON contractor (rating) WHERE has_license",
+    "CREATE INDEX IF NOT EXISTS contractor_insured_idx ON contractor (rating) WHERE has_insurance",
+]
+
+# Coordinates for radius / nearest-N search (earthdistance over a GiST index)
+GEO_DDL = [
+    "ALTER TABLE contractor ADD COLUMN IF NOT EXISTS latitude FLOAT",
+    "ALTER TABLE contractor ADD COLUMN IF NOT EXISTS longitude FLOAT",
+    "CREATE INDEX IF NOT EXISTS contractor_location_idx ON contractor USING gist (ll_to_earth(latitude, longitude))",
+]
+
+# Bulk loads (bulk_loader.py) merge on website, case-insensitively
+BULK_LOAD_DDL = [
+    "CREATE INDEX IF NOT EXISTS contractor_website_lower_idx ON contractor (lower(website))",
+]
+
+# Watermark scans of /embeddings/sync walk contractors in (updated_at, id) order
+EMBEDDING_SYNC_DDL = [
+    "CREATE INDEX IF NOT EXISTS contractor_updated_at_idx ON contractor (updated_at, id)",
+]
+
+# Vectors and their content hash / model version, used to skip unchanged rows
+CONTRACTOR_EMBEDDINGS_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS contractor_embeddings (
+        id SERIAL PRIMARY KEY,
+        contractor_id UUID UNIQUE NOT NULL,
+        embedding_text TEXT,
+        embedding_vector VECTOR(384),
+        created_at TIMESTAMP DEFAULT NOW(),
+        updated_at TIMESTAMP DEFAULT NOW(),
+        FOREIGN KEY (contractor_id) REFERENCES contractor(id) ON DELETE CASCADE
+    )
+    """,
+    "ALTER TABLE contractor_embeddings ADD COLUMN IF NOT EXISTS content_hash TEXT",
+    "ALTER TABLE contractor_embeddings ADD COLUMN IF NOT EXISTS model_version TEXT",
+]
+
+# Progress of /embeddings/update-all (last id) and /embeddings/sync (watermark)
+EMBEDDING_CHECKPOINTS_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS embedding_checkpoints (
+        job TEXT PRIMARY KEY,
+        last_contractor_id UUID,
+        processed INTEGER DEFAULT 0,
+        started_at TIMESTAMP DEFAULT NOW(),
+        updated_at TIMESTAMP DEFAULT NOW(),
+        completed_at TIMESTAMP
+    )
+    """,
+    "ALTER TABLE embedding_checkpoints ADD COLUMN IF NOT EXISTS watermark TIMESTAMP",
+]
+
+# Applied in order by init_db and recorded in schema_migrations, so each runs
+# once per database instead of on every request. Append new versions; never
+# edit one that has shipped. The statements are idempotent, so databases
+# created before schema_migrations existed adopt the table cleanly.
+MIGRATIONS = [
+    (1, "lexical_search", LEXICAL_SEARCH_DDL),
+    (2, "search_filters", SEARCH_FILTER_DDL),
+    (3, "geo", GEO_DDL),
+    (4, "contractor_embeddings", CONTRACTOR_EMBEDDINGS_DDL),
+    (5, "embedding_checkpoints", EMBEDDING_CHECKPOINTS_DDL),
+    (6, "bulk_load", BULK_LOAD_DDL),
+    (7, "embedding_sync", EMBEDDING_SYNC_DDL),
+]
+
+# pg_advisory_xact_lock key; workers starting together apply migrations one at a time
+MIGRATION_LOCK_KEY = 7301945
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         try:
@@ -50,12 +162,59 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await session.close()
 
+async def run_migrations(conn) -> List[int]:
+    """Apply pending MIGRATIONS inside the caller's transaction; returns the versions applied."""
+    await conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT NOW()
+        )
+    """))
+    result = await conn.execute(text("SELECT version FROM schema_migrations"))
+    done = {row[0] for row in result.fetchall()}
+    
+    applied = []
+    for version, name, statements in MIGRATIONS:
+        if version in done:
+            continue
+        for statement in statements:
+            await conn.execute(text(statement))
+        await conn.execute(text(
+            "INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"
+        ), {"version": version, "name": name})
+        applied.append(version)
+        print(f"applied migration {version} ({name})")
+    return applied
+
+def pool_stats() -> Dict[str, Any]:
+    """Connection pool usage; also refreshes the pool gauges."""
+    pool = engine.pool
+    checked_out = pool.checkedout()
+    capacity = settings.db_pool_size + max(settings.db_max_overflow, 0)
+    stats = {
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3) if capacity else 0.0
+    }
+    for state in ("checked_out", "idle", "overflow"):
+        DB_POOL_CONNECTIONS.set(stats[state], state=state)
+    DB_POOL_SATURATION.set(stats["saturation"])
+    return stats
+
 async def init_db():
     try:
         async with engine.begin() as conn:
+            # Held until commit, so concurrent workers don't race on the DDL below
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
             await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
             await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
             await conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS cube"))
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS earthdistance"))
             
             try:
                 await conn.run_sync(Base.metadata.create_all)
@@ -64,6 +223,8 @@ async def init_db():
                     print("tables already exist")
                 else:
                     raise
+            
+            await run_migrations(conn)
         
         print("database ready")
         
@@ -0,0 +1,250 @@
+import re
+import zlib
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import numpy as np
+from sqlalchemy import text
+
+from database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime for the universal hash family; shingle hashes are reduced
+# below it so a * x + b stays inside uint64
+_PRIME = np.uint64((1 << 31) - 1)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_DIGITS_RE = re.compile(r"\D")
+
+# Query parameters added by ad and mail campaigns; they never identify a page
+_TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid"}
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Digits only, without the North American country code."""
+    if not phone:
+        return None
+    digits = _DIGITS_RE.sub("", phone)
+    if len(digits) == 11 and digits.startswith("1"):
+        digits = digits[1:]
+    return digits if len(digits) >= 7 else None
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    if not email:
+        return None
+    email = email.strip().lower()
+    if email.startswith("mailto:"):
+        email = email[7:]
+    email = email.split("?", 1)[0]
+    return email if "@" in email else None
+
+
+def normalize_website(website: Optional[str]) -> Optional[str]:
+    """Host, path and query without scheme, ``www.``, fragment or trailing slash.
+
+    Query parameters are kept (``/profile?id=1`` and ``/profile?id=2`` are
+    different pages) and sorted, minus ``utm_*`` and click-id tracking
+    parameters.
+    """
+    if not website:
+        return None
+    website = website.strip()
+    if "://" not in website:
+        website = "http://" + website
+    parts = urlsplit(website)
+    host = parts.hostname or ""
+    if host.startswith("www."):
+        host = host[4:]
+    if not host:
+        return None
+    key = host + parts.path.rstrip("/").lower()
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith("utm_") and name.lower() not in _TRACKING_PARAMS
+    )
+    if query:
+        key += "?" + urlencode(query)
+    return key
+
+
+def identity_keys(record: Dict[str, Any]) -> List[str]:
+    """Exact-match keys for a contractor; any shared key marks a duplicate."""
+    keys = []
+    phone = normalize_phone(record.get("phone"))
+    if phone:
+        keys.append(f"phone:{phone}")
+    email = normalize_email(record.get("email"))
+    if email:
+        keys.append(f"email:{email}")
+    website = normalize_website(record.get("website"))
+    if website:
+        keys.append(f"website:{website}")
+    return keys
+
+
+def shingles(record: Dict[str, Any], size: int = 3) -> Set[str]:
+    words = _WORD_RE.findall(" ".join(
+        record.get(field) or "" for field in ("name", "bio_text", "services_text")
+    ).lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHashLSH:
+    """MinHash signatures bucketed by band for sub-linear near-duplicate lookup.
+
+    Signatures have ``num_perm`` values split into ``bands`` bands; two
+    records become candidates when any band is identical, which for
+    ``bands`` b of r rows happens with probability 1 - (1 - s^r)^b at
+    Jaccard similarity s. Candidates are then checked against
+    ``threshold`` using the signatures' estimated Jaccard.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.8, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+        self._buckets: Dict[Tuple[int, bytes], Set[Any]] = {}
+        self._signatures: Dict[Any, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, shingle_set: Set[str]) -> Optional[np.ndarray]:
+        if not shingle_set:
+            return None
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode()) for s in shingle_set), dtype=np.uint64, count=len(shingle_set)
+        ) % _PRIME
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key: Any, signature: np.ndarray):
+        self._signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key: Any):
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def query(self, signature: np.ndarray) -> Optional[Tuple[Any, float]]:
+        """Most similar indexed key at or above the threshold, with its estimated Jaccard."""
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+
+        best = None
+        for key in candidates:
+            similarity = float(np.mean(self._signatures[key] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+
+
+class ContractorDeduplicator:
+    """Entity resolution for ingested contractors.
+
+    A record is a duplicate of an indexed contractor when it shares a
+    normalized phone, email or website with it, or when the MinHash of its
+    name, bio and services is within ``threshold`` estimated Jaccard.
+    Records with fewer than ``min_shingles`` word shingles only take part in
+    exact matching, since very short texts make MinHash estimates noisy.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.8, min_shingles: int = 5):
+        self.lsh = MinHashLSH(num_perm=num_perm, bands=bands, threshold=threshold)
+        self.min_shingles = min_shingles
+        self._keys: Dict[str, Any] = {}
+        self._keys_by_id: Dict[Any, List[str]] = {}
+        self.loaded = False
+        self.exact_matches = 0
+        self.near_matches = 0
+
+    def _signature(self, record: Dict[str, Any]) -> Optional[np.ndarray]:
+        shingle_set = shingles(record)
+        if len(shingle_set) < self.min_shingles:
+            return None
+        return self.lsh.signature(shingle_set)
+
+    def find(self, record: Dict[str, Any]) -> Optional[Tuple[Any, str, float]]:
+        """Return ``(contractor_id, reason, similarity)`` of the matching contractor, if any."""
+        for key in identity_keys(record):
+            contractor_id = self._keys.get(key)
+            if contractor_id is not None:
+                self.exact_matches += 1
+                return contractor_id, key.split(":", 1)[0], 1.0
+
+        signature = self._signature(record)
+        if signature is not None:
+            match = self.lsh.query(signature)
+            if match is not None:
+                self.near_matches += 1
+                return match[0], "minhash", match[1]
+        return None
+
+    def add(self, contractor_id: Any, record: Dict[str, Any]):
+        keys = identity_keys(record)
+        for key in keys:
+            self._keys.setdefault(key, contractor_id)
+        self._keys_by_id[contractor_id] = keys
+
+        signature = self._signature(record)
+        if signature is not None:
+            self.lsh.add(contractor_id, signature)
+
+    def remove(self, contractor_id: Any):
+        for key in self._keys_by_id.pop(contractor_id, []):
+            if self._keys.get(key) == contractor_id:
+                del self._keys[key]
+        self.lsh.remove(contractor_id)
+
+    async def load(self, batch_size: int = 10000):
+        """Index every existing contractor, streaming rows in batches."""
+        try:
+            count = 0
+            async with AsyncSessionLocal() as db:
+                stream = await db.stream(
+                    text("SELECT id, name, phone, email, website, bio_text, services_text FROM contractor")
+                    .execution_options(yield_per=batch_size)
+                )
+                async for batch in stream.partitions(batch_size):
+                    for row in batch:
+                        self.add(row[0], dict(row._mapping))
+                    count += len(batch)
+            self.loaded = True
+            logger.info(f"Dedupe index loaded with {count} contractors")
+        except Exception as e:
+            logger.error(f"Failed to load dedupe index: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "contractors": len(self._keys_by_id),
+            "minhash_indexed": len(self.lsh),
+            "exact_matches": self.exact_matches,
+            "near_matches": self.near_matches,
+            "threshold": self.lsh.threshold
+        }
@@ -1,30 +1,128 @@
+import hashlib
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import asyncio
 import logging
 from sqlalchemy import text
-from database import get_db
+from database import get_db, engine, AsyncSessionLocal
+from config import settings
+from vector_index import VectorIndex
+from quantization import EmbeddingQuantizer
+from models import SearchFilters
+from search_filters import build_filter_sql
+from inference_executor import InferenceExecutor, InferenceQueueFull
+from micro_batcher import MicroBatcher
+from query_embedding_cache import QueryEmbeddingCache
+from metrics import timed
+from repository import queries
 
 logger = logging.getLogger(__name__)
 
+VECTOR_INDEX_NAME = "contractor_embeddings_vector_idx"
+
+UPSERT_EMBEDDING_SQL = """
+INSERT INTO contractor_embeddings (contractor_id, embedding_text, embedding_vector, content_hash, model_version, created_at, updated_at)
+VALUES (:contractor_id, :embedding_text, CAST(:embedding_vector AS vector), :content_hash, :model_version, NOW(), NOW())
+ON CONFLICT (contractor_id) 
+DO UPDATE SET 
+    embedding_text = EXCLUDED.embedding_text,
+    embedding_vector = EXCLUDED.embedding_vector,
+    content_hash = EXCLUDED.content_hash,
+    model_version = EXCLUDED.model_version,
+    updated_at = NOW()
+"""
+
+STORED_HASHES_SQL = """
+SELECT contractor_id, content_hash, model_version
+FROM contractor_embeddings WHERE contractor_id = ANY(CAST(:ids AS UUID[]))
+"""
+
+# Per-search index tuning, one round trip either way
+SEARCH_SETTINGS_SQL = "SELECT set_config('hnsw.ef_search', :ef_search, true), set_config('ivfflat.probes', :probes, true)"
+ITERATIVE_SEARCH_SETTINGS_SQL = """
+SELECT set_config('hnsw.ef_search', :ef_search, true), set_config('ivfflat.probes', :probes, true),
+       set_config('hnsw.iterative_scan', :mode, true), set_config('ivfflat.iterative_scan', :mode, true)
+"""
+
+REEMBED_JOB = "update_all_embeddings"
+SYNC_JOB = "sync_embeddings"
+
 class EmbeddingsService:
-    def __init__(self):
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+    def __init__(self, cache=None):
+        # All model access goes through the executor so encoding never runs on the event loop
+        self.executor = InferenceExecutor(
+            settings.embedding_model,
+            mode=settings.inference_executor,
+            max_workers=settings.inference_workers,
+            max_queue=settings.inference_max_queue,
+            timeout=settings.inference_timeout
+        )
         self.embedding_dim = 384
+        # Stored with every embedding; rows written by another model are re-encoded
+        self.model_version = settings.embedding_model
+        
+        # Concurrent single-query encodes share one model call
+        self.batcher = None
+        if settings.embedding_micro_batching:
+            self.batcher = MicroBatcher(
+                self.executor.encode,
+                max_batch_size=settings.embedding_batch_max_size,
+                max_wait_ms=settings.embedding_batch_max_wait_ms
+            )
+        
+        self.query_cache = QueryEmbeddingCache(
+            settings.embedding_model,
+            maxsize=settings.query_embedding_cache_size,
+            cache=cache if settings.query_embedding_cache_redis else None,
+            ttl=settings.query_embedding_cache_ttl
+        )
+        
+        # Compact int8/float16 (optionally reduced) vectors for the ANN scan,
+        # with full-precision rescoring of the top candidates
+        self.quantizer = EmbeddingQuantizer(
+            self.embedding_dim,
+            dtype=settings.embedding_storage_dtype,
+            dim=settings.embedding_storage_dim or None,
+            reduction=settings.embedding_reduction
+        )
         
-    def generate_embedding(self, text: str) -> List[float]:
+        self.index = None
+        if settings.ann_index_enabled:
+            self.index = VectorIndex(
+                self.embedding_dim,
+                nlist=settings.ann_index_nlist,
+                nprobe=settings.ann_index_nprobe,
+                ivf_min_size=settings.ann_index_ivf_min_size,
+                quantizer=self.quantizer
+            )
+        
+    async def generate_embedding(self, text: str, use_cache: bool = True) -> List[float]:
         try:
             if not text or text.strip() == "":
                 return [0.0] * self.embedding_dim
             
-            embedding = self.model.encode(text, convert_to_tensor=False)
+            if use_cache:
+                cached = await self.query_cache.get(text)
+                if cached is not None:
+                    return cached.tolist()
+            
+            with timed("encode_query"):
+                if self.batcher is not None:
+                    embedding = await self.batcher.submit(text)
+                else:
+                    embedding = (await self.executor.encode([text]))[0]
+            
+            if use_cache:
+                await self.query_cache.set(text, embedding)
             return embedding.tolist()
+        except (InferenceQueueFull, asyncio.TimeoutError):
+            # A zero vector would silently rank garbage, let callers fall back instead
+            raise
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
             return [0.0] * self.embedding_dim
     
-    def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+    async def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
         try:
             if not texts:
                 return []
@@ -33,7 +131,8 @@ class EmbeddingsService:
             if not valid_texts:
                 return [[0.0] * self.embedding_dim] * len(texts)
             
-            embeddings = self.model.encode(valid_texts, convert_to_tensor=False)
+            with timed("encode_batch"):
+                embeddings = await self.executor.encode(valid_texts)
             
             result = []
             text_idx = 0
@@ -45,10 +144,23 @@ class EmbeddingsService:
                     result.append([0.0] * self.embedding_dim)
             
             return result
+        except (InferenceQueueFull, asyncio.TimeoutError):
+            raise
         except Exception as e:
             logger.error(f"Error generating batch embeddings: {e}")
             return [[0.0] * self.embedding_dim] * len(texts)
     
+    def get_inference_stats(self) -> Dict[str, Any]:
+        return {
+            "executor": {
+                "mode": self.executor.mode,
+                "pending": self.executor.pending,
+                "max_queue": self.executor.max_queue
+            },
+            "micro_batching": self.batcher.stats() if self.batcher is not None else None,
+            "query_cache": self.query_cache.stats()
+        }
+    
     def cosine_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         try:
             vec1 = np.array(embedding1)
@@ -66,115 +178,338 @@ class EmbeddingsService:
             logger.error(f"Error calculating cosine similarity: {e}")
             return 0.0
     
-    async def update_contractor_embeddings(self, contractor_id: int, bio_text: str = None, services_text: str = None):
+    def _combined_text(self, bio_text: Optional[str], services_text: Optional[str]) -> str:
+        combined_text = ""
+        if bio_text:
+            combined_text += bio_text
+        if services_text:
+            combined_text += " " + services_text
+        
+        if not combined_text.strip():
+            combined_text = "No description available"
+        return combined_text
+    
+    def _content_hash(self, combined_text: str) -> str:
+        return hashlib.sha256(combined_text.encode("utf-8")).hexdigest()
+    
+    def _embedding_params(self, contractor_id, combined_text: str, embedding: List[float]) -> Dict[str, Any]:
+        return {
+            "contractor_id": contractor_id,
+            "embedding_text": combined_text,
+            "embedding_vector": self._vector_literal(embedding),
+            "content_hash": self._content_hash(combined_text),
+            "model_version": self.model_version
+        }
+    
+    def _is_current(self, stored: Optional[Tuple[Optional[str], Optional[str]]], combined_text: str) -> bool:
+        """True when the stored embedding was made from this text by the current model."""
+        return stored is not None and stored == (self._content_hash(combined_text), self.model_version)
+    
+    async def _stored_hashes(self, contractor_ids: List[Any]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """``(content_hash, model_version)`` keyed by the contractor id as a string."""
+        rows = await queries.fetch(STORED_HASHES_SQL, {"ids": [str(cid) for cid in contractor_ids]})
+        return {str(row[0]): (row[1], row[2]) for row in rows}
+    
+    async def update_contractor_embeddings(self, contractor_id: int, bio_text: str = None, services_text: str = None) -> bool:
+        """Embed one contractor; returns False when the stored embedding is already current."""
         try:
-            combined_text = ""
-            if bio_text:
-                combined_text += bio_text
-            if services_text:
-                combined_text += " " + services_text
+            combined_text = self._combined_text(bio_text, services_text)
+            
+            stored = await self._stored_hashes([contractor_id])
             
-            if not combined_text.strip():
-                combined_text = "No description available"
+            if self._is_current(stored.get(str(contractor_id)), combined_text):
+                logger.debug(f"Embedding for contractor {contractor_id} is current, skipping")
+                return False
             
-            embedding = self.generate_embedding(combined_text)
+            # Document texts are rarely repeated, keep them out of the query cache
+            embedding = await self.generate_embedding(combined_text, use_cache=False)
             
             async for db in get_db():
-                await self._ensure_embeddings_table(db)
-                
-                upsert_sql = """
-                INSERT INTO contractor_embeddings (contractor_id, embedding_text, embedding_vector, created_at, updated_at)
-                VALUES (:contractor_id, :embedding_text, :embedding_vector, NOW(), NOW())
-                ON CONFLICT (contractor_id) 
-                DO UPDATE SET 
-                    embedding_text = EXCLUDED.embedding_text,
-                    embedding_vector = EXCLUDED.embedding_vector,
-                    updated_at = NOW()
-                """
-                
-                await db.execute(text(upsert_sql), {
-                    "contractor_id": contractor_id,
-                    "embedding_text": combined_text,
-                    "embedding_vector": embedding
-                })
+                await db.execute(text(UPSERT_EMBEDDING_SQL), self._embedding_params(contractor_id, combined_text, embedding))
                 await db.commit()
+                self._add_to_index([(contractor_id, embedding)])
                 
                 logger.info(f"Updated embeddings for contractor {contractor_id}")
+            return True
                 
         except Exception as e:
             logger.error(f"Error updating contractor embeddings: {e}")
             raise
-    
-    async def _ensure_embeddings_table(self, db):
+
+    async def update_embeddings_batch(self, rows: List[Tuple[Any, Optional[str], Optional[str]]]) -> int:
+        """Embed ``(contractor_id, bio_text, services_text)`` rows with one batched encode and one executemany.
+
+        Rows whose stored embedding is current are skipped; returns how many were encoded.
+        """
+        if not rows:
+            return 0
+
         try:
-            create_table_sql = """
-            CREATE TABLE IF NOT EXISTS contractor_embeddings (
-                id SERIAL PRIMARY KEY,
-                contractor_id INTEGER UNIQUE NOT NULL,
-                embedding_text TEXT,
-                embedding_vector VECTOR(384),
-                created_at TIMESTAMP DEFAULT NOW(),
-                updated_at TIMESTAMP DEFAULT NOW(),
-                FOREIGN KEY (contractor_id) REFERENCES contractor(id) ON DELETE CASCADE
-            );
+            stored = await self._stored_hashes([row[0] for row in rows])
+
+            texts = [self._combined_text(bio_text, services_text) for _, bio_text, services_text in rows]
+            pending = [
+                (row, combined_text) for row, combined_text in zip(rows, texts)
+                if not self._is_current(stored.get(str(row[0])), combined_text)
+            ]
+            if not pending:
+                return 0
+            rows = [row for row, _ in pending]
+            texts = [combined_text for _, combined_text in pending]
+            embeddings = await self.generate_embeddings_batch(texts)
+
+            async for db in get_db():
+                await db.execute(text(UPSERT_EMBEDDING_SQL), [
+                    self._embedding_params(row[0], embedding_text, embedding)
+                    for row, embedding_text, embedding in zip(rows, texts, embeddings)
+                ])
+                await db.commit()
+                self._add_to_index((row[0], embedding) for row, embedding in zip(rows, embeddings))
+
+            logger.info(f"Updated embeddings for {len(rows)} contractors")
+            return len(rows)
+
+        except Exception as e:
+            logger.error(f"Error updating contractor embeddings batch: {e}")
+            raise
+
+    def _compact_vector(self) -> Optional[Dict[str, str]]:
+        """Expression the pgvector index is built on when compact storage is enabled.
+        
+        pgvector has no int8 type, so both float16 and int8 modes index a
+        halfvec; dimension reduction in SQL is truncation (subvector).
+        """
+        if not self.quantizer.is_lossy:
+            return None
+        
+        dim = self.quantizer.dim
+        vector_type = "vector" if self.quantizer.dtype == "float32" else "halfvec"
+        column = "embedding_vector"
+        if dim < self.embedding_dim:
+            column = f"subvector(embedding_vector, 1, {dim})"
+        return {
+            "expression": f"({column}::{vector_type}({dim}))",
+            "type": f"{vector_type}({dim})",
+            "opclass": f"{vector_type}_cosine_ops"
+        }
+    
+    def _vector_index_sql(self, index_type: str, name: str, concurrently: bool = False) -> str:
+        using = "CONCURRENTLY " if concurrently else ""
+        compact = self._compact_vector()
+        column = f"{compact['expression']} {compact['opclass']}" if compact else "embedding_vector vector_cosine_ops"
+        if index_type == "hnsw":
+            return f"""
+            CREATE INDEX {using}IF NOT EXISTS {name} ON contractor_embeddings
+            USING hnsw ({column})
+            WITH (m = {int(settings.hnsw_m)}, ef_construction = {int(settings.hnsw_ef_construction)})
             """
-            await db.execute(text(create_table_sql))
-            await db.commit()
+        if index_type == "ivfflat":
+            return f"""
+            CREATE INDEX {using}IF NOT EXISTS {name} ON contractor_embeddings
+            USING ivfflat ({column})
+            WITH (lists = {int(settings.ivfflat_lists)})
+            """
+        raise ValueError(f"Unknown vector index type: {index_type}")
+    
+    async def ensure_vector_index(self):
+        """Create the configured pgvector index if it is missing"""
+        index_type = settings.pgvector_index_type
+        if index_type == "none":
+            return
+        
+        try:
+            async for db in get_db():
+                await db.execute(text(self._vector_index_sql(index_type, VECTOR_INDEX_NAME)))
+                await db.commit()
         except Exception as e:
-            logger.error(f"Error creating embeddings table: {e}")
+            logger.error(f"Error creating vector index: {e}")
             raise
     
-    async def search_by_similarity(self, query: str, limit: int = 10, threshold: float = 0.3) -> List[Dict[str, Any]]:
+    async def rebuild_vector_index(self, index_type: Optional[str] = None) -> Dict[str, Any]:
+        """Rebuild the pgvector index without blocking writes.
+        
+        The new index is built CONCURRENTLY under a temporary name and then
+        swapped in, so searches keep using the old one until it is ready.
+        """
+        index_type = index_type or settings.pgvector_index_type
+        if index_type not in ("hnsw", "ivfflat", "none"):
+            raise ValueError(f"Unknown vector index type: {index_type}")
+        
+        new_name = f"{VECTOR_INDEX_NAME}_new"
+        
+        # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {new_name}"))
+            if index_type != "none":
+                await conn.execute(text(self._vector_index_sql(index_type, new_name, concurrently=True)))
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {VECTOR_INDEX_NAME}"))
+            if index_type != "none":
+                await conn.execute(text(f"ALTER INDEX {new_name} RENAME TO {VECTOR_INDEX_NAME}"))
+        
+        logger.info(f"Rebuilt vector index as {index_type}")
+        return {"index": VECTOR_INDEX_NAME, "type": index_type}
+    
+    async def _apply_search_settings(self, conn, ef_search: Optional[int], probes: Optional[int], filtered: bool):
+        # set_config(..., true) is transaction-local, like SET LOCAL, but takes bind params
+        sql = SEARCH_SETTINGS_SQL
+        params = {
+            "ef_search": str(int(ef_search or settings.hnsw_ef_search)),
+            "probes": str(int(probes or settings.ivfflat_probes))
+        }
+        
+        # Filters drop candidates after the index scan, so let the scan keep going until LIMIT is met
+        iterative_scan = settings.pgvector_iterative_scan
+        if filtered and iterative_scan != "off":
+            sql = ITERATIVE_SEARCH_SETTINGS_SQL
+            params["mode"] = iterative_scan
+        
+        await queries.fetchrow(sql, params, conn=conn)
+    
+    def _vector_literal(self, embedding: List[float]) -> str:
+        return "[" + ",".join(str(float(x)) for x in embedding) + "]"
+    
+    async def load_index(self):
+        """Build the in-process ANN index from contractor_embeddings"""
+        if self.index is None:
+            return
+        
         try:
-            query_embedding = self.generate_embedding(query)
-            
             async for db in get_db():
-                await self._ensure_embeddings_table(db)
+                result = await db.stream(text("""
+                    SELECT contractor_id, embedding_vector::text
+                    FROM contractor_embeddings
+                    WHERE embedding_vector IS NOT NULL
+                """))
+                
+                ids = []
+                vectors = []
+                async for row in result:
+                    ids.append(str(row[0]))
+                    vectors.append(self._parse_vector(row[1]))
+                
+                self.index.build(ids, np.asarray(vectors, dtype=np.float32).reshape(-1, self.embedding_dim))
+                
+        except Exception as e:
+            logger.error(f"Error loading vector index: {e}")
+    
+    def _parse_vector(self, value: str) -> np.ndarray:
+        # pgvector text format: [0.1,0.2,...]
+        return np.fromstring(value.strip("[]"), sep=",", dtype=np.float32)
+    
+    def _contractor_result(self, c, similarity_score: float) -> Dict[str, Any]:
+        # Keys come from the column names; created_at stays a datetime and is
+        # formatted by the JSON encoder (json_codec) when the response is written
+        result = dict(c)
+        result["id"] = str(result["id"])
+        result["similarity_score"] = similarity_score
+        return result
+    
+    async def search_by_similarity(
+        self,
+        query: str,
+        limit: int = 10,
+        threshold: float = 0.3,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        filters: Optional[SearchFilters] = None,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        try:
+            query_embedding = await self.generate_embedding(query)
+            filter_sql, filter_params = build_filter_sql(filters)
+            
+            if self.index is not None and self.index.size > 0:
+                results = await self._search_index(query_embedding, limit, threshold, probes, filter_sql, filter_params, offset)
+                if results is not None:
+                    return results
+                # Filter too broad to enumerate; pgvector filters inside the index scan
+            
+            compact = self._compact_vector()
+            
+            # Filters are joined into the ANN scan itself (pre-filtering) so they
+            # narrow the candidates instead of emptying an already-cut top-k
+            source = "contractor_embeddings ce"
+            if filter_sql:
+                source += " JOIN contractor c ON c.id = ce.contractor_id"
+            
+            # Prepared on the raw connection; the transaction scopes the set_config calls
+            async with queries.transaction() as conn:
+                # The distance threshold only trims the tail of an ordered top-k, so
+                # unfiltered queries keep the plain index scan
+                await self._apply_search_settings(conn, ef_search, probes, filtered=bool(filter_sql))
+                
+                # The inner query only touches contractor_embeddings (plus filter columns) so
+                # the planner can walk the HNSW/IVFFlat index; contractor rows are joined by
+                # primary key. Iterative scans may return rows slightly out of order, hence the re-sort.
+                if compact is None:
+                    nearest_sql = f"""
+                    nearest AS MATERIALIZED (
+                        SELECT 
+                            ce.contractor_id, ce.embedding_text,
+                            ce.embedding_vector <=> CAST(:query_embedding AS vector) as distance
+                        FROM {source}
+                        WHERE ce.embedding_vector <=> CAST(:query_embedding AS vector) <= :max_distance{filter_sql}
+                        ORDER BY ce.embedding_vector <=> CAST(:query_embedding AS vector)
+                        LIMIT :limit OFFSET :offset
+                    )
+                    """
+                else:
+                    # Rank on the compact index, then rescore the candidates at full precision
+                    nearest_sql = f"""
+                    candidates AS MATERIALIZED (
+                        SELECT ce.contractor_id, ce.embedding_text, ce.embedding_vector
+                        FROM {source}
+                        WHERE TRUE{filter_sql}
+                        ORDER BY {compact['expression'].replace('embedding_vector', 'ce.embedding_vector')} <=> CAST(:compact_embedding AS {compact['type']})
+                        LIMIT :candidates
+                    ),
+                    nearest AS (
+                        SELECT 
+                            contractor_id, embedding_text,
+                            embedding_vector <=> CAST(:query_embedding AS vector) as distance
+                        FROM candidates
+                        WHERE embedding_vector <=> CAST(:query_embedding AS vector) <= :max_distance
+                        ORDER BY distance
+                        LIMIT :limit OFFSET :offset
+                    )
+                    """
                 
-                search_sql = """
+                search_sql = f"""
+                WITH {nearest_sql}
                 SELECT 
                     c.id, c.name, c.phone, c.email, c.city, c.province,
                     c.bio_text, c.services_text, c.has_license, c.has_insurance,
                     c.hourly_rate_min, c.hourly_rate_max, c.created_at,
-                    ce.embedding_text,
-                    1 - (ce.embedding_vector <=> :query_embedding) as similarity_score
-                FROM contractor c
-                LEFT JOIN contractor_embeddings ce ON c.id = ce.contractor_id
-                WHERE ce.embedding_vector IS NOT NULL
-                ORDER BY ce.embedding_vector <=> :query_embedding
-                LIMIT :limit
+                    n.embedding_text,
+                    1 - n.distance as similarity_score,
+                    c.latitude, c.longitude
+                FROM nearest n
+                JOIN contractor c ON c.id = n.contractor_id
+                ORDER BY n.distance
                 """
                 
-                result = await db.execute(text(search_sql), {
-                    "query_embedding": query_embedding,
-                    "limit": limit
-                })
+                search_params = {
+                    "query_embedding": self._vector_literal(query_embedding),
+                    "max_distance": 1 - threshold,
+                    "limit": limit,
+                    "offset": offset,
+                    **filter_params
+                }
+                if compact is not None:
+                    search_params["compact_embedding"] = self._vector_literal(query_embedding[:self.quantizer.dim])
+                    search_params["candidates"] = (limit + offset) * settings.embedding_rescore_factor
                 
-                contractors = result.fetchall()
+                with timed("vector_query"):
+                    contractors = await queries.fetch(search_sql, search_params, conn=conn)
                 
-                results = []
-                for c in contractors:
-                    similarity_score = float(c[14]) if c[14] is not None else 0.0
-                    
-                    if similarity_score >= threshold:
-                        contractor_data = {
-                            "id": str(c[0]),
-                            "name": c[1],
-                            "phone": c[2],
-                            "email": c[3],
-                            "city": c[4],
-                            "province": c[5],
-                            "bio_text": c[6],
-                            "services_text": c[7],
-                            "has_license": c[8],
-                            "has_insurance": c[9],
-                            "hourly_rate_min": c[10],
-                            "hourly_rate_max": c[11],
-                            "created_at": c[12].isoformat() if c[12] else None,
-                            "similarity_score": similarity_score,
-                            "embedding_text": c[13]
-                        }
-                        results.append(contractor_data)
+                with timed("row_convert"):
+                    results = []
+                    for c in contractors:
+                        similarity_score = float(c[14]) if c[14] is not None else 0.0
+                        
+                        if similarity_score >= threshold:
+                            results.append(self._contractor_result(c, similarity_score))
                 
                 return results
                 
@@ -182,26 +517,295 @@ class EmbeddingsService:
             logger.error(f"Error in similarity search: {e}")
             return []
     
-    async def update_all_embeddings(self):
+    async def _search_index(
+        self,
+        query_embedding: List[float],
+        limit: int,
+        threshold: float,
+        probes: Optional[int] = None,
+        filter_sql: str = "",
+        filter_params: Optional[Dict[str, Any]] = None,
+        offset: int = 0
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Search the in-process index; None when the filters are too broad for it.
+
+        Filters are applied by ranking only the matching ids, which are
+        fetched first. That list is bounded by ``ANN_INDEX_PREFILTER_MAX_IDS``:
+        a filter matching more rows returns None and the caller uses the
+        pgvector path instead.
+        """
+        # Rank in-process, then only hydrate the winning rows by primary key.
+        # Compact codes only give approximate scores, so over-fetch and rescore
+        # the candidates against the full-precision vectors in Postgres.
+        async with queries.connection() as conn:
+            allowed_ids = None
+            if filter_sql:
+                # Pre-filter with the indexed predicates, then rank only the
+                # survivors; one row past the cap is enough to tell it is too broad
+                max_ids = settings.ann_index_prefilter_max_ids
+                result = await queries.fetch(
+                    f"SELECT c.id FROM contractor c WHERE TRUE{filter_sql} LIMIT :prefilter_limit",
+                    {**filter_params, "prefilter_limit": max_ids + 1}, conn=conn
+                )
+                if len(result) > max_ids:
+                    return None
+                allowed_ids = [str(row[0]) for row in result]
+                if not allowed_ids:
+                    return []
+            
+            lossy = self.index.is_lossy
+            k = (limit + offset) * (settings.embedding_rescore_factor if lossy else 1)
+            with timed("ann_index_search"):
+                hits = self.index.search(query_embedding, k, nprobe=probes, allowed_ids=allowed_ids)
+            if not lossy:
+                hits = [(cid, score) for cid, score in hits if score >= threshold][offset:]
+            if not hits:
+                return []
+            
+            with timed("vector_query"):
+                result = await queries.fetch("""
+                    SELECT 
+                        c.id, c.name, c.phone, c.email, c.city, c.province,
+                        c.bio_text, c.services_text, c.has_license, c.has_insurance,
+                        c.hourly_rate_min, c.hourly_rate_max, c.created_at,
+                        ce.embedding_text,
+                        1 - (ce.embedding_vector <=> CAST(:query_embedding AS vector)) as similarity_score,
+                        c.latitude, c.longitude
+                    FROM contractor c
+                    LEFT JOIN contractor_embeddings ce ON c.id = ce.contractor_id
+                    WHERE c.id = ANY(CAST(:ids AS UUID[]))
+                """, {
+                    "ids": [cid for cid, _ in hits],
+                    "query_embedding": self._vector_literal(query_embedding)
+                }, conn=conn)
+                # Index ids are strings; key the UUID rows the same way
+                rows = {str(row[0]): row for row in result}
+            
+            if lossy:
+                rescored = sorted(
+                    ((cid, float(rows[cid][14])) for cid, _ in hits if cid in rows and rows[cid][14] is not None),
+                    key=lambda hit: hit[1],
+                    reverse=True
+                )
+                hits = [(cid, score) for cid, score in rescored if score >= threshold][offset:offset + limit]
+            
+            return [
+                self._contractor_result(rows[cid], score)
+                for cid, score in hits
+                if cid in rows
+            ]
+    
+    async def get_update_all_status(self, job: str = REEMBED_JOB) -> Dict[str, Any]:
+        async for db in get_db():
+            result = await db.execute(text("""
+                SELECT last_contractor_id, processed, started_at, updated_at, completed_at, watermark
+                FROM embedding_checkpoints WHERE job = :job
+            """), {"job": job})
+            row = result.fetchone()
+            if not row:
+                return {"status": "never_run"}
+            status = {
+                "status": "completed" if row[4] else "in_progress",
+                "last_contractor_id": str(row[0]) if row[0] else None,
+                "processed": row[1],
+                "started_at": row[2].isoformat() if row[2] else None,
+                "updated_at": row[3].isoformat() if row[3] else None,
+                "completed_at": row[4].isoformat() if row[4] else None
+            }
+            if job == SYNC_JOB:
+                status["watermark"] = row[5].isoformat() if row[5] else None
+            return status
+    
+    async def update_all_embeddings(self, batch_size: Optional[int] = None, resume: bool = True, force: bool = False) -> Dict[str, Any]:
+        """Re-embed every contractor in batches.
+        
+        Rows are streamed in primary-key order through a server-side cursor,
+        encoded with generate_embeddings_batch and upserted with one
+        executemany per batch. The last id written is checkpointed in the same
+        transaction as the batch, so an interrupted run resumes after it.
+        Rows whose stored content hash and model version match are skipped
+        unless ``force`` is set.
+        """
+        batch_size = batch_size or settings.embedding_batch_size
+        
         try:
-            async for db in get_db():
-                result = await db.execute(text("""
-                    SELECT id, bio_text, services_text 
-                    FROM contractor 
-                    WHERE bio_text IS NOT NULL OR services_text IS NOT NULL
-                """))
+            async with AsyncSessionLocal() as read_db, AsyncSessionLocal() as write_db:
+                result = await write_db.execute(text("""
+                    SELECT last_contractor_id, processed, completed_at
+                    FROM embedding_checkpoints WHERE job = :job
+                """), {"job": REEMBED_JOB})
+                checkpoint = result.fetchone()
                 
-                contractors = result.fetchall()
+                after_id = None
+                processed = 0
+                if resume and checkpoint and checkpoint[2] is None:
+                    after_id = checkpoint[0]
+                    processed = checkpoint[1] or 0
+                    logger.info(f"Resuming embedding update after {after_id} ({processed} done)")
                 
-                for contractor in contractors:
-                    contractor_id = contractor[0]
-                    bio_text = contractor[1]
-                    services_text = contractor[2]
+                await write_db.execute(text("""
+                    INSERT INTO embedding_checkpoints (job, last_contractor_id, processed, started_at, updated_at, completed_at)
+                    VALUES (:job, :after_id, :processed, NOW(), NOW(), NULL)
+                    ON CONFLICT (job) DO UPDATE SET
+                        last_contractor_id = EXCLUDED.last_contractor_id,
+                        processed = EXCLUDED.processed,
+                        started_at = CASE WHEN :resumed THEN embedding_checkpoints.started_at ELSE NOW() END,
+                        updated_at = NOW(),
+                        completed_at = NULL
+                """), {"job": REEMBED_JOB, "after_id": after_id, "processed": processed, "resumed": after_id is not None})
+                await write_db.commit()
+                
+                select_sql = """
+                    SELECT c.id, c.bio_text, c.services_text, e.content_hash, e.model_version
+                    FROM contractor c
+                    LEFT JOIN contractor_embeddings e ON e.contractor_id = c.id
+                    WHERE (c.bio_text IS NOT NULL OR c.services_text IS NOT NULL)
+                """
+                select_params = {}
+                if after_id is not None:
+                    select_sql += " AND c.id > :after_id"
+                    select_params["after_id"] = after_id
+                select_sql += " ORDER BY c.id"
+                
+                stream = await read_db.stream(
+                    text(select_sql).execution_options(yield_per=batch_size),
+                    select_params
+                )
+                
+                skipped = 0
+                async for batch in stream.partitions(batch_size):
+                    changed = await self._embed_changed(write_db, batch, force=force)
+                    skipped += len(batch) - len(changed)
                     
-                    await self.update_contractor_embeddings(contractor_id, bio_text, services_text)
+                    processed += len(batch)
+                    await write_db.execute(text("""
+                        UPDATE embedding_checkpoints
+                        SET last_contractor_id = :last_id, processed = :processed, updated_at = NOW()
+                        WHERE job = :job
+                    """), {"job": REEMBED_JOB, "last_id": batch[-1][0], "processed": processed})
+                    await write_db.commit()
+                    self._add_to_index(changed)
+                    
+                    logger.info(f"Embedded {processed} contractors so far ({skipped} unchanged)")
+                
+                await write_db.execute(text("""
+                    UPDATE embedding_checkpoints SET completed_at = NOW(), updated_at = NOW()
+                    WHERE job = :job
+                """), {"job": REEMBED_JOB})
+                await write_db.commit()
                 
-                logger.info(f"Updated embeddings for {len(contractors)} contractors")
+                logger.info(f"Updated embeddings for {processed} contractors")
+                return {"processed": processed, "skipped": skipped, "resumed_from": str(after_id) if after_id else None}
                 
         except Exception as e:
             logger.error(f"Error updating all embeddings: {e}")
             raise
+
+    def _add_to_index(self, pairs) -> None:
+        """Apply committed ``(contractor_id, embedding)`` pairs to the in-process index."""
+        if self.index is None:
+            return
+        for contractor_id, embedding in pairs:
+            self.index.add(contractor_id, embedding)
+
+    async def _embed_changed(self, db, rows, force: bool = False) -> List[Tuple[Any, List[float]]]:
+        """Encode and upsert ``(id, bio_text, services_text, content_hash, model_version)`` rows
+        whose text or model changed, without committing.
+
+        Returns the ``(contractor_id, embedding)`` pairs written; callers pass them
+        to _add_to_index once the transaction commits.
+        """
+        pending = []
+        for row in rows:
+            combined_text = self._combined_text(row[1], row[2])
+            if force or not self._is_current((row[3], row[4]), combined_text):
+                pending.append((row[0], combined_text))
+        if not pending:
+            return []
+        
+        embeddings = await self.generate_embeddings_batch([combined_text for _, combined_text in pending])
+        await db.execute(text(UPSERT_EMBEDDING_SQL), [
+            self._embedding_params(contractor_id, combined_text, embedding)
+            for (contractor_id, combined_text), embedding in zip(pending, embeddings)
+        ])
+        return [(contractor_id, embedding) for (contractor_id, _), embedding in zip(pending, embeddings)]
+    
+    async def sync_embeddings(self, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """Embed contractors changed since the last sync.
+        
+        Walks contractor in (updated_at, id) order from the stored watermark
+        and re-encodes only rows whose content hash or model version differ,
+        so a run costs time proportional to what changed. The watermark
+        advances in the same transaction as each batch. Rows updated in the
+        last EMBEDDING_SYNC_LAG_SECONDS are left for the next run, so
+        transactions still in flight when the watermark passes them are not
+        missed.
+        """
+        batch_size = batch_size or settings.embedding_batch_size
+        
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(text("""
+                    SELECT watermark, last_contractor_id FROM embedding_checkpoints WHERE job = :job
+                """), {"job": SYNC_JOB})
+                checkpoint = result.fetchone()
+                watermark, last_id = (checkpoint[0], checkpoint[1]) if checkpoint else (None, None)
+                started_from = watermark
+                
+                await db.execute(text("""
+                    INSERT INTO embedding_checkpoints (job, watermark, last_contractor_id, processed, started_at, updated_at, completed_at)
+                    VALUES (:job, NULL, NULL, 0, NOW(), NOW(), NULL)
+                    ON CONFLICT (job) DO UPDATE SET processed = 0, started_at = NOW(), updated_at = NOW(), completed_at = NULL
+                """), {"job": SYNC_JOB})
+                await db.commit()
+                
+                scanned = 0
+                embedded = 0
+                while True:
+                    select_sql = """
+                        SELECT c.id, c.bio_text, c.services_text, e.content_hash, e.model_version, c.updated_at
+                        FROM contractor c
+                        LEFT JOIN contractor_embeddings e ON e.contractor_id = c.id
+                        WHERE c.updated_at < NOW() - make_interval(secs => :lag)
+                    """
+                    params = {"lag": float(settings.embedding_sync_lag_seconds), "limit": batch_size}
+                    if watermark is not None:
+                        select_sql += " AND (c.updated_at, c.id) > (:watermark, :last_id)"
+                        params.update(watermark=watermark, last_id=last_id)
+                    select_sql += " ORDER BY c.updated_at, c.id LIMIT :limit"
+                    
+                    with timed("embedding_sync_scan"):
+                        batch = (await db.execute(text(select_sql), params)).fetchall()
+                    if not batch:
+                        break
+                    
+                    changed = await self._embed_changed(db, batch)
+                    embedded += len(changed)
+                    scanned += len(batch)
+                    watermark, last_id = batch[-1][5], batch[-1][0]
+                    await db.execute(text("""
+                        UPDATE embedding_checkpoints
+                        SET watermark = :watermark, last_contractor_id = :last_id, processed = :processed, updated_at = NOW()
+                        WHERE job = :job
+                    """), {"job": SYNC_JOB, "watermark": watermark, "last_id": last_id, "processed": scanned})
+                    await db.commit()
+                    self._add_to_index(changed)
+                    
+                    logger.info(f"Embedding sync scanned {scanned} changed contractors, re-embedded {embedded}")
+                
+                await db.execute(text("""
+                    UPDATE embedding_checkpoints SET completed_at = NOW(), updated_at = NOW() WHERE job = :job
+                """), {"job": SYNC_JOB})
+                await db.commit()
+                
+                return {
+                    "scanned": scanned,
+                    "embedded": embedded,
+                    "skipped": scanned - embedded,
+                    "from_watermark": started_from.isoformat() if started_from else None,
+                    "watermark": watermark.isoformat() if watermark else None
+                }
+                
+        except Exception as e:
+            logger.error(f"Error syncing embeddings: {e}")
+            raise
@@ -0,0 +1,210 @@
+import csv
+import math
+import logging
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from config import settings
+from database import get_db
+from repository import queries
+from models import SearchFilters
+from search_filters import build_filter_sql
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+
+# Approximate city centroids used to place contractors that only have a city,
+# keyed by _normalize_city
+CITY_CENTROIDS: Dict[str, Tuple[float, float]] = {
+    "toronto": (43.6532, -79.3832),
+    "hamilton": (43.2557, -79.8711),
+    "mississauga": (43.5890, -79.6441),
+    "brampton": (43.7315, -79.7624),
+    "markham": (43.8561, -79.3370),
+    "richmond hill": (43.8828, -79.4403),
+    "vaughan": (43.8361, -79.4983),
+    "oakville": (43.4675, -79.6877),
+    "burlington": (43.3255, -79.7990),
+    "milton": (43.5183, -79.8774),
+    "ajax": (43.8509, -79.0204),
+    "pickering": (43.8384, -79.0868),
+    "whitby": (43.8975, -78.9429),
+    "oshawa": (43.8971, -78.8658),
+    "kitchener": (43.4516, -80.4925),
+    "waterloo": (43.4643, -80.5204),
+    "cambridge": (43.3616, -80.3144),
+    "guelph": (43.5448, -80.2482),
+    "london": (42.9849, -81.2453),
+    "st catharines": (43.1594, -79.2469),
+    "niagara falls": (43.0896, -79.0849),
+    "kingston": (44.2312, -76.4860),
+    "ottawa": (45.4215, -75.6972),
+    "windsor": (42.3149, -83.0364),
+    "barrie": (44.3894, -79.6903),
+    "sudbury": (46.4917, -80.9930),
+    "thunder bay": (48.3809, -89.2477),
+    "sault ste marie": (46.5219, -84.3461),
+    "montreal": (45.5017, -73.5673),
+    "quebec city": (46.8139, -71.2080),
+    "vancouver": (49.2827, -123.1207),
+    "victoria": (48.4284, -123.3656),
+    "calgary": (51.0447, -114.0719),
+    "edmonton": (53.5461, -113.4938),
+    "regina": (50.4452, -104.6189),
+    "saskatoon": (52.1332, -106.6700),
+    "winnipeg": (49.8951, -97.1384),
+    "halifax": (44.6488, -63.5752),
+}
+
+# Forward sortation areas (first three postal characters) seen in our data;
+# extend with GEO_CENTROIDS_FILE for full coverage
+FSA_CENTROIDS: Dict[str, Tuple[float, float]] = {
+    "M5H": (43.6500, -79.3840),
+    "M5V": (43.6420, -79.3950),
+    "M4W": (43.6790, -79.3770),
+    "L8P": (43.2560, -79.8730),
+    "L5B": (43.5890, -79.6440),
+    "L6H": (43.4800, -79.7200),
+    "L7R": (43.3250, -79.7990),
+    "N2L": (43.4720, -80.5400),
+    "K1P": (45.4210, -75.6990),
+}
+
+
+def _normalize_city(city: str) -> str:
+    """Lowercase without accents; hyphens and periods become spaces (Trois-Rivières, Sault Ste. Marie)."""
+    city = unicodedata.normalize("NFKD", city)
+    city = "".join(ch for ch in city if not unicodedata.combining(ch))
+    return " ".join(city.lower().replace("-", " ").replace(".", " ").split())
+
+
+# Sets coordinates from key/lat/lon arrays for rows whose key_sql matches a key
+BACKFILL_SQL = """
+UPDATE contractor c
+SET latitude = v.lat, longitude = v.lon, updated_at = NOW()
+FROM unnest(CAST(:keys AS text[]), CAST(:lats AS float8[]), CAST(:lons AS float8[])) AS v(key, lat, lon)
+WHERE c.latitude IS NULL AND {key_sql} = v.key
+"""
+
+
+def _centroid_params(table: Dict[str, Tuple[float, float]]) -> Dict[str, Any]:
+    return {
+        "keys": list(table.keys()),
+        "lats": [lat for lat, _ in table.values()],
+        "lons": [lon for _, lon in table.values()]
+    }
+
+
+def load_centroids_file(path: str):
+    """Merge a ``key,lat,lon`` CSV into the centroid tables.
+
+    Keys that look like an FSA (letter-digit-letter) go to the postal table,
+    everything else is treated as a city name.
+    """
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            key = row["key"].strip()
+            point = (float(row["lat"]), float(row["lon"]))
+            if len(key) == 3 and key[0].isalpha() and key[1].isdigit() and key[2].isalpha():
+                FSA_CENTROIDS[key.upper()] = point
+            else:
+                CITY_CENTROIDS[_normalize_city(key)] = point
+
+
+if settings.geo_centroids_file:
+    load_centroids_file(settings.geo_centroids_file)
+
+
+def geocode(city: Optional[str] = None, postal: Optional[str] = None) -> Optional[Tuple[float, float]]:
+    """Best-effort (lat, lon) from the local centroid tables, postal code first."""
+    if postal:
+        fsa = postal.replace(" ", "").upper()[:3]
+        if fsa in FSA_CENTROIDS:
+            return FSA_CENTROIDS[fsa]
+    if city:
+        return CITY_CENTROIDS.get(_normalize_city(city))
+    return None
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def add_distances(results: List[Dict[str, Any]], lat: float, lon: float) -> List[Dict[str, Any]]:
+    for item in results:
+        if item.get("latitude") is not None and item.get("longitude") is not None:
+            item["distance_km"] = round(haversine_km(lat, lon, item["latitude"], item["longitude"]), 2)
+    return results
+
+
+class GeoService:
+    """Nearest-N lookups and coordinate backfill on top of the earthdistance GiST index."""
+
+    async def nearest(
+        self,
+        lat: float,
+        lon: float,
+        limit: int = 10,
+        filters: Optional[SearchFilters] = None
+    ) -> List[Dict[str, Any]]:
+        filter_sql, filter_params = build_filter_sql(filters)
+
+        # <-> on cube is a KNN operator, so the GiST index returns rows in
+        # distance order without scanning every contractor
+        rows = await queries.fetch(f"""
+            SELECT
+                c.id, c.name, c.phone, c.email, c.city, c.province,
+                c.bio_text, c.services_text, c.has_license, c.has_insurance,
+                c.hourly_rate_min, c.hourly_rate_max, c.created_at,
+                c.latitude, c.longitude,
+                earth_distance(ll_to_earth(:lat, :lon), ll_to_earth(c.latitude, c.longitude)) / 1000.0 as distance_km
+            FROM contractor c
+            WHERE c.latitude IS NOT NULL AND c.longitude IS NOT NULL{filter_sql}
+            ORDER BY ll_to_earth(c.latitude, c.longitude) <-> ll_to_earth(:lat, :lon)
+            LIMIT :limit
+        """, {"lat": lat, "lon": lon, "limit": limit, **filter_params})
+
+        results = []
+        for c in rows:
+            result = dict(c)
+            result["id"] = str(result["id"])
+            result["distance_km"] = round(float(result["distance_km"]), 2)
+            results.append(result)
+        return results
+
+    async def backfill_coordinates(self) -> int:
+        """Fill missing coordinates from the centroid tables, postal FSA first.
+
+        Cities are normalized in Python exactly as ``geocode`` does it: the
+        distinct raw city values still missing coordinates are looked up
+        with ``_normalize_city`` and the matches applied in one UPDATE.
+        """
+        updated = 0
+        async for db in get_db():
+            result = await db.execute(
+                text(BACKFILL_SQL.format(key_sql="upper(left(replace(c.postal, ' ', ''), 3))")),
+                _centroid_params(FSA_CENTROIDS)
+            )
+            updated += result.rowcount or 0
+
+            cities = await db.execute(text("""
+                SELECT DISTINCT city FROM contractor
+                WHERE latitude IS NULL AND city IS NOT NULL
+            """))
+            city_points = {}
+            for (city,) in cities.fetchall():
+                point = CITY_CENTROIDS.get(_normalize_city(city))
+                if point:
+                    city_points[city] = point
+            if city_points:
+                result = await db.execute(text(BACKFILL_SQL.format(key_sql="c.city")), _centroid_params(city_points))
+                updated += result.rowcount or 0
+
+            await db.commit()
+            logger.info(f"Backfilled coordinates for {updated} contractors")
+        return updated
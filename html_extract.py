@@ -0,0 +1,186 @@
+import re
+import logging
+from typing import Any, Dict, List, Union
+
+try:
+    from lxml import etree
+except ImportError:  # IngestService falls back to BeautifulSoup
+    etree = None
+
+logger = logging.getLogger(__name__)
+
+SECTION_CLASS_RE = re.compile(r"contractor|professional|profile|contact|info", re.IGNORECASE)
+
+CITY_RE = re.compile(
+    r"\b(Toronto|Hamilton|Mississauga|Brampton|Markham|Richmond Hill|Vaughan|Oakville|Burlington|Ajax|Kitchener|Waterloo|Guelph|London|Ottawa|Windsor|Barrie|Sudbury|Thunder Bay|Sault Ste Marie)\b",
+    re.IGNORECASE
+)
+
+# Full names match in any case; the two-letter codes only in upper case,
+# otherwise every "on" or "ab" in running text counts as a province
+PROVINCE_RE = re.compile(
+    r"\b((?i:Ontario|Quebec|British Columbia|Alberta|Manitoba|Saskatchewan|Nova Scotia|New Brunswick|Newfoundland|Prince Edward Island|Northwest Territories|Yukon|Nunavut)"
+    r"|ON|QC|BC|AB|MB|SK|NS|NB|NL|PEI|NT|YT|NU)\b"
+)
+
+# Substring keyword sets, matched in one scan each over the lowercased text
+LICENSE_RE = re.compile(r"licensed|license|certified|certification|registered|bonded")
+INSURANCE_RE = re.compile(r"insured|insurance|liability|coverage|bonded")
+
+# Elements whose text never reaches the reader
+INVISIBLE_TAGS = {"script", "style", "noscript", "template", "svg"}
+
+_PARSER = etree.HTMLParser(remove_comments=True, remove_pis=True) if etree is not None else None
+_UTF8_PARSER = etree.HTMLParser(remove_comments=True, remove_pis=True, encoding="utf-8") if etree is not None else None
+
+
+def available() -> bool:
+    return etree is not None
+
+
+def _text(element) -> str:
+    # Same result as BeautifulSoup's get_text(strip=True)
+    return "".join(part.strip() for part in element.itertext())
+
+
+def _has_class(element, name: str) -> bool:
+    return name in element.get("class", "").split()
+
+
+def _parse(html: Union[str, bytes], max_bytes: int):
+    if isinstance(html, str):
+        data = html.encode("utf-8", errors="replace")
+        parser = _UTF8_PARSER
+    else:
+        data = html
+        parser = _PARSER
+
+    if max_bytes and len(data) > max_bytes:
+        # lxml recovers from the truncated markup
+        logger.debug(f"Truncating {len(data)} byte document to {max_bytes}")
+        data = data[:max_bytes]
+
+    if not data.strip():
+        return None
+    try:
+        return etree.fromstring(data, parser)
+    except etree.XMLSyntaxError:
+        return None
+
+
+def extract_contractor(html: Union[str, bytes], url: str, max_bytes: int = 0) -> Dict[str, Any]:
+    """Extract contractor fields from a page in one walk over an lxml tree.
+
+    The walk picks up the first h1/title, tel: and mailto: links (preferring
+    tel: links inside contact/profile sections), the bio and services
+    candidates and the visible text. City, province and the license and
+    insurance keywords are then matched against that visible text only, so
+    scripts, styles and attribute values no longer produce false hits.
+    Documents longer than ``max_bytes`` are truncated before parsing.
+    """
+    root = _parse(html, max_bytes)
+
+    h1 = None
+    title = None
+    section_phone = None
+    phone = None
+    email = None
+    bio_div = None
+    first_p = None
+    services_ul = None
+    services_div = None
+    visible: List[str] = []
+
+    sections: List[bool] = []  # open div/section elements, True for contact/profile ones
+    section_depth = 0
+    hidden_depth = 0  # open script/style elements
+
+    walk = etree.iterwalk(root, events=("start", "end")) if root is not None else ()
+    for event, element in walk:
+        tag = element.tag
+        if not isinstance(tag, str):
+            continue
+
+        if event == "end":
+            if tag in INVISIBLE_TAGS:
+                hidden_depth -= 1
+            if (tag == "div" or tag == "section") and sections.pop():
+                section_depth -= 1
+            if not hidden_depth and element.tail:
+                visible.append(element.tail)
+            continue
+
+        if tag in INVISIBLE_TAGS:
+            hidden_depth += 1
+            continue
+        if not hidden_depth and element.text:
+            visible.append(element.text)
+
+        if tag == "a":
+            href = element.get("href")
+            if href:
+                if href.startswith("tel:"):
+                    if phone is None:
+                        phone = href[4:]
+                    if section_depth and section_phone is None:
+                        section_phone = href[4:]
+                elif href.startswith("mailto:") and email is None:
+                    email = href[7:]
+        elif tag == "div" or tag == "section":
+            is_section = SECTION_CLASS_RE.search(element.get("class", "")) is not None
+            sections.append(is_section)
+            section_depth += is_section
+            if tag == "div":
+                if bio_div is None and _has_class(element, "bio"):
+                    bio_div = element
+                elif services_div is None and _has_class(element, "services"):
+                    services_div = element
+        elif tag == "p":
+            if first_p is None:
+                first_p = element
+        elif tag == "ul":
+            if services_ul is None and _has_class(element, "services"):
+                services_ul = element
+        elif tag == "h1":
+            if h1 is None:
+                h1 = element
+        elif tag == "title":
+            if title is None:
+                title = element
+
+    name = h1 if h1 is not None else title
+    name = _text(name) if name is not None else "Unknown"
+
+    bio_text = None
+    bio_tag = bio_div if bio_div is not None else first_p
+    if bio_tag is not None:
+        bio_text = _text(bio_tag)[:500]
+
+    services_text = None
+    services_list = services_ul if services_ul is not None else services_div
+    if services_list is not None:
+        services_text = ", ".join(_text(li) for li in services_list.iter("li"))
+    elif bio_text:
+        services_text = bio_text[:500]
+
+    content_text = (bio_text or "") + " " + " ".join(visible)
+
+    city_match = CITY_RE.search(content_text)
+    province_match = PROVINCE_RE.search(content_text)
+
+    content_lower = content_text.lower()
+
+    return {
+        "name": name,
+        "phone": section_phone or phone,
+        "email": email,
+        "website": url,
+        "city": city_match.group(1) if city_match else None,
+        "province": province_match.group(1) if province_match else None,
+        "bio_text": bio_text,
+        "services_text": services_text,
+        "has_license": LICENSE_RE.search(content_lower) is not None,
+        "has_insurance": INSURANCE_RE.search(content_lower) is not None,
+        "hourly_rate_min": None,
+        "hourly_rate_max": None,
+    }
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceQueueFull(Exception):
+    """Raised when too many encode calls are already waiting for the model."""
+
+
+# Per-process model used by the process-pool backend
+_worker_model = None
+
+
+def _init_worker(model_name: str):
+    global _worker_model
+    from sentence_transformers import SentenceTransformer
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _worker_encode(texts: List[str]) -> np.ndarray:
+    return _worker_model.encode(texts, convert_to_tensor=False)
+
+
+class InferenceExecutor:
+    """Runs SentenceTransformer inference off the event loop.
+
+    ``mode="thread"`` shares one model between a small thread pool (torch
+    releases the GIL while encoding); ``mode="process"`` loads a copy of the
+    model in every worker process. At most ``max_queue`` calls may be pending
+    at once and each call is bounded by ``timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        mode: str = "thread",
+        max_workers: int = 1,
+        max_queue: int = 64,
+        timeout: float = 10.0
+    ):
+        self.model_name = model_name
+        self.mode = mode
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.pending = 0
+
+        self._model = None
+        self._executor: Executor
+        if mode == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_name,)
+            )
+        elif mode == "thread":
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(model_name)
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        else:
+            raise ValueError(f"Unknown inference executor mode: {mode}")
+
+    def _submit(self, texts: List[str]):
+        if self._model is not None:
+            return self._executor.submit(self._model.encode, texts, convert_to_tensor=False)
+        return self._executor.submit(_worker_encode, texts)
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode ``texts`` and return a ``(len(texts), dim)`` array."""
+        if self.pending >= self.max_queue:
+            raise InferenceQueueFull(f"{self.pending} encode calls already pending")
+
+        self.pending += 1
+        future = self._submit(texts)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            # Drops the call if a worker has not picked it up yet
+            future.cancel()
+            logger.error(f"Encoding {len(texts)} texts timed out after {self.timeout}s")
+            raise
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
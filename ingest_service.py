@@ -1,29 +1,222 @@
 import asyncio
+import random
 import re
-from typing import Dict, Any, Optional
-from datetime import datetime
-import requests
+import time
+import uuid
+from typing import Dict, Any, Optional, List, AsyncIterator, Tuple
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+import httpx
 from bs4 import BeautifulSoup
+from sqlalchemy import text
 import logging
 
+from config import settings
 from database import get_db, ContractorDB
+from geo_service import geocode
+from dedupe import ContractorDeduplicator
+import html_extract
+from metrics import timed
 
 logger = logging.getLogger(__name__)
 
+# ids are generated client-side so a whole batch is one executemany without RETURNING
+INSERT_CONTRACTOR_SQL = """
+INSERT INTO contractor (
+    id, name, phone, email, website, city, province,
+    bio_text, services_text, has_license, has_insurance,
+    hourly_rate_min, hourly_rate_max, latitude, longitude, created_at, updated_at
+) VALUES (
+    :id, :name, :phone, :email, :website, :city, :province,
+    :bio_text, :services_text, :has_license, :has_insurance,
+    :hourly_rate_min, :hourly_rate_max, :latitude, :longitude, NOW(), NOW()
+)
+"""
+
+# Duplicates only fill in what the existing contractor is missing
+MERGE_CONTRACTOR_SQL = """
+UPDATE contractor SET
+    phone = COALESCE(phone, :phone),
+    email = COALESCE(email, :email),
+    website = COALESCE(website, :website),
+    city = COALESCE(city, :city),
+    province = COALESCE(province, :province),
+    bio_text = COALESCE(bio_text, :bio_text),
+    services_text = COALESCE(services_text, :services_text),
+    has_license = COALESCE(has_license, FALSE) OR :has_license,
+    has_insurance = COALESCE(has_insurance, FALSE) OR :has_insurance,
+    hourly_rate_min = COALESCE(hourly_rate_min, :hourly_rate_min),
+    hourly_rate_max = COALESCE(hourly_rate_max, :hourly_rate_max),
+    latitude = COALESCE(latitude, :latitude),
+    longitude = COALESCE(longitude, :longitude),
+    updated_at = NOW()
+WHERE id = :id
+"""
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HostRateLimiter:
+    """Spaces requests to the same host at least ``1 / rate`` seconds apart.
+
+    Each caller reserves the next free slot for its host and sleeps until
+    it, so concurrent callers queue up without a lock.
+    """
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+
+    async def wait(self, host: str):
+        if not self.interval:
+            return
+
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(host, 0.0))
+        self._next_slot[host] = slot + self.interval
+        if len(self._next_slot) > 10000:
+            # Forget hosts whose slots are in the past
+            self._next_slot = {h: t for h, t in self._next_slot.items() if t > now}
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class BulkScrapeJob:
+    def __init__(self, urls: List[str]):
+        self.id = uuid.uuid4().hex
+        self.urls = urls
+        self.status = "running"
+        self.fetched = 0
+        self.failed = 0
+        self.saved = 0
+        self.merged = 0
+        self.queued = 0
+        self.embedded = 0
+        self.errors: List[Dict[str, str]] = []
+        self.started_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = ((self.finished_at or datetime.utcnow()) - self.started_at).total_seconds()
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(self.urls),
+            "fetched": self.fetched,
+            "failed": self.failed,
+            "saved": self.saved,
+            "merged": self.merged,
+            "queued": self.queued,
+            "embedded": self.embedded,
+            "pages_per_second": round((self.fetched + self.failed) / elapsed, 2) if elapsed > 0 else 0.0,
+            "errors": self.errors,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
 class IngestService:
-    def __init__(self):
+    def __init__(self, embeddings=None, embed_queue=None):
         print("start scrape")
+        self.embeddings = embeddings
+        # When set, saved contractors are queued for embedding instead of embedded inline
+        self.embed_queue = embed_queue
+        self.rate_limiter = HostRateLimiter(settings.scrape_per_host_rps)
+        # Global cap on in-flight fetches, shared by single and bulk scrapes
+        self._fetch_slots = asyncio.Semaphore(settings.scrape_max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+        self.jobs: Dict[str, BulkScrapeJob] = {}
+        self.dedupe = None
+        self.dedupe_loader = None
+        if settings.dedupe_enabled:
+            self.dedupe = ContractorDeduplicator(
+                num_perm=settings.dedupe_num_perm,
+                bands=settings.dedupe_bands,
+                threshold=settings.dedupe_threshold
+            )
+        self._job_tasks = set()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # One pooled client for every fetch, so connections are reused per host
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.scrape_timeout),
+                limits=httpx.Limits(
+                    max_connections=settings.scrape_max_connections,
+                    max_keepalive_connections=settings.scrape_max_connections
+                ),
+                follow_redirects=True,
+                headers={"User-Agent": settings.scrape_user_agent}
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None and "retry-after" in response.headers:
+            retry_after = response.headers["retry-after"]
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                # HTTP-date form
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    delay = (retry_at - datetime.now(tz=retry_at.tzinfo)).total_seconds()
+                except (TypeError, ValueError):
+                    delay = 0.0
+            if delay > 0:
+                return min(delay, settings.scrape_backoff_max)
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(settings.scrape_backoff_max, settings.scrape_backoff_base * 2 ** attempt))
+
+    async def fetch(self, url: str) -> str:
+        """GET a page, retrying connection errors, 429 and 5xx with backoff."""
+        host = urlparse(url).netloc
+        retries = settings.scrape_retries
+
+        for attempt in range(retries + 1):
+            await self.rate_limiter.wait(host)
+            try:
+                async with self._fetch_slots:
+                    with timed("scrape_fetch"):
+                        response = await self.client.get(url)
+            except httpx.TransportError as e:
+                if attempt == retries:
+                    logger.error(f"fail: {url}: {e}")
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < retries:
+                await asyncio.sleep(self._backoff(attempt, response))
+                continue
+
+            try:
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                logger.error(f"fail: {e}")
+                raise
+            return response.text
 
     async def scrape_url(self, url):
-        print(f"URL: {url}")
-        try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            html = response.text
-        except requests.exceptions.RequestException as e:
-            logger.error(f"fail: {e}")
-            raise
+        logger.debug(f"URL: {url}")
+        html = await self.fetch(url)
+        # Parsing is CPU-bound, keep it off the event loop
+        with timed("scrape_parse"):
+            return await asyncio.to_thread(self.parse_html, html, url)
+
+    def parse_html(self, html: str, url: str) -> Dict[str, Any]:
+        if html_extract.available():
+            return html_extract.extract_contractor(html, url, max_bytes=settings.scrape_max_document_bytes)
+        return self._parse_html_bs4(html[:settings.scrape_max_document_bytes or None], url)
 
+    def _parse_html_bs4(self, html: str, url: str) -> Dict[str, Any]:
+        # Pure-Python fallback for when lxml is not installed
         soup = BeautifulSoup(html, 'html.parser')
 
         name = soup.find('h1') or soup.find('title')
@@ -95,4 +288,226 @@ class IngestService:
             "has_insurance": has_insurance,
             "hourly_rate_min": hourly_rate_min,
             "hourly_rate_max": hourly_rate_max,
-        }
\ No newline at end of file
+        }
+
+    async def scrape_many(self, urls: List[str]) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+        """Scrape URLs concurrently, yielding ``(url, data, error)`` as each finishes.
+
+        A fixed pool of workers pulls from a queue, so memory stays flat no
+        matter how many URLs are passed in.
+        """
+        if not urls:
+            return
+
+        pending: asyncio.Queue = asyncio.Queue()
+        for url in urls:
+            pending.put_nowait(url)
+        done: asyncio.Queue = asyncio.Queue()
+
+        async def worker():
+            while True:
+                try:
+                    url = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    await done.put((url, await self.scrape_url(url), None))
+                except Exception as e:
+                    await done.put((url, None, str(e) or type(e).__name__))
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(settings.scrape_max_concurrency, len(urls)))]
+        try:
+            for _ in range(len(urls)):
+                yield await done.get()
+        finally:
+            for task in workers:
+                task.cancel()
+
+    def _contractor_row(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        coordinates = geocode(data.get('city')) or (None, None)
+        return {
+            "id": uuid.uuid4(),
+            "name": data.get('name') or 'Unknown',
+            "phone": data.get('phone'),
+            "email": data.get('email'),
+            "website": data.get('website'),
+            "city": data.get('city'),
+            "province": data.get('province'),
+            "bio_text": data.get('bio_text'),
+            "services_text": data.get('services_text'),
+            "has_license": data.get('has_license', False),
+            "has_insurance": data.get('has_insurance', False),
+            "hourly_rate_min": data.get('hourly_rate_min'),
+            "hourly_rate_max": data.get('hourly_rate_max'),
+            "latitude": coordinates[0],
+            "longitude": coordinates[1]
+        }
+
+    async def save_contractors(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Save scraped contractors, merging duplicates instead of inserting them.
+
+        Returns one result per record with ``contractor_id`` and ``action``:
+        "inserted", "merged" (an existing contractor gained bio or services
+        text and needs re-embedding) or "duplicate" (nothing new to embed).
+        Results that need embedding carry the saved ``bio_text`` and
+        ``services_text``.
+        """
+        if not records:
+            return []
+
+        inserts: Dict[uuid.UUID, Dict[str, Any]] = {}
+        merges: List[Dict[str, Any]] = []
+        outcomes = []
+        for data in records:
+            row = self._contractor_row(data)
+            match = self.dedupe.find(row) if self.dedupe is not None else None
+            if match is None:
+                inserts[row["id"]] = row
+                outcomes.append(row["id"])
+                if self.dedupe is not None:
+                    # Reserved now so the rest of the batch and concurrent saves see it
+                    self.dedupe.add(row["id"], row)
+                continue
+
+            contractor_id, reason, similarity = match
+            logger.info(f"{row['website']} is a duplicate of contractor {contractor_id} ({reason}, {similarity:.2f})")
+            outcomes.append(contractor_id)
+            pending = inserts.get(contractor_id)
+            if pending is not None:
+                # Duplicate within this batch, fold it into the row about to be inserted
+                for key, value in row.items():
+                    if pending[key] is None:
+                        pending[key] = value
+                pending["has_license"] = bool(pending["has_license"] or row["has_license"])
+                pending["has_insurance"] = bool(pending["has_insurance"] or row["has_insurance"])
+            else:
+                row["id"] = contractor_id
+                merges.append(row)
+
+        texts: Dict[Any, Tuple[Optional[str], Optional[str]]] = {}
+        changed = set()
+        try:
+            async for db in get_db():
+                with timed("scrape_save"):
+                    if merges:
+                        result = await db.execute(
+                            text("SELECT id, bio_text, services_text FROM contractor WHERE id = ANY(:ids)"),
+                            {"ids": list({row["id"] for row in merges})}
+                        )
+                        texts = {row[0]: (row[1], row[2]) for row in result.fetchall()}
+                        for row in merges:
+                            bio_text, services_text = texts.get(row["id"], (None, None))
+                            merged = (bio_text or row["bio_text"], services_text or row["services_text"])
+                            if merged != (bio_text, services_text):
+                                changed.add(row["id"])
+                            texts[row["id"]] = merged
+
+                    if inserts:
+                        await db.execute(text(INSERT_CONTRACTOR_SQL), list(inserts.values()))
+                    if merges:
+                        await db.execute(text(MERGE_CONTRACTOR_SQL), merges)
+                    await db.commit()
+        except Exception:
+            if self.dedupe is not None:
+                for contractor_id in inserts:
+                    self.dedupe.remove(contractor_id)
+            raise
+
+        results = []
+        reported = set()
+        for contractor_id in outcomes:
+            # Only the first result per contractor needs embedding
+            if contractor_id in reported:
+                results.append({"contractor_id": contractor_id, "action": "duplicate"})
+                continue
+            reported.add(contractor_id)
+
+            if contractor_id in inserts:
+                row = inserts[contractor_id]
+                results.append({"contractor_id": contractor_id, "action": "inserted",
+                                "bio_text": row["bio_text"], "services_text": row["services_text"]})
+            elif contractor_id in changed:
+                bio_text, services_text = texts[contractor_id]
+                results.append({"contractor_id": contractor_id, "action": "merged",
+                                "bio_text": bio_text, "services_text": services_text})
+            else:
+                results.append({"contractor_id": contractor_id, "action": "duplicate"})
+        return results
+
+    async def _save_batch(self, job: BulkScrapeJob, batch: List[Dict[str, Any]]):
+        results = await self.save_contractors(batch)
+        job.saved += sum(1 for r in results if r["action"] == "inserted")
+        job.merged += sum(1 for r in results if r["action"] != "inserted")
+
+        to_embed = [
+            (r["contractor_id"], r["bio_text"], r["services_text"])
+            for r in results if r["action"] in ("inserted", "merged")
+        ]
+        if not to_embed:
+            return
+        if self.embed_queue is not None:
+            # Embedding workers pick these up; the scrape keeps going at fetch speed
+            job.queued += await self.embed_queue.enqueue([
+                {"contractor_id": str(contractor_id)} for contractor_id, _, _ in to_embed
+            ])
+        elif self.embeddings is not None:
+            try:
+                job.embedded += await self.embeddings.update_embeddings_batch(to_embed)
+            except Exception as e:
+                logger.error(f"Failed to embed scraped batch: {e}")
+
+    async def run_bulk_scrape(self, job: BulkScrapeJob):
+        batch: List[Dict[str, Any]] = []
+        try:
+            async for url, data, error in self.scrape_many(job.urls):
+                if error is not None:
+                    job.failed += 1
+                    if len(job.errors) < 100:
+                        job.errors.append({"url": url, "error": error})
+                    continue
+
+                job.fetched += 1
+                batch.append(data)
+                if len(batch) >= settings.scrape_save_batch_size:
+                    await self._save_batch(job, batch)
+                    batch = []
+
+            await self._save_batch(job, batch)
+            job.status = "completed"
+        except Exception as e:
+            logger.error(f"Bulk scrape {job.id} failed: {e}")
+            job.status = "failed"
+            job.errors.append({"url": "", "error": str(e)})
+            raise
+        finally:
+            job.finished_at = datetime.utcnow()
+            logger.info(f"Bulk scrape {job.id}: {job.to_dict()}")
+
+    def _prune_jobs(self):
+        """Forget finished jobs past the retention period or beyond the retained count."""
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.scrape_job_retention_seconds)
+        finished = [job for job in self.jobs.values() if job.finished_at is not None]
+        finished.sort(key=lambda job: job.finished_at)
+        excess = len(finished) - settings.scrape_jobs_retained
+        for i, job in enumerate(finished):
+            if i < excess or job.finished_at < cutoff:
+                del self.jobs[job.id]
+
+    def start_bulk_scrape(self, urls: List[str], on_complete=None) -> BulkScrapeJob:
+        """Start scraping ``urls`` in the background; poll ``jobs[job.id]`` for progress.
+
+        Running jobs are always kept; finished ones are pruned as new jobs start.
+        """
+        self._prune_jobs()
+        job = BulkScrapeJob(list(dict.fromkeys(urls)))
+        self.jobs[job.id] = job
+
+        async def run():
+            await self.run_bulk_scrape(job)
+            if on_complete is not None:
+                await on_complete(job)
+
+        task = asyncio.create_task(run())
+        self._job_tasks.add(task)
+        task.add_done_callback(self._job_tasks.discard)
+        return job
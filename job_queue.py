@@ -0,0 +1,297 @@
+import asyncio
+import heapq
+import json
+import time
+import uuid
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List
+
+from metrics import JOB_QUEUE_JOBS, JOB_QUEUE_LAG, JOB_RESULTS, timed
+
+logger = logging.getLogger(__name__)
+
+# Moves expired leases and due retries back to pending, then leases up to
+# ARGV[3] jobs from the oldest end of the pending list. Atomic, so several
+# workers (or processes) can claim from one queue.
+CLAIM_SCRIPT = """
+local now = tonumber(ARGV[1])
+for _, source in ipairs({KEYS[2], KEYS[3]}) do
+    local ready = redis.call('ZRANGEBYSCORE', source, '-inf', now, 'LIMIT', 0, 1000)
+    for _, job in ipairs(ready) do
+        redis.call('ZREM', source, job)
+        redis.call('RPUSH', KEYS[1], job)
+    end
+end
+local claimed = {}
+for i = 1, tonumber(ARGV[3]) do
+    local job = redis.call('RPOP', KEYS[1])
+    if not job then break end
+    redis.call('ZADD', KEYS[2], ARGV[2], job)
+    claimed[#claimed + 1] = job
+end
+return claimed
+"""
+
+
+def _new_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {"id": uuid.uuid4().hex, "payload": payload, "attempts": 0, "enqueued_at": time.time()}
+
+
+class RedisJobQueue:
+    """Durable queue on Redis.
+
+    Pending jobs live in a list; claimed jobs move to a lease sorted set
+    scored by their lease deadline, so jobs held by a worker that dies are
+    handed out again once the lease expires. Retries wait in a delayed
+    sorted set and jobs out of attempts go to a dead-letter list.
+    """
+
+    def __init__(self, client, name: str):
+        self.client = client
+        self.name = name
+        self.pending_key = f"jobs:{name}:pending"
+        self.leased_key = f"jobs:{name}:leased"
+        self.delayed_key = f"jobs:{name}:delayed"
+        self.dead_key = f"jobs:{name}:dead"
+
+    async def enqueue(self, payloads: List[Dict[str, Any]]) -> int:
+        if not payloads:
+            return 0
+        await self.client.lpush(self.pending_key, *[json.dumps(_new_job(p)) for p in payloads])
+        return len(payloads)
+
+    async def claim(self, max_jobs: int, lease_seconds: float) -> List[Dict[str, Any]]:
+        now = time.time()
+        raw_jobs = await self.client.eval(
+            CLAIM_SCRIPT, 3, self.pending_key, self.leased_key, self.delayed_key,
+            now, now + lease_seconds, max_jobs
+        )
+        jobs = []
+        for raw in raw_jobs:
+            job = json.loads(raw)
+            # The exact member is needed to release the lease
+            job["_raw"] = raw
+            jobs.append(job)
+        return jobs
+
+    async def ack(self, jobs: List[Dict[str, Any]]):
+        if jobs:
+            await self.client.zrem(self.leased_key, *[job["_raw"] for job in jobs])
+
+    async def retry(self, job: Dict[str, Any], delay: float):
+        retried = {key: value for key, value in job.items() if key != "_raw"}
+        retried["attempts"] += 1
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.leased_key, job["_raw"])
+            pipe.zadd(self.delayed_key, {json.dumps(retried): time.time() + delay})
+            await pipe.execute()
+
+    async def bury(self, job: Dict[str, Any], error: str):
+        dead = {key: value for key, value in job.items() if key != "_raw"}
+        dead["error"] = error
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.leased_key, job["_raw"])
+            pipe.lpush(self.dead_key, json.dumps(dead))
+            await pipe.execute()
+
+    async def stats(self) -> Dict[str, Any]:
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.llen(self.pending_key)
+            pipe.zcard(self.leased_key)
+            pipe.zcard(self.delayed_key)
+            pipe.llen(self.dead_key)
+            pipe.lindex(self.pending_key, -1)
+            pending, leased, delayed, dead, oldest = await pipe.execute()
+
+        return {
+            "backend": "redis",
+            "pending": pending,
+            "leased": leased,
+            "delayed": delayed,
+            "dead": dead,
+            "lag_seconds": round(time.time() - json.loads(oldest)["enqueued_at"], 3) if oldest else 0.0
+        }
+
+
+class InMemoryJobQueue:
+    """Process-local queue with the same semantics as RedisJobQueue, for tests
+    and single-process deployments without Redis. Jobs do not survive a restart."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._pending: deque = deque()
+        self._leased: Dict[str, tuple] = {}  # job id -> (deadline, job)
+        self._delayed: List[tuple] = []  # heap of (ready_at, job id, job)
+        self._dead: List[Dict[str, Any]] = []
+
+    async def enqueue(self, payloads: List[Dict[str, Any]]) -> int:
+        for payload in payloads:
+            self._pending.appendleft(_new_job(payload))
+        return len(payloads)
+
+    async def claim(self, max_jobs: int, lease_seconds: float) -> List[Dict[str, Any]]:
+        now = time.time()
+        for job_id, (deadline, job) in list(self._leased.items()):
+            if deadline <= now:
+                del self._leased[job_id]
+                self._pending.append(job)
+        while self._delayed and self._delayed[0][0] <= now:
+            self._pending.append(heapq.heappop(self._delayed)[2])
+
+        claimed = []
+        while self._pending and len(claimed) < max_jobs:
+            job = self._pending.pop()
+            self._leased[job["id"]] = (now + lease_seconds, job)
+            claimed.append(job)
+        return claimed
+
+    async def ack(self, jobs: List[Dict[str, Any]]):
+        for job in jobs:
+            self._leased.pop(job["id"], None)
+
+    async def retry(self, job: Dict[str, Any], delay: float):
+        self._leased.pop(job["id"], None)
+        retried = dict(job, attempts=job["attempts"] + 1)
+        heapq.heappush(self._delayed, (time.time() + delay, retried["id"], retried))
+
+    async def bury(self, job: Dict[str, Any], error: str):
+        self._leased.pop(job["id"], None)
+        self._dead.append(dict(job, error=error))
+
+    async def stats(self) -> Dict[str, Any]:
+        oldest = self._pending[-1] if self._pending else None
+        return {
+            "backend": "memory",
+            "pending": len(self._pending),
+            "leased": len(self._leased),
+            "delayed": len(self._delayed),
+            "dead": len(self._dead),
+            "lag_seconds": round(time.time() - oldest["enqueued_at"], 3) if oldest else 0.0
+        }
+
+
+class BatchWorker:
+    """Claims jobs in batches and hands their payloads to ``handler``.
+
+    When a batch raises, its jobs are run again one at a time so a single
+    bad payload does not fail its batchmates; only the jobs that fail on
+    their own are retried with exponential backoff, and jobs that fail
+    ``max_attempts`` times are moved to the dead-letter list. Leases are
+    longer than any batch should take, so jobs are only re-delivered when
+    a worker dies mid-batch.
+    """
+
+    def __init__(
+        self,
+        queue,
+        handler: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+        batch_size: int = 64,
+        concurrency: int = 1,
+        max_attempts: int = 5,
+        lease_seconds: float = 300.0,
+        backoff_base: float = 2.0,
+        poll_interval: float = 0.2
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.backoff_base = backoff_base
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self.batches = 0
+        self.completed = 0
+        self.retried = 0
+        self.dead = 0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Queue backend unavailable; leased jobs come back when the lease expires
+                logger.error(f"Job queue {self.queue.name} worker error: {e}")
+                processed = 0
+            if not processed:
+                await asyncio.sleep(self.poll_interval)
+
+    async def run_once(self) -> int:
+        """Claim and process one batch; returns the number of jobs claimed."""
+        jobs = await self.queue.claim(self.batch_size, self.lease_seconds)
+        if not jobs:
+            return 0
+
+        self.batches += 1
+        try:
+            with timed(f"job_{self.queue.name}"):
+                await self.handler([job["payload"] for job in jobs])
+        except Exception as e:
+            if len(jobs) == 1:
+                await self._fail(jobs[0], e)
+                return 1
+            logger.error(f"Job batch on {self.queue.name} failed ({len(jobs)} jobs), retrying them one by one: {e}")
+            for job in jobs:
+                try:
+                    with timed(f"job_{self.queue.name}"):
+                        await self.handler([job["payload"]])
+                except Exception as job_error:
+                    await self._fail(job, job_error)
+                else:
+                    await self._complete([job])
+            return len(jobs)
+
+        await self._complete(jobs)
+        return len(jobs)
+
+    async def _complete(self, jobs: List[Dict[str, Any]]):
+        await self.queue.ack(jobs)
+        self.completed += len(jobs)
+        JOB_RESULTS.inc(len(jobs), queue=self.queue.name, result="completed")
+
+    async def _fail(self, job: Dict[str, Any], error: Exception):
+        if job["attempts"] + 1 >= self.max_attempts:
+            logger.error(f"Job {job['id']} on {self.queue.name} failed {job['attempts'] + 1} times, burying it: {error}")
+            await self.queue.bury(job, str(error))
+            self.dead += 1
+            JOB_RESULTS.inc(queue=self.queue.name, result="dead")
+        else:
+            await self.queue.retry(job, self.backoff_base * 2 ** job["attempts"])
+            self.retried += 1
+            JOB_RESULTS.inc(queue=self.queue.name, result="retried")
+
+    async def stats(self) -> Dict[str, Any]:
+        stats = await self.queue.stats()
+        for state in ("pending", "leased", "delayed", "dead"):
+            JOB_QUEUE_JOBS.set(stats[state], queue=self.queue.name, state=state)
+        JOB_QUEUE_LAG.set(stats["lag_seconds"], queue=self.queue.name)
+
+        stats["workers"] = len(self._tasks)
+        stats["batches"] = self.batches
+        stats["completed"] = self.completed
+        stats["retried"] = self.retried
+        stats["buried"] = self.dead
+        return stats
+
+
+def create_job_queue(name: str, backend: str, redis_client=None):
+    """Redis-backed when configured and connected, otherwise in-memory."""
+    if backend == "redis":
+        if redis_client is not None:
+            return RedisJobQueue(redis_client, name)
+        logger.warning(f"Redis is not connected, job queue {name} falls back to memory")
+    return InMemoryJobQueue(name)
@@ -0,0 +1,111 @@
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # falls back to the standard library encoder
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# orjson.Fragment embeds already-encoded JSON in a document (orjson >= 3.9)
+_FRAGMENT = getattr(orjson, "Fragment", None)
+_ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+
+class EncodedRows:
+    """Result rows that are JSON-encoded at most once.
+
+    Holds the row dicts, their encoded JSON array, or both; the missing
+    form is derived on first use and kept. Responses and cache entries
+    containing it embed the stored bytes instead of walking every row
+    again, and rows read back from the cache are only parsed if something
+    needs the dicts (RAG context, cache tags), not to be sent to a client.
+    """
+
+    __slots__ = ("_rows", "_json", "_count")
+
+    def __init__(self, rows: Optional[List[Dict[str, Any]]] = None, encoded: Optional[bytes] = None, count: Optional[int] = None):
+        if rows is None and encoded is None:
+            rows = []
+        if rows is not None:
+            count = len(rows)
+        elif count is None:
+            raise ValueError("count is required with encoded rows")
+        self._rows = rows
+        self._json = encoded
+        self._count = count
+
+    @classmethod
+    def of(cls, value: Any) -> "EncodedRows":
+        if isinstance(value, cls):
+            return value
+        return cls(rows=value if isinstance(value, list) else list(value or []))
+
+    @property
+    def rows(self) -> List[Dict[str, Any]]:
+        if self._rows is None:
+            self._rows = loads(self._json)
+        return self._rows
+
+    @property
+    def json(self) -> bytes:
+        if self._json is None:
+            self._json = dumps(self._rows)
+        return self._json
+
+    def __len__(self) -> int:
+        # Known without parsing, so counting cached rows stays cheap
+        return self._count
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.rows)
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, EncodedRows):
+        if _FRAGMENT is not None:
+            return _FRAGMENT(value.json)
+        return value.rows
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    # UUIDs and anything else unknown, like the json.dumps(default=str) it replaces
+    return str(value)
+
+
+def dumps(value: Any) -> bytes:
+    """Compact JSON bytes; orjson encodes datetimes, UUIDs and numpy values natively."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(value, default=_default, separators=(",", ":")).encode()
+
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class JSONBytesResponse(Response):
+    """JSON response encoded with ``dumps``.
+
+    Return it directly from an endpoint: FastAPI passes Response objects
+    through untouched, skipping jsonable_encoder's walk over every value.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
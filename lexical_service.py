@@ -0,0 +1,104 @@
+from typing import Dict, Any, List, Optional
+from repository import queries
+from models import SearchFilters
+from search_filters import build_filter_sql
+from metrics import timed
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Terms are OR-ed rather than AND-ed so "best plumber in toronto" still matches
+# contractors that only mention plumbing and Toronto; ts_rank_cd rewards
+# documents that match more of them.
+LEXICAL_SEARCH_SQL = """
+WITH q AS (
+    SELECT NULLIF(replace(plainto_tsquery('english', immutable_unaccent(:query))::text, '&', '|'), '')::tsquery AS tsq
+)
+SELECT
+    c.id, c.name, c.phone, c.email, c.city, c.province,
+    c.bio_text, c.services_text, c.has_license, c.has_insurance,
+    c.hourly_rate_min, c.hourly_rate_max, c.created_at, c.updated_at,
+    coalesce(ts_rank_cd(c.search_tsv, q.tsq), 0)
+        + GREATEST(
+            word_similarity(:query, c.name),
+            word_similarity(:query, coalesce(c.city, '')),
+            word_similarity(:query, coalesce(c.services_text, ''))
+        ) as lexical_score,
+    c.latitude, c.longitude
+FROM contractor c, q
+WHERE (
+    c.search_tsv @@ q.tsq
+    OR :query <% c.name
+    OR :query <% c.city
+    OR :query <% c.services_text
+){filters}
+ORDER BY lexical_score DESC
+LIMIT :limit OFFSET :offset
+"""
+
+
+class LexicalSearchService:
+    """Keyword retrieval over name, services, bio and city.
+
+    Uses the weighted ``search_tsv`` column (GIN) for stemmed term matches and
+    pg_trgm word similarity (GIN trigram indexes) for typos and partial names.
+    """
+
+    async def search(
+        self,
+        query: str,
+        limit: int = 20,
+        filters: Optional[SearchFilters] = None,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        try:
+            if not query or not query.strip():
+                return []
+
+            filter_sql, filter_params = build_filter_sql(filters)
+
+            with timed("lexical_query"):
+                rows = await queries.fetch(LEXICAL_SEARCH_SQL.format(filters=filter_sql), {
+                    "query": query,
+                    "limit": limit,
+                    "offset": offset,
+                    **filter_params
+                })
+
+            # Rows map to dicts by column name; timestamps are left for the JSON encoder
+            results = []
+            for c in rows:
+                result = dict(c)
+                result["id"] = str(result["id"])
+                if result["lexical_score"] is None:
+                    result["lexical_score"] = 0.0
+                results.append(result)
+
+            return results
+
+        except Exception as e:
+            logger.error(f"Lexical search failed: {e}")
+            return []
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], k: int = 60, limit: int = 20) -> List[Dict[str, Any]]:
+    """Merge ranked result lists by summing 1 / (k + rank) per contractor id."""
+    scores: Dict[str, float] = {}
+    merged: Dict[str, Dict[str, Any]] = {}
+
+    for results in result_lists:
+        for rank, item in enumerate(results, start=1):
+            item_id = item["id"]
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+            if item_id in merged:
+                merged[item_id] = {**item, **merged[item_id]}
+            else:
+                merged[item_id] = dict(item)
+
+    ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
+    fused = []
+    for item_id in ranked:
+        item = merged[item_id]
+        item["rrf_score"] = scores[item_id]
+        fused.append(item)
+    return fused
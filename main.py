@@ -1,13 +1,22 @@
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+import asyncio
 import logging
-from sqlalchemy import text
+import time
 # from models import Contractor
-from database import get_db, init_db
+from models import SearchFilters, BulkScrapeRequest
+from database import init_db, pool_stats
+from repository import queries
 from search_service import SearchService
+from embeddings_service import SYNC_JOB
+from job_queue import BatchWorker, create_job_queue
+from config import settings
 from ingest_service import IngestService
+from json_codec import JSONBytesResponse, dumps
+from metrics import REGISTRY, HTTP_REQUEST_SECONDS, HTTP_IN_FLIGHT, INFERENCE_PENDING
 # from config import settings 
 
 logger = logging.getLogger(__name__)
@@ -22,67 +31,216 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    HTTP_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        # Label by route template, not the raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=str(status)
+        )
+
 # search_service = SearchService() 
 search_service = None
 ingest_service = None
+embeddings_update_task = None
+embeddings_sync_task = None
+embedding_queue = None
+embedding_worker = None
 
 @app.on_event("startup")
 async def startup_event():
-    global search_service, ingest_service
+    global search_service, ingest_service, embedding_queue, embedding_worker
     await init_db()
     search_service = SearchService()
-    ingest_service = IngestService()
+    ingest_service = IngestService(embeddings=search_service.embeddings)
     
     # Initialize cache connection
     await search_service.cache.connect()
     
+    # Contractor embeddings are computed by background workers, off the write path
+    embedding_queue = create_job_queue("embeddings", settings.job_queue_backend, search_service.cache.redis_client)
+    embedding_worker = BatchWorker(
+        embedding_queue,
+        search_service.embed_contractor_jobs,
+        batch_size=settings.job_queue_batch_size,
+        concurrency=settings.job_queue_workers,
+        max_attempts=settings.job_queue_max_attempts,
+        lease_seconds=settings.job_queue_lease_seconds,
+        backoff_base=settings.job_queue_backoff_base,
+        poll_interval=settings.job_queue_poll_interval
+    )
+    embedding_worker.start()
+    ingest_service.embed_queue = embedding_queue
+    
+    # Make sure the pgvector ANN index exists
+    await search_service.embeddings.ensure_vector_index()
+    
+    # Build the in-process vector index (no-op unless ANN_INDEX_ENABLED)
+    await search_service.embeddings.load_index()
+    
+    # Index existing contractors so scraped duplicates merge instead of inserting;
+    # loads in the background since large tables take a while
+    if ingest_service.dedupe is not None:
+        ingest_service.dedupe_loader = asyncio.create_task(ingest_service.dedupe.load())
+    
     print("db ready, cache connected")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    if embedding_worker:
+        await embedding_worker.stop()
+    if search_service:
+        search_service.embeddings.executor.shutdown()
+        await search_service.cache.disconnect()
+    if ingest_service:
+        await ingest_service.close()
+
 @app.get("/health")
 async def health_check():
     try:
-        async for db in get_db():
-            result = await db.execute(text("SELECT COUNT(*) FROM contractor"))
-            count = result.scalar()
-            return {
-                "status": "healthy",
-                "contractors": count,
-                "timestamp": datetime.utcnow().isoformat()
-            }
+        count = await queries.fetchval("SELECT COUNT(*) FROM contractor")
+        return {
+            "status": "healthy",
+            "contractors": count,
+            "db_pool": pool_stats(),
+            "timestamp": datetime.utcnow().isoformat()
+        }
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}
 
-@app.get("/search")
-async def search_contractors(
+def search_params(
     q: str = Query(..., description="Search query"),
-    db=Depends(get_db)
-):
+    trade: Optional[List[str]] = Query(None, description="Trades to match in services or name (any of)"),
+    min_rating: Optional[float] = Query(None, description="Minimum rating"),
+    licensed: Optional[bool] = Query(None, description="Only licensed (true) or unlicensed (false) contractors"),
+    insured: Optional[bool] = Query(None, description="Only insured (true) or uninsured (false) contractors"),
+    max_rate: Optional[float] = Query(None, description="Maximum starting hourly rate"),
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="Latitude of the search centre"),
+    lon: Optional[float] = Query(None, ge=-180, le=180, description="Longitude of the search centre"),
+    radius_km: Optional[float] = Query(None, gt=0, description="Only contractors within this distance of lat/lon"),
+    limit: int = Query(20, ge=1, le=100, description="Number of results to return"),
+    offset: int = Query(0, ge=0, description="Number of results to skip"),
+    ef_search: Optional[int] = Query(None, description="HNSW candidate list size (higher = better recall, slower)"),
+    probes: Optional[int] = Query(None, description="IVF lists to probe (higher = better recall, slower)")
+) -> Dict[str, Any]:
+    filters = SearchFilters(
+        trades=trade,
+        min_rating=min_rating,
+        licensed=licensed,
+        insured=insured,
+        max_rate=max_rate,
+        lat=lat,
+        lon=lon,
+        radius_km=radius_km,
+        limit=limit,
+        offset=offset
+    )
+    
+    return {
+        "query": q,
+        "filters": filters,
+        "ef_search": ef_search,
+        "probes": probes
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of stage latencies, cache hits and in-flight gauges."""
+    if search_service:
+        INFERENCE_PENDING.set(search_service.embeddings.executor.pending)
+    # Refreshes the connection pool gauges
+    pool_stats()
+    if embedding_worker:
+        # Refreshes the queue depth and lag gauges
+        try:
+            await embedding_worker.stats()
+        except Exception as e:
+            logger.error(f"Failed to read job queue stats: {e}")
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/search")
+async def search_contractors(params: Dict[str, Any] = Depends(search_params)):
     try:
-        # search_params = {
-        #     "query": q,
-        #     "lat": lat,
-        #     "lon": lon,
-        #     "radius_km": radius_km,
-        #     "trades": trade,
-        #     "min_rating": min_rating,
-        #     "licensed": licensed,
-        #     "insured": insured,
-        #     "max_rate": max_rate,
-        #     "limit": limit,
-        #     "offset": offset
-        # }
-        
-        params = {
-            "query": q
-        }
-        
         results = await search_service.rag_search(params)
         
-        return results
+        # Returned as a Response so FastAPI does not re-walk the rows; cached
+        # contractor rows are written out as the bytes stored in the cache
+        return JSONBytesResponse(results)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+@app.get("/search/stream")
+async def search_contractors_stream(params: Dict[str, Any] = Depends(search_params)):
+    """Same search as /search as Server-Sent Events.
+
+    Sends a ``contractors`` event as soon as retrieval finishes, ``token``
+    events as the answer is generated, then ``done`` (or ``error``).
+    """
+    async def event_stream():
+        async for event, data in search_service.rag_search_stream(params):
+            yield f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/search/nearby")
+async def search_nearby(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude"),
+    limit: int = Query(10, ge=1, le=100, description="Number of results to return"),
+    radius_km: Optional[float] = Query(None, gt=0, description="Maximum distance"),
+    trade: Optional[List[str]] = Query(None, description="Trades to match in services or name (any of)"),
+    licensed: Optional[bool] = Query(None, description="Only licensed (true) or unlicensed (false) contractors"),
+    insured: Optional[bool] = Query(None, description="Only insured (true) or uninsured (false) contractors")
+):
+    """Nearest contractors to a point, closest first"""
+    try:
+        filters = SearchFilters(
+            trades=trade,
+            licensed=licensed,
+            insured=insured,
+            lat=lat,
+            lon=lon,
+            radius_km=radius_km
+        )
+        results = await search_service.geo.nearest(lat, lon, limit=limit, filters=filters)
+        return JSONBytesResponse({
+            "contractors": results,
+            "total_count": len(results),
+            "search_type": "nearby"
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Nearby search failed: {str(e)}")
+
+@app.post("/geo/backfill")
+async def backfill_coordinates():
+    """Geocode contractors that have no coordinates from the local centroid tables"""
+    try:
+        updated = await search_service.geo.backfill_coordinates()
+        return {
+            "status": "success",
+            "updated": updated,
+            "message": "Coordinates backfilled successfully"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to backfill coordinates: {str(e)}")
+
 @app.post("/scrape")
 async def scrape_url(url: str = Query(..., description="URL to scrape")):
     try:
@@ -101,74 +259,76 @@ async def scrape_and_save(url: str = Query(..., description="URL to scrape and s
     try:
         scraped_data = await ingest_service.scrape_url(url)
         
-        async for db in get_db():
-            insert_sql = """
-            INSERT INTO contractor (
-                name, phone, email, website, city, province,
-                bio_text, services_text, has_license, has_insurance,
-                hourly_rate_min, hourly_rate_max, created_at, updated_at
-            ) VALUES (
-                :name, :phone, :email, :website, :city, :province,
-                :bio_text, :services_text, :has_license, :has_insurance,
-                :hourly_rate_min, :hourly_rate_max, NOW(), NOW()
-            ) RETURNING id
-            """
-            
-            result = await db.execute(text(insert_sql), {
-                "name": scraped_data.get('name', 'Unknown'),
-                "phone": scraped_data.get('phone'),
-                "email": scraped_data.get('email'),
-                "website": scraped_data.get('website', url),
-                "city": scraped_data.get('city'),
-                "province": scraped_data.get('province'),
-                "bio_text": scraped_data.get('bio_text'),
-                "services_text": scraped_data.get('services_text'),
-                "has_license": scraped_data.get('has_license', False),
-                "has_insurance": scraped_data.get('has_insurance', False),
-                "hourly_rate_min": scraped_data.get('hourly_rate_min'),
-                "hourly_rate_max": scraped_data.get('hourly_rate_max')
-            })
-            
-            contractor_id = result.scalar()
-            await db.commit()  # Commit the transaction
-            print(f"Saved contractor with ID: {contractor_id}")
-            
-            # Update embeddings for the new contractor
-            try:
-                await search_service.update_contractor_embeddings(contractor_id)
-                print(f"Updated embeddings for contractor {contractor_id}")
-            except Exception as e:
-                print(f"Failed to update embeddings for contractor {contractor_id}: {e}")
-            
-            return {
-                "status": "success",
-                "url": url,
-                "contractor_id": str(contractor_id),
-                "data": scraped_data,
-                "message": "Successfully scraped and saved contractor data"
-            }
+        scraped_data.setdefault('website', url)
+        saved = (await ingest_service.save_contractors([scraped_data]))[0]
+        contractor_id = saved["contractor_id"]
+        print(f"Saved contractor with ID: {contractor_id} ({saved['action']})")
+        
+        if saved["action"] == "duplicate":
+            # Only empty fields were filled in; the embedding is still current
+            await search_service.invalidate_contractor_cache(contractor_id)
+        else:
+            # Embedded by the background workers, retried there on failure
+            await embedding_queue.enqueue([{"contractor_id": str(contractor_id)}])
         
+        return {
+            "status": "success",
+            "url": url,
+            "contractor_id": str(contractor_id),
+            "action": saved["action"],
+            "embedding": "unchanged" if saved["action"] == "duplicate" else "queued",
+            "data": scraped_data,
+            "message": "Successfully scraped and saved contractor data"
+        }
+
     except Exception as e:
         print(f"Scraping and saving failed: {e}")
         raise HTTPException(status_code=500, detail=f"Scraping and saving failed: {str(e)}")
 
+@app.post("/scrape/bulk")
+async def bulk_scrape(request: BulkScrapeRequest):
+    """Scrape and save many URLs in the background; poll /scrape/bulk/{job_id} for progress"""
+    try:
+        async def on_complete(job):
+            if job.saved:
+                await search_service.invalidate_search_cache()
+
+        job = ingest_service.start_bulk_scrape(request.urls, on_complete=on_complete)
+        return {
+            "status": "success",
+            "job_id": job.id,
+            "total": len(job.urls),
+            "message": "Bulk scrape started"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Bulk scrape failed: {str(e)}")
+
+@app.get("/scrape/bulk/{job_id}")
+async def bulk_scrape_status(job_id: str):
+    job = ingest_service.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Bulk scrape job not found")
+    return {
+        "status": "success",
+        "job": job.to_dict(),
+        "message": f"Bulk scrape {job.status}"
+    }
+
 @app.get("/contractors/{contractor_id}")
-async def get_contractor(contractor_id: str, db=Depends(get_db)):
+async def get_contractor(contractor_id: str):
     try:
-        async for db in get_db():
-            result = await db.execute("SELECT * FROM contractor WHERE id = :id", {"id": contractor_id})
-            contractor = result.fetchone()
-            if not contractor:
-                raise HTTPException(status_code=404, detail="Contractor not found")
-            return contractor
+        contractor = await queries.get_contractor(contractor_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if not contractor:
+        raise HTTPException(status_code=404, detail="Contractor not found")
+    return contractor
 
 @app.post("/embeddings/update/{contractor_id}")
 async def update_contractor_embeddings(contractor_id: str):
     """Update embeddings for a specific contractor"""
     try:
-        await search_service.update_contractor_embeddings(int(contractor_id))
+        await search_service.update_contractor_embeddings(contractor_id)
         return {
             "status": "success",
             "contractor_id": contractor_id,
@@ -178,32 +338,143 @@ async def update_contractor_embeddings(contractor_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to update embeddings: {str(e)}")
 
 @app.post("/embeddings/update-all")
-async def update_all_embeddings():
-    """Update embeddings for all contractors"""
+async def update_all_embeddings(
+    resume: bool = Query(True, description="Continue from the last checkpoint if the previous run was interrupted"),
+    batch_size: Optional[int] = Query(None, description="Contractors encoded per batch"),
+    force: bool = Query(False, description="Re-encode contractors whose text and model are unchanged")
+):
+    """Start re-embedding all contractors in the background"""
+    global embeddings_update_task
     try:
-        await search_service.embeddings.update_all_embeddings()
+        if embeddings_update_task and not embeddings_update_task.done():
+            return {
+                "status": "running",
+                "message": "Embedding update already in progress"
+            }
+        
+        embeddings_update_task = asyncio.create_task(
+            search_service.embeddings.update_all_embeddings(batch_size=batch_size, resume=resume, force=force)
+        )
         return {
-            "status": "success",
-            "message": "All embeddings updated successfully"
+            "status": "started",
+            "resume": resume,
+            "message": "Embedding update started, poll /embeddings/update-all/status for progress"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update all embeddings: {str(e)}")
 
+@app.get("/embeddings/update-all/status")
+async def update_all_embeddings_status():
+    """Progress of the last bulk embedding update"""
+    try:
+        status = await search_service.embeddings.get_update_all_status()
+        status["running"] = bool(embeddings_update_task and not embeddings_update_task.done())
+        if embeddings_update_task and embeddings_update_task.done():
+            # exception() raises CancelledError on a cancelled task
+            if embeddings_update_task.cancelled():
+                status["error"] = "cancelled"
+            elif embeddings_update_task.exception():
+                status["error"] = str(embeddings_update_task.exception())
+        return status
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get embedding update status: {str(e)}")
+
+@app.post("/embeddings/sync")
+async def sync_embeddings(
+    batch_size: Optional[int] = Query(None, description="Contractors scanned per batch")
+):
+    """Start embedding the contractors changed since the last sync in the background"""
+    global embeddings_sync_task
+    try:
+        if embeddings_sync_task and not embeddings_sync_task.done():
+            return {
+                "status": "running",
+                "message": "Embedding sync already in progress"
+            }
+        
+        async def run_sync():
+            result = await search_service.embeddings.sync_embeddings(batch_size=batch_size)
+            if result["embedded"]:
+                await search_service.invalidate_search_cache()
+            return result
+        
+        embeddings_sync_task = asyncio.create_task(run_sync())
+        return {
+            "status": "started",
+            "message": "Embedding sync started, poll /embeddings/sync/status for progress"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to sync embeddings: {str(e)}")
+
+@app.get("/embeddings/sync/status")
+async def sync_embeddings_status():
+    """Progress and watermark of the last incremental embedding sync"""
+    try:
+        status = await search_service.embeddings.get_update_all_status(job=SYNC_JOB)
+        status["running"] = bool(embeddings_sync_task and not embeddings_sync_task.done())
+        if embeddings_sync_task and embeddings_sync_task.done():
+            if embeddings_sync_task.cancelled():
+                status["error"] = "cancelled"
+            elif embeddings_sync_task.exception():
+                status["error"] = str(embeddings_sync_task.exception())
+            else:
+                status["result"] = embeddings_sync_task.result()
+        return status
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get embedding sync status: {str(e)}")
+
+@app.get("/jobs/stats")
+async def get_job_stats():
+    """Depth, lag and outcomes of the background embedding queue"""
+    try:
+        return {"embeddings": await embedding_worker.stats()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get job stats: {str(e)}")
+
+@app.get("/embeddings/stats")
+async def get_embedding_stats():
+    """Inference queue and micro-batching statistics"""
+    try:
+        return search_service.embeddings.get_inference_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get embedding stats: {str(e)}")
+
+@app.post("/embeddings/index/rebuild")
+async def rebuild_vector_index(
+    index_type: Optional[str] = Query(None, description="hnsw, ivfflat or none (defaults to PGVECTOR_INDEX_TYPE)")
+):
+    """Rebuild the pgvector index on contractor embeddings"""
+    try:
+        result = await search_service.embeddings.rebuild_vector_index(index_type)
+        return {
+            "status": "success",
+            **result,
+            "message": "Vector index rebuilt successfully"
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild vector index: {str(e)}")
+
 @app.get("/search/semantic")
 async def semantic_search(
     q: str = Query(..., description="Search query"),
     limit: int = Query(10, description="Number of results to return"),
-    threshold: float = Query(0.3, description="Similarity threshold")
+    threshold: float = Query(0.3, description="Similarity threshold"),
+    ef_search: Optional[int] = Query(None, description="HNSW candidate list size (higher = better recall, slower)"),
+    probes: Optional[int] = Query(None, description="IVF lists to probe (higher = better recall, slower)")
 ):
     """Perform semantic search using embeddings"""
     try:
-        results = await search_service.embeddings.search_by_similarity(q, limit, threshold)
-        return {
+        results = await search_service.embeddings.search_by_similarity(
+            q, limit, threshold, ef_search=ef_search, probes=probes
+        )
+        return JSONBytesResponse({
             "contractors": results,
             "total_count": len(results),
             "query": q,
             "search_type": "semantic"
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Semantic search failed: {str(e)}")
 
@@ -212,6 +483,10 @@ async def get_cache_stats():
     """Get cache statistics"""
     try:
         stats = await search_service.cache.get_cache_stats()
+        if search_service.semantic_cache is not None:
+            stats["semantic_cache"] = search_service.semantic_cache.stats()
+        if ingest_service.dedupe is not None:
+            stats["dedupe"] = ingest_service.dedupe.stats()
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get cache stats: {str(e)}")
@@ -220,7 +495,7 @@ async def get_cache_stats():
 async def clear_cache():
     """Clear all cache"""
     try:
-        await search_service.cache.invalidate_search_cache()
+        await search_service.invalidate_search_cache()
         return {
             "status": "success",
             "message": "Cache cleared successfully"
@@ -232,7 +507,7 @@ async def clear_cache():
 async def clear_contractor_cache(contractor_id: str):
     """Clear cache for a specific contractor"""
     try:
-        await search_service.cache.invalidate_contractor_cache(int(contractor_id))
+        await search_service.invalidate_contractor_cache(contractor_id)
         return {
             "status": "success",
             "contractor_id": contractor_id,
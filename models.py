@@ -1,5 +1,6 @@
+import json
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 from uuid import UUID
 
@@ -19,6 +20,9 @@ class ContractorBase(BaseModel):
     has_insurance: Optional[bool] = False
     hourly_rate_min: Optional[float] = None
     hourly_rate_max: Optional[float] = None
+    rating: Optional[float] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
 class ContractorCreate(ContractorBase):
     pass
@@ -27,3 +31,31 @@ class Contractor(ContractorBase):
     id: UUID
     created_at: datetime
     updated_at: datetime
+
+class BulkScrapeRequest(BaseModel):
+    urls: List[str]
+
+class SearchFilters(BaseModel):
+    trades: Optional[List[str]] = None
+    min_rating: Optional[float] = None
+    licensed: Optional[bool] = None
+    insured: Optional[bool] = None
+    max_rate: Optional[float] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    radius_km: Optional[float] = None
+    limit: int = 20
+    offset: int = 0
+    
+    def has_predicates(self) -> bool:
+        return bool(self.model_dump(exclude_none=True, exclude={"limit", "offset"}))
+    
+    def has_location(self) -> bool:
+        return self.lat is not None and self.lon is not None
+    
+    def cache_key(self) -> str:
+        # Stable representation for cache keys; trades order does not matter
+        data = self.model_dump(exclude_none=True)
+        if "trades" in data:
+            data["trades"] = sorted(t.lower() for t in data["trades"])
+        return json.dumps(data, sort_keys=True)
@@ -0,0 +1,104 @@
+import numpy as np
+from typing import Optional, Tuple
+
+# Rows scored per block so int8/float16 codes are never upcast all at once
+SCORE_CHUNK = 16384
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class EmbeddingQuantizer:
+    """Compact storage for unit-length embeddings.
+
+    Vectors are optionally reduced to ``dim`` dimensions, either by keeping
+    the leading ``dim`` components (``reduction="truncate"``) or by
+    projecting onto the top principal components (``reduction="pca"``,
+    fitted on the data passed to ``fit``), then stored as float32, float16
+    or int8 with one scale per row. Scores from compact codes are
+    approximate, so callers rescore the best candidates at full precision.
+    """
+
+    def __init__(self, full_dim: int, dtype: str = "float32", dim: Optional[int] = None, reduction: str = "truncate"):
+        if dtype not in ("float32", "float16", "int8"):
+            raise ValueError(f"Unknown embedding storage dtype: {dtype}")
+        if reduction not in ("truncate", "pca"):
+            raise ValueError(f"Unknown dimension reduction: {reduction}")
+
+        self.full_dim = full_dim
+        self.dtype = dtype
+        self.dim = min(dim or full_dim, full_dim)
+        self.reduction = reduction
+
+        self.mean: Optional[np.ndarray] = None
+        self.components: Optional[np.ndarray] = None
+
+    @property
+    def is_lossy(self) -> bool:
+        return self.dtype != "float32" or self.dim < self.full_dim
+
+    @property
+    def code_dtype(self):
+        return {"float32": np.float32, "float16": np.float16, "int8": np.int8}[self.dtype]
+
+    def fit(self, vectors: np.ndarray, max_samples: int = 50000, seed: int = 0):
+        if self.reduction != "pca" or self.dim >= self.full_dim:
+            return
+
+        data = l2_normalize(vectors)
+        if len(data) < self.dim:
+            # Not enough data for a stable projection yet, truncate until refitted
+            return
+        if len(data) > max_samples:
+            data = data[np.random.default_rng(seed).choice(len(data), size=max_samples, replace=False)]
+
+        self.mean = data.mean(axis=0)
+        _, _, vt = np.linalg.svd(data - self.mean, full_matrices=False)
+        self.components = vt[:self.dim].astype(np.float32)
+
+    def reduce(self, vectors: np.ndarray) -> np.ndarray:
+        """Map full-precision vectors into the (normalized) reduced space."""
+        vectors = l2_normalize(vectors)
+        if self.dim >= self.full_dim:
+            return vectors
+        if self.components is not None:
+            return l2_normalize((vectors - self.mean) @ self.components.T)
+        return l2_normalize(vectors[..., :self.dim])
+
+    def quantize(self, reduced: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Return ``(codes, scales)``; scales is only set for int8."""
+        reduced = np.asarray(reduced, dtype=np.float32)
+        if self.dtype == "int8":
+            scales = np.atleast_1d(np.abs(reduced).max(axis=-1) / 127.0)
+            scales[scales == 0] = 1.0
+            scales = scales.reshape(reduced.shape[:-1])
+            codes = np.clip(np.rint(reduced / scales[..., None]), -127, 127).astype(np.int8)
+            return codes, scales.astype(np.float32)
+        return reduced.astype(self.code_dtype), None
+
+    def decode(self, codes: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+        decoded = codes.astype(np.float32)
+        if scales is not None:
+            decoded *= scales[..., None]
+        return decoded
+
+    def score(self, codes: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+        """Approximate cosine similarity of every code row against a reduced query."""
+        if codes.dtype == np.float32:
+            return codes @ query
+
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_CHUNK):
+            block = codes[start:start + SCORE_CHUNK].astype(np.float32)
+            scores[start:start + len(block)] = block @ query
+        if scales is not None:
+            scores *= scales
+        return scores
+
+    def bytes_per_vector(self) -> int:
+        extra = 4 if self.dtype == "int8" else 0
+        return self.dim * np.dtype(self.code_dtype).itemsize + extra
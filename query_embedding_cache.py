@@ -0,0 +1,76 @@
+import re
+import logging
+import unicodedata
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from local_cache import LRUCache
+from metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Collapse case, unicode forms and whitespace so equivalent queries share a vector."""
+    query = unicodedata.normalize("NFKC", query).lower()
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+class QueryEmbeddingCache:
+    """Normalized query -> float32 vector, in-process LRU with optional Redis backing.
+
+    Redis values are the raw float32 bytes of the vector rather than JSON
+    lists, so a 384-dim vector is 1.5KB and decodes with ``np.frombuffer``.
+    """
+
+    def __init__(self, model_name: str, maxsize: int = 10000, cache=None, ttl: Optional[int] = None):
+        self.model_name = model_name
+        self.lru = LRUCache(maxsize=maxsize)
+        self.cache = cache
+        self.ttl = ttl
+
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    def _redis_key(self, normalized: str) -> str:
+        return self.cache._generate_key("query_embedding", self.model_name, normalized)
+
+    async def get(self, query: str) -> Optional[np.ndarray]:
+        normalized = normalize_query(query)
+        vector = self.lru.get(normalized)
+        CACHE_REQUESTS.inc(namespace="query_embedding", tier="l1", result="hit" if vector is not None else "miss")
+        if vector is not None:
+            return vector
+
+        if self.cache is None:
+            return None
+
+        raw = await self.cache.get_raw(self._redis_key(normalized))
+        if raw is None:
+            self.redis_misses += 1
+            return None
+
+        self.redis_hits += 1
+        vector = np.frombuffer(raw, dtype=np.float32)
+        self.lru.set(normalized, vector)
+        return vector
+
+    async def set(self, query: str, vector: np.ndarray):
+        normalized = normalize_query(query)
+        vector = np.asarray(vector, dtype=np.float32)
+        self.lru.set(normalized, vector)
+
+        if self.cache is not None:
+            await self.cache.set_raw(self._redis_key(normalized), vector.tobytes(), self.ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.lru.stats()
+        lookups = stats["hits"] + stats["misses"]
+        stats["redis_hits"] = self.redis_hits
+        stats["redis_misses"] = self.redis_misses
+        # Overall ratio counts a Redis hit after an LRU miss as a hit
+        stats["overall_hit_ratio"] = (stats["hits"] + self.redis_hits) / lookups if lookups else 0.0
+        return stats
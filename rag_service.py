@@ -1,23 +1,20 @@
 import openai
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from datetime import datetime
 
 from config import settings
+from metrics import STAGE_SECONDS, timed
+import time
 
 class RAGService:
     def __init__(self):
-        self.client = openai.AsyncOpenAI(api_key=settings.openai_api_key)
-        
-    async def generate_answer(self, query, contractors):
-        if not self.client:
-            return {
-                "answer": "error",
-                "key_insights": [],
-                "sources": [],
-                "generated_at": datetime.utcnow().isoformat()
-            }
-
+        self.client = openai.AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url
+        )
+    
+    def _build_messages(self, query, contractors) -> List[Dict[str, str]]:
         summaries = []
         for c in contractors:
             summary = f"- Name: {c.get('name', 'N/A')}"
@@ -56,16 +53,28 @@ class RAGService:
         - "generated_at": (string) timestamp
         """
 
+        return [
+            {"role": "system", "content": "You are a contractor search engine."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    async def generate_answer(self, query, contractors):
+        if not self.client:
+            return {
+                "answer": "error",
+                "key_insights": [],
+                "sources": [],
+                "generated_at": datetime.utcnow().isoformat()
+            }
+
         try:
             # chat_completion = await self.openai_client.chat.completions.create(
-            chat_completion = await self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": "You are a contractor search engine."},
-                    {"role": "user", "content": prompt}
-                ],
-                model="gpt-3.5-turbo",
-                response_format={"type": "json_object"}
-            )
+            with timed("llm"):
+                chat_completion = await self.client.chat.completions.create(
+                    messages=self._build_messages(query, contractors),
+                    model=settings.openai_model,
+                    response_format={"type": "json_object"}
+                )
             
             response_content = chat_completion.choices[0].message.content
             print("got response")
@@ -97,4 +106,148 @@ class RAGService:
                 "key_insights": [],
                 "sources": [],
                 "generated_at": datetime.utcnow().isoformat()
-            }
\ No newline at end of file
+            }
+    
+    async def stream_answer(self, query, contractors) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the answer as it is generated.
+
+        Yields ``{"type": "token", "text": ...}`` for each piece of the
+        ``answer`` field as soon as the model produces it, then a single
+        ``{"type": "result", "rag_result": ...}`` with the parsed response,
+        in the same shape ``generate_answer`` returns.
+        """
+        if not self.client:
+            yield {"type": "result", "rag_result": {
+                "answer": "error",
+                "key_insights": [],
+                "sources": [],
+                "generated_at": datetime.utcnow().isoformat()
+            }}
+            return
+
+        content = []
+        extractor = AnswerFieldExtractor()
+        start = time.perf_counter()
+        first_token = True
+        try:
+            with timed("llm_stream"):
+                stream = await self.client.chat.completions.create(
+                    messages=self._build_messages(query, contractors),
+                    model=settings.openai_model,
+                    response_format={"type": "json_object"},
+                    stream=True
+                )
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    content.append(delta)
+                    text = extractor.feed(delta)
+                    if text:
+                        if first_token:
+                            STAGE_SECONDS.observe(time.perf_counter() - start, stage="llm_first_token")
+                            first_token = False
+                        yield {"type": "token", "text": text}
+
+            rag_response = json.loads("".join(content))
+            rag_response["generated_at"] = datetime.utcnow().isoformat()
+
+        except openai.APIError as e:
+            print(f"openai error: {e}")
+            rag_response = {
+                "answer": f"AI error: {e.message}",
+                "key_insights": [],
+                "sources": [],
+                "generated_at": datetime.utcnow().isoformat()
+            }
+        except json.JSONDecodeError as e:
+            print(f"json error: {e}")
+            rag_response = {
+                "answer": extractor.text or "Error processing AI response",
+                "key_insights": [],
+                "sources": [],
+                "generated_at": datetime.utcnow().isoformat()
+            }
+        except Exception as e:
+            print(f"unexpected error: {e}")
+            rag_response = {
+                "answer": f"Error: {str(e)}",
+                "key_insights": [],
+                "sources": [],
+                "generated_at": datetime.utcnow().isoformat()
+            }
+
+        yield {"type": "result", "rag_result": rag_response}
+
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class AnswerFieldExtractor:
+    """Incrementally pull the string value of ``"answer"`` out of streamed JSON.
+
+    The model streams a JSON object, so the answer text arrives wrapped in
+    quotes and escapes. Chunks are fed in as they arrive and the decoded
+    part of the answer that became available is returned.
+    """
+
+    def __init__(self, field: str = "answer"):
+        self._marker = f'"{field}"'
+        self._buffer = ""
+        self._state = "key"  # key -> value -> string -> done
+        self._escape = None  # None, "" after a backslash, or pending \u digits
+        self.text = ""
+
+    def feed(self, chunk: str) -> str:
+        if self._state == "done":
+            return ""
+
+        self._buffer += chunk
+        out = []
+
+        if self._state == "key":
+            pos = self._buffer.find(self._marker)
+            if pos < 0:
+                # Keep just enough to match a marker split across chunks
+                self._buffer = self._buffer[-len(self._marker):]
+                return ""
+            self._buffer = self._buffer[pos + len(self._marker):]
+            self._state = "value"
+
+        if self._state == "value":
+            stripped = self._buffer.lstrip(" \t\r\n:")
+            if not stripped:
+                self._buffer = ""
+                return ""
+            if stripped[0] != '"':
+                self._state = "done"
+                return ""
+            self._buffer = stripped[1:]
+            self._state = "string"
+
+        for ch in self._buffer:
+            if self._escape is not None:
+                if self._escape.startswith("u"):
+                    self._escape += ch
+                    if len(self._escape) == 5:
+                        out.append(chr(int(self._escape[1:], 16)))
+                        self._escape = None
+                elif ch == "u":
+                    self._escape = "u"
+                else:
+                    out.append(_ESCAPES.get(ch, ch))
+                    self._escape = None
+            elif ch == "\\":
+                self._escape = ""
+            elif ch == '"':
+                self._state = "done"
+                break
+            else:
+                out.append(ch)
+        self._buffer = ""
+
+        text = "".join(out)
+        self.text += text
+        return text
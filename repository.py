@@ -0,0 +1,123 @@
+import re
+import uuid
+import logging
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from database import engine
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# :name bind parameters, as written for sqlalchemy.text(); skips ::type casts
+_BIND_RE = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+
+GET_CONTRACTOR_SQL = """
+SELECT
+    id, name, phone, email, website, address, city, province, postal, country,
+    bio_text, services_text, has_license, has_insurance,
+    hourly_rate_min, hourly_rate_max, rating, latitude, longitude,
+    created_at, updated_at
+FROM contractor
+WHERE id = :id
+"""
+
+CONTRACTOR_TEXTS_SQL = """
+SELECT id, bio_text, services_text
+FROM contractor
+WHERE id = ANY(CAST(:ids AS UUID[]))
+"""
+
+
+@lru_cache(maxsize=1024)
+def to_positional(sql: str) -> Tuple[str, Tuple[str, ...]]:
+    """Rewrite ``:name`` binds to asyncpg's ``$n``; returns the SQL and the names in ``$n`` order."""
+    names: List[str] = []
+
+    def replace(match):
+        name = match.group(1)
+        if name not in names:
+            names.append(name)
+        return f"${names.index(name) + 1}"
+
+    return _BIND_RE.sub(replace, sql), tuple(names)
+
+
+class QueryRepository:
+    """Read queries run straight on the pooled asyncpg connection.
+
+    asyncpg prepares every statement on first use and keeps it in a
+    per-connection cache (``DB_STATEMENT_CACHE_SIZE``), so repeated queries
+    skip parsing and planning. Unlike an AsyncSession there is no implicit
+    BEGIN/ROLLBACK around a single read and no SQLAlchemy compile or result
+    wrapping. Queries keep the ``:name`` binds used with ``text()`` and
+    return asyncpg Records, which index like SQLAlchemy rows. Writes stay
+    on AsyncSession.
+    """
+
+    @asynccontextmanager
+    async def connection(self):
+        """Check out a pooled connection and yield its asyncpg connection."""
+        with timed("db_acquire"):
+            conn = await engine.connect()
+        try:
+            raw = await conn.get_raw_connection()
+            yield raw.driver_connection
+        finally:
+            await conn.close()
+
+    @asynccontextmanager
+    async def transaction(self):
+        """A connection inside a transaction, for transaction-local settings."""
+        async with self.connection() as conn:
+            async with conn.transaction():
+                yield conn
+
+    def _bind(self, sql: str, params: Optional[Dict[str, Any]]) -> Tuple[str, List[Any]]:
+        positional, names = to_positional(sql)
+        params = params or {}
+        return positional, [params[name] for name in names]
+
+    async def fetch(self, sql: str, params: Optional[Dict[str, Any]] = None, conn=None) -> List[Any]:
+        query, args = self._bind(sql, params)
+        if conn is not None:
+            return await conn.fetch(query, *args)
+        async with self.connection() as conn:
+            return await conn.fetch(query, *args)
+
+    async def fetchrow(self, sql: str, params: Optional[Dict[str, Any]] = None, conn=None) -> Optional[Any]:
+        query, args = self._bind(sql, params)
+        if conn is not None:
+            return await conn.fetchrow(query, *args)
+        async with self.connection() as conn:
+            return await conn.fetchrow(query, *args)
+
+    async def fetchval(self, sql: str, params: Optional[Dict[str, Any]] = None, conn=None) -> Any:
+        query, args = self._bind(sql, params)
+        if conn is not None:
+            return await conn.fetchval(query, *args)
+        async with self.connection() as conn:
+            return await conn.fetchval(query, *args)
+
+    async def get_contractor(self, contractor_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            uuid.UUID(str(contractor_id))
+        except ValueError:
+            return None
+        row = await self.fetchrow(GET_CONTRACTOR_SQL, {"id": contractor_id})
+        if row is None:
+            return None
+        contractor = dict(row)
+        contractor["id"] = str(contractor["id"])
+        for field in ("created_at", "updated_at"):
+            contractor[field] = contractor[field].isoformat() if contractor[field] else None
+        return contractor
+
+    async def get_contractor_texts(self, contractor_ids: List[Any]) -> List[Tuple[Any, Optional[str], Optional[str]]]:
+        """``(id, bio_text, services_text)`` for each existing contractor in ``contractor_ids``."""
+        rows = await self.fetch(CONTRACTOR_TEXTS_SQL, {"ids": [str(cid) for cid in contractor_ids]})
+        return [tuple(row) for row in rows]
+
+
+queries = QueryRepository()
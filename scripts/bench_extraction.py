@@ -0,0 +1,90 @@
+"""Measure contractor extraction throughput over saved HTML pages.
+
+Usage:
+    python scripts/bench_extraction.py
+    python scripts/bench_extraction.py --fixtures path/to/pages --seconds 5
+
+Runs the lxml extractor (html_extract) and the BeautifulSoup fallback
+(IngestService._parse_html_bs4) over every *.html file in the fixtures
+directory, repeating the corpus for ``--seconds`` per engine, and reports
+pages/s and MB/s. Fields where the two engines disagree are listed per
+page, so behaviour changes are visible next to the speedup.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import html_extract  # noqa: E402
+from config import settings  # noqa: E402
+from ingest_service import IngestService  # noqa: E402
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+
+
+def bench(name, extract, pages, seconds):
+    total_bytes = sum(len(html.encode()) for _, html in pages)
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        for path, html in pages:
+            extract(html, path)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            break
+
+    pages_per_second = runs * len(pages) / elapsed
+    mb_per_second = runs * total_bytes / elapsed / 1e6
+    print(f"{name:<14} {pages_per_second:>10.1f} pages/s {mb_per_second:>8.2f} MB/s ({runs} passes)")
+    return pages_per_second
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="directory of saved .html pages")
+    parser.add_argument("--seconds", type=float, default=3.0, help="time budget per engine")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.fixtures, "*.html")))
+    if not paths:
+        sys.exit(f"No .html files in {args.fixtures}")
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            pages.append((os.path.basename(path), f.read()))
+
+    size = sum(len(html.encode()) for _, html in pages)
+    print(f"{len(pages)} pages, {size / 1e3:.1f} kB\n")
+
+    service = IngestService.__new__(IngestService)
+    max_bytes = settings.scrape_max_document_bytes
+
+    engines = [("beautifulsoup", lambda html, url: service._parse_html_bs4(html[:max_bytes or None], url))]
+    if html_extract.available():
+        engines.append(("lxml", lambda html, url: html_extract.extract_contractor(html, url, max_bytes=max_bytes)))
+    else:
+        print("lxml is not installed, only benchmarking the fallback\n")
+
+    rates = {name: bench(name, extract, pages, args.seconds) for name, extract in engines}
+    if "lxml" in rates:
+        print(f"\nspeedup: {rates['lxml'] / rates['beautifulsoup']:.1f}x")
+
+        print("\nfield differences (beautifulsoup -> lxml):")
+        differences = 0
+        for path, html in pages:
+            before = engines[0][1](html, path)
+            after = engines[1][1](html, path)
+            for field in before:
+                if before[field] != after[field]:
+                    differences += 1
+                    print(f"  {path} {field}: {before[field]!r} -> {after[field]!r}")
+        if not differences:
+            print("  none")
+
+
+if __name__ == "__main__":
+    main()
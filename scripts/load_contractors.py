@@ -0,0 +1,73 @@
+"""Bulk load contractors from a CSV or JSONL file.
+
+Usage:
+    python scripts/load_contractors.py contractors_sample.csv
+    python scripts/load_contractors.py drop.jsonl.gz --batch-size 20000
+    python scripts/load_contractors.py drop.csv --no-embed
+
+The file is streamed, so it can be larger than memory. Rows go through
+COPY into a staging table and are merged into ``contractor`` by website
+(see bulk_loader.BulkLoader); near-duplicates of existing contractors,
+found by phone, email or MinHash (dedupe.py), merge into them as well.
+With ``--no-embed`` only the rows are loaded; run POST
+/embeddings/update-all afterwards. The search cache is invalidated when
+Redis is reachable.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_loader import BulkLoader  # noqa: E402
+from cache_service import CacheService  # noqa: E402
+from config import settings  # noqa: E402
+from database import init_db  # noqa: E402
+from dedupe import ContractorDeduplicator  # noqa: E402
+
+
+async def main(args):
+    await init_db()
+
+    embeddings = None
+    if not args.no_embed:
+        from embeddings_service import EmbeddingsService
+        embeddings = EmbeddingsService()
+
+    dedupe = None
+    if settings.dedupe_enabled and not args.no_dedupe:
+        dedupe = ContractorDeduplicator(
+            num_perm=settings.dedupe_num_perm,
+            bands=settings.dedupe_bands,
+            threshold=settings.dedupe_threshold
+        )
+        await dedupe.load()
+
+    loader = BulkLoader(embeddings=embeddings, batch_size=args.batch_size, dedupe=dedupe)
+    try:
+        stats = await loader.load(args.path, file_format=args.format)
+    finally:
+        if embeddings is not None:
+            embeddings.executor.shutdown()
+
+    cache = CacheService()
+    await cache.connect()
+    if cache.redis_client:
+        await cache.invalidate_search_cache()
+    await cache.disconnect()
+
+    print(json.dumps(stats, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", help=".csv or .jsonl file, optionally .gz compressed")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="override detection by file extension")
+    parser.add_argument("--batch-size", type=int, help="rows per COPY + merge (default BULK_LOAD_BATCH_SIZE)")
+    parser.add_argument("--no-embed", action="store_true", help="load rows without computing embeddings")
+    parser.add_argument("--no-dedupe", action="store_true", help="skip near-duplicate detection (website matches still merge)")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,104 @@
+"""Local stand-in for the OpenAI chat completions API.
+
+Usage:
+    python scripts/openai_stub.py --port 8001 --token-delay 0.05
+    OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=stub uvicorn main:app
+
+Answers POST /v1/chat/completions with a canned JSON answer built from the
+contractor names in the prompt, either as one response or, with
+``stream: true``, as ``chat.completion.chunk`` Server-Sent Events a few
+characters at a time. ``--token-delay`` simulates generation latency so
+time to first byte can be compared between /search and /search/stream.
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI()
+TOKEN_DELAY = 0.0
+CHUNK_CHARS = 4
+
+
+def canned_answer(messages) -> str:
+    prompt = messages[-1]["content"] if messages else ""
+    names = re.findall(r"- Name: ([^,\n]+)", prompt)
+    query = re.search(r'Search Query: "(.*)"', prompt)
+    query = query.group(1) if query else "your search"
+
+    if names:
+        answer = f"For \"{query}\", the best matches are {', '.join(names[:3])}."
+    else:
+        answer = f"No contractors matched \"{query}\"."
+    return json.dumps({
+        "answer": answer,
+        "key_insights": [f"{len(names)} contractors matched", "Generated by the local stub"],
+        "sources": names[:3]
+    })
+
+
+def completion_chunk(completion_id: str, model: str, delta, finish_reason=None) -> str:
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "stub")
+    content = canned_answer(body.get("messages", []))
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+    if not body.get("stream"):
+        await asyncio.sleep(TOKEN_DELAY * (len(content) / CHUNK_CHARS))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+
+    async def events():
+        yield completion_chunk(completion_id, model, {"role": "assistant", "content": ""})
+        for start in range(0, len(content), CHUNK_CHARS):
+            await asyncio.sleep(TOKEN_DELAY)
+            yield completion_chunk(completion_id, model, {"content": content[start:start + CHUNK_CHARS]})
+        yield completion_chunk(completion_id, model, {}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def main():
+    global TOKEN_DELAY
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed chunks")
+    args = parser.parse_args()
+
+    TOKEN_DELAY = args.token_delay
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
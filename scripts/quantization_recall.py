@@ -0,0 +1,131 @@
+"""Report recall@k of compact embedding storage against full-precision search.
+
+Usage:
+    python scripts/quantization_recall.py --from-db
+    python scripts/quantization_recall.py --npy embeddings.npy
+    python scripts/quantization_recall.py --synthetic 100000
+
+Every mode is scanned exhaustively (no IVF) so the numbers isolate the
+effect of quantization and dimension reduction. "rescored" recall
+re-ranks the top k * rescore-factor candidates with the original vectors,
+which is what EmbeddingsService does at query time.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quantization import EmbeddingQuantizer, l2_normalize  # noqa: E402
+from vector_index import VectorIndex  # noqa: E402
+
+MODES = [
+    ("float16", None, "truncate"),
+    ("int8", None, "truncate"),
+    ("float16", 192, "truncate"),
+    ("int8", 192, "truncate"),
+    ("int8", 192, "pca"),
+    ("int8", 128, "pca"),
+    ("int8", 64, "pca"),
+]
+
+
+async def load_from_db() -> np.ndarray:
+    from sqlalchemy import text
+    from database import get_db
+
+    async for db in get_db():
+        result = await db.execute(text("""
+            SELECT embedding_vector::text FROM contractor_embeddings
+            WHERE embedding_vector IS NOT NULL
+        """))
+        return np.stack([
+            np.fromstring(row[0].strip("[]"), sep=",", dtype=np.float32)
+            for row in result.fetchall()
+        ])
+
+
+def synthetic(n: int, dim: int, clusters: int = 200, seed: int = 0) -> np.ndarray:
+    # Clustered data is closer to real sentence embeddings than isotropic noise
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    return centers[labels] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def exact_top_k(data: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ data.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1), axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--from-db", action="store_true", help="load vectors from contractor_embeddings")
+    source.add_argument("--npy", help="load an (n, dim) float32 .npy file")
+    source.add_argument("--synthetic", type=int, metavar="N", help="generate N clustered random vectors")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.from_db:
+        vectors = asyncio.run(load_from_db())
+    elif args.npy:
+        vectors = np.load(args.npy).astype(np.float32)
+    else:
+        vectors = synthetic(args.synthetic, args.dim)
+
+    data = l2_normalize(vectors)
+    n, dim = data.shape
+    k = min(args.k, n)
+
+    rng = np.random.default_rng(1)
+    # Queries are perturbed corpus vectors so they have real neighbours without being exact copies
+    picks = rng.choice(n, size=min(args.queries, n), replace=False)
+    queries = l2_normalize(data[picks] + 0.05 * rng.normal(size=(len(picks), dim)).astype(np.float32))
+
+    truth = exact_top_k(data, queries, k)
+    ids = list(range(n))
+
+    print(f"{n} vectors, {dim} dims, {len(queries)} queries, recall@{k}")
+    print(f"{'mode':<24}{'bytes/vec':>10}{'memory':>12}{'recall':>10}{'rescored':>10}{'ms/query':>10}")
+    print(f"{'float32':<24}{dim * 4:>10}{n * dim * 4 / 2**20:>10.1f}MB{1.0:>10.3f}{1.0:>10.3f}{'':>10}")
+
+    for dtype, reduced_dim, reduction in MODES:
+        if reduced_dim and reduced_dim >= dim:
+            continue
+
+        quantizer = EmbeddingQuantizer(dim, dtype=dtype, dim=reduced_dim, reduction=reduction)
+        index = VectorIndex(dim, ivf_min_size=n + 1, quantizer=quantizer)
+        index.build(ids, data)
+
+        plain_hits = 0
+        rescored_hits = 0
+        started = time.perf_counter()
+        for query, expected in zip(queries, truth):
+            expected = set(expected.tolist())
+            candidates = [cid for cid, _ in index.search(query, k * args.rescore_factor)]
+            plain_hits += len(expected & set(candidates[:k]))
+
+            full_scores = data[candidates] @ query
+            rescored = [candidates[i] for i in np.argsort(-full_scores)[:k]]
+            rescored_hits += len(expected & set(rescored))
+        elapsed = (time.perf_counter() - started) * 1000 / len(queries)
+
+        total = len(queries) * k
+        name = f"{dtype}/{reduced_dim or dim}" + (f"/{reduction}" if reduced_dim else "")
+        print(
+            f"{name:<24}{quantizer.bytes_per_vector():>10}{index.memory_bytes() / 2**20:>10.1f}MB"
+            f"{plain_hits / total:>10.3f}{rescored_hits / total:>10.3f}{elapsed:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
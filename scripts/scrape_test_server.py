@@ -0,0 +1,93 @@
+"""Local site of generated contractor pages for exercising the scraper.
+
+Usage:
+    python scripts/scrape_test_server.py --port 8002 --latency 0.05 --fail-rate 0.1
+    curl -X POST localhost:8000/scrape/bulk -H 'Content-Type: application/json' \\
+        -d "$(python scripts/scrape_test_server.py --urls 1000 --port 8002)"
+
+Serves GET /contractor/{n} as a profile page with a name, phone, email,
+bio, services and city. ``--latency`` delays every response and
+``--fail-rate`` answers that fraction of requests with 503 and a
+Retry-After header, so retries and backoff can be observed;
+``--fail-first N`` fails the first N requests for every page instead,
+deterministically, and ``--retry-after`` sets the header value (0 makes
+the scraper fall back to jittered backoff). ``--urls N`` prints a
+/scrape/bulk request body for N pages instead of serving.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import HTMLResponse, Response
+
+app = FastAPI()
+LATENCY = 0.0
+FAIL_RATE = 0.0
+FAIL_FIRST = 0
+RETRY_AFTER = "0"
+
+CITIES = ["Toronto", "Hamilton", "Ottawa", "Mississauga", "Waterloo", "London"]
+TRADES = ["Plumbing", "Electrical", "Roofing", "HVAC", "Drywall", "Painting", "Landscaping"]
+
+stats = {"served": 0, "failed": 0}
+# Requests seen per page, and arrival times (time.monotonic) of every request
+attempts = {}
+request_times = []
+
+
+def contractor_page(n: int) -> str:
+    rng = random.Random(n)
+    trades = rng.sample(TRADES, 3)
+    city = rng.choice(CITIES)
+    return f"""<html><head><title>Contractor {n}</title></head><body>
+<h1>{trades[0]} Pros {n}</h1>
+<div class="contact-info">
+  <a href="tel:416-555-{n % 10000:04d}">Call us</a>
+  <a href="mailto:info{n}@example.com">Email</a>
+</div>
+<div class="bio">Licensed and insured {trades[0].lower()} contractor serving {city}, Ontario since {1990 + n % 30}.</div>
+<ul class="services">{"".join(f"<li>{t}</li>" for t in trades)}</ul>
+</body></html>"""
+
+
+@app.get("/contractor/{n}")
+async def contractor(n: int):
+    request_times.append(time.monotonic())
+    attempts[n] = attempts.get(n, 0) + 1
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    if attempts[n] <= FAIL_FIRST or random.random() < FAIL_RATE:
+        stats["failed"] += 1
+        return Response(status_code=503, headers={"Retry-After": RETRY_AFTER})
+    stats["served"] += 1
+    return HTMLResponse(contractor_page(n))
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--fail-first", type=int, default=0, help="requests per page answered with 503 before serving it")
+    parser.add_argument("--retry-after", default="0", help="Retry-After header sent with every 503")
+    parser.add_argument("--urls", type=int, default=0, help="print a /scrape/bulk body for this many pages and exit")
+    args = parser.parse_args()
+
+    if args.urls:
+        print(json.dumps({"urls": [f"http://{args.host}:{args.port}/contractor/{n}" for n in range(args.urls)]}))
+    else:
+        LATENCY = args.latency
+        FAIL_RATE = args.fail_rate
+        FAIL_FIRST = args.fail_first
+        RETRY_AFTER = args.retry_after
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
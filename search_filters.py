@@ -0,0 +1,56 @@
+from typing import Any, Dict, Optional, Tuple
+
+from models import SearchFilters
+
+
+def build_filter_sql(filters: Optional[SearchFilters], alias: str = "c") -> Tuple[str, Dict[str, Any]]:
+    """Translate SearchFilters into SQL predicates on the contractor table.
+
+    Returns a string of ``AND ...`` clauses (empty when there is nothing to
+    filter) and its bind parameters, so callers can append it to an existing
+    WHERE clause and let Postgres apply it before ranking.
+    """
+    if filters is None:
+        return "", {}
+
+    clauses = []
+    params: Dict[str, Any] = {}
+
+    if filters.trades:
+        # ILIKE is served by the trigram GIN indexes on services_text and name
+        trade_clauses = []
+        for i, trade in enumerate(filters.trades):
+            params[f"f_trade_{i}"] = f"%{trade.strip()}%"
+            trade_clauses.append(f"{alias}.services_text ILIKE :f_trade_{i} OR {alias}.name ILIKE :f_trade_{i}")
+        clauses.append("(" + " OR ".join(trade_clauses) + ")")
+
+    if filters.min_rating is not None:
+        clauses.append(f"{alias}.rating >= :f_min_rating")
+        params["f_min_rating"] = filters.min_rating
+
+    if filters.licensed is not None:
+        clauses.append(f"{alias}.has_license = :f_licensed")
+        params["f_licensed"] = filters.licensed
+
+    if filters.insured is not None:
+        clauses.append(f"{alias}.has_insurance = :f_insured")
+        params["f_insured"] = filters.insured
+
+    if filters.max_rate is not None:
+        # Contractors whose starting rate fits the budget
+        clauses.append(f"{alias}.hourly_rate_min <= :f_max_rate")
+        params["f_max_rate"] = filters.max_rate
+
+    if filters.lat is not None and filters.lon is not None and filters.radius_km is not None:
+        # earth_box is a cheap bounding cube answered by the GiST index on
+        # ll_to_earth(latitude, longitude); earth_distance trims its corners
+        clauses.append(
+            f"earth_box(ll_to_earth(:f_lat, :f_lon), :f_radius_m) @> ll_to_earth({alias}.latitude, {alias}.longitude)"
+            f" AND earth_distance(ll_to_earth(:f_lat, :f_lon), ll_to_earth({alias}.latitude, {alias}.longitude)) <= :f_radius_m"
+        )
+        params["f_lat"] = filters.lat
+        params["f_lon"] = filters.lon
+        params["f_radius_m"] = filters.radius_km * 1000.0
+
+    sql = "".join(f" AND {clause}" for clause in clauses)
+    return sql, params
@@ -1,11 +1,20 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
 from sqlalchemy import text
 from database import get_db
+from repository import queries
 # from database import ContractorDB  
-# from config import settings  
+from config import settings
 from rag_service import RAGService
 from embeddings_service import EmbeddingsService
+from lexical_service import LexicalSearchService, reciprocal_rank_fusion
+from geo_service import GeoService, add_distances
+from semantic_cache import SemanticAnswerCache
 from cache_service import CacheService
+from json_codec import EncodedRows
+from models import SearchFilters
+from metrics import timed
+from datetime import datetime
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,111 +22,261 @@ logger = logging.getLogger(__name__)
 class SearchService:
     def __init__(self):
         self.rag = RAGService()
-        self.embeddings = EmbeddingsService()
         self.cache = CacheService()
+        self.embeddings = EmbeddingsService(cache=self.cache)
+        self.lexical = LexicalSearchService()
+        self.geo = GeoService()
+        
+        self.semantic_cache = None
+        if settings.semantic_cache_enabled:
+            self.semantic_cache = SemanticAnswerCache(
+                self.embeddings.embedding_dim,
+                max_entries=settings.semantic_cache_size,
+                max_distance=settings.semantic_cache_max_distance,
+                ttl=settings.semantic_cache_ttl
+            )
+            # Invalidations from any worker also apply to the semantic cache
+            self.cache.on_invalidation(self._on_cache_invalidation)
+    
+    def _filters(self, params) -> SearchFilters:
+        return params.get("filters") or SearchFilters()
     
     async def search(self, params):
         try:
             query = params.get("query", "")
+            filters = self._filters(params)
+            scope = filters.cache_key()
             
-            # Check cache first
-            cached_result = await self.cache.get_cached_search_result(query)
-            if cached_result:
+            # Cache hit, stale hit refreshed in the background, or one
+            # coalesced computation shared by every concurrent miss
+            with timed("search"):
+                search_result, from_cache = await self.cache.get_or_compute(
+                    await self.cache.search_key(query, scope),
+                    lambda: self._lexical_search(query, filters)
+                )
+            if from_cache:
                 logger.info(f"Returning cached search result for query: {query}")
-                return cached_result
             
-            async for db in get_db():
-                sql = "SELECT id, name, phone, email, city, province, bio_text, services_text, has_license, has_insurance, hourly_rate_min, hourly_rate_max, created_at FROM contractor"
-                
-                result = await db.execute(text(sql))
-                contractors = result.fetchall()
-                
-                results = []
-                for c in contractors:
-                    data = {
-                        "id": str(c[0]),
-                        "name": c[1],
-                        "phone": c[2],
-                        "email": c[3],
-                        "city": c[4],
-                        "province": c[5],
-                        "bio_text": c[6],
-                        "services_text": c[7],
-                        "has_license": c[8],
-                        "has_insurance": c[9],
-                        "hourly_rate_min": c[10],
-                        "hourly_rate_max": c[11],
-                        "created_at": c[12].isoformat() if c[12] else None,
-                        "updated_at": c[12].isoformat() if c[12] else None
-                    }
-                    results.append(data)
-                
-                search_result = {
-                    "contractors": results,
-                    "total_count": len(results),
-                    "query": query
-                }
-                
-                # Cache the result
-                await self.cache.cache_search_result(query, search_result)
-                
-                return search_result
+            return search_result
                 
         except Exception as e:
             logger.error(f"Search failed: {e}")
             raise
     
+    async def _lexical_search(self, query: str, filters: SearchFilters) -> Dict[str, Any]:
+        # Indexed keyword top-k rather than a dump of the whole table
+        results = await self.lexical.search(
+            query, limit=filters.limit, filters=filters, offset=filters.offset
+        )
+        if filters.has_location():
+            add_distances(results, filters.lat, filters.lon)
+        
+        # Encoded to JSON once, for both the cache entry and the response
+        return {
+            "contractors": EncodedRows(results),
+            "total_count": len(results),
+            "query": query
+        }
+    
     async def rag_search(self, params):
         try:
-            query = params.get("query", "")
+            with timed("rag_search"):
+                query = params.get("query", "")
+                filters = self._filters(params)
+                scope = filters.cache_key()
+                key = await self.cache.rag_key(query, scope)
+                
+                # Check the exact cache; stale entries are served while one
+                # worker regenerates them in the background
+                cached = await self.cache.get_fresh(key)
+                if cached is not None:
+                    cached_rag_result, fresh = cached
+                    if not fresh:
+                        self.cache.refresh_in_background(key, lambda: self._generate_rag(params, filters))
+                    logger.info(f"Returning cached RAG result for query: {query}")
+                    return self._rag_response(query, cached_rag_result, cached=True)
+                
+                # Then paraphrases of recently answered queries
+                semantic_response, query_embedding = await self._semantic_lookup(query, scope)
+                if semantic_response:
+                    return semantic_response
+                
+                # Concurrent misses for the same query share one retrieval + LLM call
+                rag_data, shared = await self.cache.compute_once(
+                    key, lambda: self._generate_rag(params, filters, query_embedding)
+                )
+                return self._rag_response(query, rag_data, cached=shared)
+            
+        except Exception as e:
+            logger.error(f"RAG search failed: {e}")
+            return await self.search(params)
+    
+    async def rag_search_stream(self, params) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Streaming variant of ``rag_search`` yielding ``(event, data)`` pairs.
+
+        Events are ``contractors`` as soon as retrieval finishes, ``token`` for
+        each piece of the answer, and a final ``done`` with the insights and
+        sources. Cached answers are replayed as a single token. The assembled
+        result is written to the RAG cache once the stream completes.
+        """
+        query = params.get("query", "")
+        filters = self._filters(params)
+        scope = filters.cache_key()
+        key = await self.cache.rag_key(query, scope)
+        
+        try:
+            response = None
+            query_embedding = None
+            cached = await self.cache.get_fresh(key)
+            if cached is not None:
+                cached_rag_result, fresh = cached
+                if not fresh:
+                    self.cache.refresh_in_background(key, lambda: self._generate_rag(params, filters))
+                response = self._rag_response(query, cached_rag_result, cached=True)
+            else:
+                response, query_embedding = await self._semantic_lookup(query, scope)
             
-            # Check cache first
-            cached_rag_result = await self.cache.get_cached_rag_result(query)
-            if cached_rag_result:
-                logger.info(f"Returning cached RAG result for query: {query}")
-                return {
-                    "answer": cached_rag_result["rag_result"]["answer"],
-                    "key_insights": cached_rag_result["rag_result"]["key_insights"],
-                    "contractors": cached_rag_result["contractors"],
-                    "total_count": len(cached_rag_result["contractors"]),
+            if response:
+                yield "contractors", {
+                    "contractors": response["contractors"],
+                    "total_count": response["total_count"],
                     "query": query,
-                    "sources": cached_rag_result["rag_result"]["sources"],
-                    "generated_at": cached_rag_result["rag_result"].get("generated_at"),
                     "cached": True
                 }
+                yield "token", {"text": response["answer"]}
+                yield "done", {field: value for field, value in response.items() if field != "contractors"}
+                return
             
-            # Try semantic search first
-            semantic_results = await self.semantic_search(params)
-            if semantic_results:
-                contractors = semantic_results
-            else:
-                # Fallback to regular search
-                search_results = await self.search(params)
-                contractors = search_results.get("contractors", [])
+            # Encoded once for the event and reused by the cache entry below
+            contractors = EncodedRows(await self._retrieve(params, filters))
+            yield "contractors", {
+                "contractors": contractors,
+                "total_count": len(contractors),
+                "query": query
+            }
             
-            rag_result = await self.rag.generate_answer(
-                query=query,
-                contractors=contractors
-            )
+            rag_result = None
+            async for event in self.rag.stream_answer(query=query, contractors=contractors.rows):
+                if event["type"] == "token":
+                    yield "token", {"text": event["text"]}
+                else:
+                    rag_result = event["rag_result"]
             
-            final_result = {
+            yield "done", {
                 "answer": rag_result["answer"],
                 "key_insights": rag_result["key_insights"],
-                "contractors": contractors,
-                "total_count": len(contractors),
-                "query": query,
                 "sources": rag_result["sources"],
-                "generated_at": rag_result.get("generated_at")
+                "generated_at": rag_result.get("generated_at"),
+                "query": query
             }
             
-            # Cache the RAG result
-            await self.cache.cache_rag_result(query, contractors, rag_result)
-            
-            return final_result
+            await self.cache.cache_rag_result(query, contractors, rag_result, scope=scope)
+            self._remember_semantic(query, contractors, rag_result, scope, query_embedding)
             
         except Exception as e:
-            logger.error(f"RAG search failed: {e}")
-            return await self.search(params)
+            logger.error(f"Streaming RAG search failed: {e}")
+            yield "error", {"detail": str(e)}
+    
+    async def _semantic_lookup(self, query: str, scope: str) -> Tuple[Optional[Dict[str, Any]], Any]:
+        """Look the query up in the semantic answer cache.
+
+        Returns ``(response, query_embedding)``; ``response`` is None on a miss
+        and ``query_embedding`` is None if the query could not be embedded.
+        """
+        if self.semantic_cache is None:
+            return None, None
+        
+        try:
+            query_embedding = await self.embeddings.generate_embedding(query)
+        except Exception as e:
+            logger.error(f"Semantic cache lookup failed: {e}")
+            return None, None
+        
+        hit = self.semantic_cache.lookup(query_embedding, scope)
+        if not hit:
+            return None, query_embedding
+        
+        entry, similarity = hit
+        logger.info(f"Returning semantically cached RAG result for query: {query} (matched: {entry['query']})")
+        response = self._rag_response(query, entry, cached=True)
+        response["matched_query"] = entry["query"]
+        response["semantic_similarity"] = similarity
+        return response, query_embedding
+    
+    async def _retrieve(self, params, filters: SearchFilters) -> List[Dict[str, Any]]:
+        # Hybrid retrieval: vector and keyword results fused by rank. Filters are
+        # pushed into both retrievers, and each returns everything up to the
+        # requested page so the fused ranking is stable across pages.
+        query = params.get("query", "")
+        depth = filters.offset + filters.limit
+        with timed("retrieve"):
+            semantic_results, lexical_results = await asyncio.gather(
+                self.semantic_search(params),
+                self.lexical.search(query, limit=max(depth, settings.lexical_limit), filters=filters)
+            )
+        contractors = reciprocal_rank_fusion(
+            [semantic_results, lexical_results],
+            k=settings.hybrid_rrf_k,
+            limit=depth
+        )[filters.offset:]
+        if filters.has_location():
+            add_distances(contractors, filters.lat, filters.lon)
+        return contractors
+    
+    async def _generate_rag(self, params, filters: SearchFilters, query_embedding=None) -> Dict[str, Any]:
+        """Retrieve and answer; returns the payload stored in the RAG cache."""
+        query = params.get("query", "")
+        contractors = await self._retrieve(params, filters)
+        
+        rag_result = await self.rag.generate_answer(
+            query=query,
+            contractors=contractors
+        )
+        
+        self._remember_semantic(query, contractors, rag_result, filters.cache_key(), query_embedding)
+        
+        # Encoded to JSON once, for both the cache entry and the response
+        return {
+            "contractors": EncodedRows(contractors),
+            "rag_result": rag_result,
+            "cached_at": datetime.utcnow().isoformat()
+        }
+    
+    def _remember_semantic(self, query, contractors, rag_result, scope, query_embedding=None):
+        if self.semantic_cache is not None and query_embedding is not None:
+            self.semantic_cache.put(
+                query_embedding,
+                {"query": query, "contractors": contractors, "rag_result": rag_result},
+                scope=scope,
+                contractor_ids=[c["id"] for c in contractors]
+            )
+    
+    def _rag_response(self, query: str, rag_data: Dict[str, Any], cached: bool = False) -> Dict[str, Any]:
+        contractors = rag_data["contractors"]
+        response = {
+            "answer": rag_data["rag_result"]["answer"],
+            "key_insights": rag_data["rag_result"]["key_insights"],
+            "contractors": contractors,
+            "total_count": len(contractors),
+            "query": query,
+            "sources": rag_data["rag_result"]["sources"],
+            "generated_at": rag_data["rag_result"].get("generated_at")
+        }
+        if cached:
+            response["cached"] = True
+        return response
+    
+    def _on_cache_invalidation(self, event: Dict[str, Any]):
+        if event["type"] == "generation" and event["namespace"] == "search":
+            self.semantic_cache.clear()
+        elif event.get("contractor_id"):
+            self.semantic_cache.invalidate_contractor(event["contractor_id"])
+    
+    async def invalidate_search_cache(self) -> bool:
+        return await self.cache.invalidate_search_cache()
+    
+    async def invalidate_contractor_cache(self, contractor_id) -> bool:
+        return await self.cache.invalidate_contractor_cache(contractor_id)
     
     async def semantic_search(self, params):
         try:
@@ -125,13 +284,31 @@ class SearchService:
             if not query:
                 return []
             
-            results = await self.embeddings.search_by_similarity(query, limit=20, threshold=0.3)
+            filters = self._filters(params)
+            results = await self.embeddings.search_by_similarity(
+                query,
+                limit=max(filters.offset + filters.limit, 20),
+                threshold=0.3,
+                ef_search=params.get("ef_search"),
+                probes=params.get("probes"),
+                filters=filters
+            )
             return results
             
         except Exception as e:
             logger.error(f"Semantic search failed: {e}")
             return []
     
+    async def embed_contractor_jobs(self, payloads: List[Dict[str, Any]]):
+        """Job queue handler: embed a batch of contractors in one encode and refresh their caches."""
+        contractor_ids = list(dict.fromkeys(payload["contractor_id"] for payload in payloads))
+        rows = await queries.get_contractor_texts(contractor_ids)
+        
+        embedded = await self.embeddings.update_embeddings_batch(rows)
+        for row in rows:
+            await self.invalidate_contractor_cache(row[0])
+        logger.info(f"Embedding jobs: {len(rows)} contractors, {embedded} re-encoded")
+    
     async def update_contractor_embeddings(self, contractor_id: int):
         """Update embeddings for a specific contractor"""
         try:
@@ -152,7 +329,7 @@ class SearchService:
                     )
                     
                     # Invalidate cache for this contractor
-                    await self.cache.invalidate_contractor_cache(contractor_id)
+                    await self.invalidate_contractor_cache(contractor_id)
                     
                     logger.info(f"Updated embeddings for contractor {contractor_id}")
                     
@@ -0,0 +1,141 @@
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticAnswerCache:
+    """RAG answers keyed by query embedding instead of exact query text.
+
+    Entries live in a fixed-size float32 matrix of normalized query vectors;
+    a lookup is one matrix-vector product masked to live entries of the same
+    scope (the serialized search filters). A hit is the closest entry whose
+    cosine distance is within ``max_distance``. When full, the least recently
+    used entry is overwritten. Scope ids are reference-counted by slot and
+    released with the last entry of their scope, so there are never more
+    than ``max_entries`` of them.
+    """
+
+    def __init__(self, dim: int, max_entries: int = 2048, max_distance: float = 0.08, ttl: float = 3600):
+        self.dim = dim
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.ttl = ttl
+
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self._scopes = np.full(max_entries, -1, dtype=np.int32)
+        self._expires_at = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._scope_ids: Dict[str, int] = {}
+        self._scope_names: Dict[int, str] = {}
+        self._scope_refs: Dict[int, int] = {}
+        self._free_scope_ids: List[int] = []
+
+        self.hits = 0
+        self.misses = 0
+
+    def _acquire_scope(self, scope: str) -> int:
+        scope_id = self._scope_ids.get(scope)
+        if scope_id is None:
+            # Ids in use are always 0..n-1 plus the free list
+            scope_id = self._free_scope_ids.pop() if self._free_scope_ids else len(self._scope_ids)
+            self._scope_ids[scope] = scope_id
+            self._scope_names[scope_id] = scope
+        self._scope_refs[scope_id] = self._scope_refs.get(scope_id, 0) + 1
+        return scope_id
+
+    def _release_scope(self, scope_id: int):
+        if scope_id < 0:
+            return
+        refs = self._scope_refs[scope_id] - 1
+        if refs:
+            self._scope_refs[scope_id] = refs
+            return
+        del self._scope_refs[scope_id]
+        del self._scope_ids[self._scope_names.pop(scope_id)]
+        self._free_scope_ids.append(scope_id)
+
+    def _normalize(self, embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(self.dim)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
+
+    def lookup(self, embedding, scope: str = "") -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return ``(entry, similarity)`` for the closest live entry within range."""
+        vector = self._normalize(embedding)
+        scope_id = self._scope_ids.get(scope)
+        if vector is None or scope_id is None:
+            self.misses += 1
+            return None
+
+        now = time.monotonic()
+        live = (self._scopes == scope_id) & (self._expires_at > now)
+        if not live.any():
+            self.misses += 1
+            return None
+
+        similarities = np.where(live, self._vectors @ vector, -np.inf)
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        if 1.0 - similarity > self.max_distance:
+            self.misses += 1
+            return None
+
+        self._last_used[best] = now
+        self.hits += 1
+        return self._entries[best], similarity
+
+    def put(self, embedding, entry: Dict[str, Any], scope: str = "", contractor_ids: Optional[List[str]] = None):
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+
+        now = time.monotonic()
+        expired = np.flatnonzero(self._expires_at <= now)
+        # Reuse an empty/expired slot, otherwise evict the least recently used entry
+        slot = int(expired[0]) if len(expired) else int(np.argmin(self._last_used))
+
+        self._release_scope(int(self._scopes[slot]))
+        self._vectors[slot] = vector
+        self._scopes[slot] = self._acquire_scope(scope)
+        self._expires_at[slot] = now + self.ttl
+        self._last_used[slot] = now
+        self._entries[slot] = {**entry, "_contractor_ids": set(contractor_ids or [])}
+
+    def invalidate_contractor(self, contractor_id: str) -> int:
+        """Drop every cached answer that cites the given contractor."""
+        dropped = 0
+        for slot, entry in enumerate(self._entries):
+            if entry is not None and contractor_id in entry["_contractor_ids"]:
+                self._drop(slot)
+                dropped += 1
+        return dropped
+
+    def _drop(self, slot: int):
+        self._release_scope(int(self._scopes[slot]))
+        self._entries[slot] = None
+        self._scopes[slot] = -1
+        self._expires_at[slot] = 0.0
+        self._last_used[slot] = 0.0
+
+    def clear(self):
+        for slot in range(self.max_entries):
+            self._drop(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": int((self._expires_at > time.monotonic()).sum()),
+            "max_entries": self.max_entries,
+            "scopes": len(self._scope_ids),
+            "max_distance": self.max_distance,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,43 @@
+import uuid
+
+from bulk_loader import STAGING_COLUMNS, BulkLoader
+
+
+def _record(**values):
+    data = {column: None for column in STAGING_COLUMNS}
+    data.update({"id": uuid.uuid4(), "has_license": False, "has_insurance": False}, **values)
+    return tuple(data[column] for column in STAGING_COLUMNS)
+
+
+def _field(record, column):
+    return record[STAGING_COLUMNS.index(column)]
+
+
+def test_dedupe_collapses_rows_per_match_id():
+    target = uuid.uuid4()
+    first = _record(name="Acme Plumbing", phone="4165550199", bio_text="Drains", has_license=True, match_id=target)
+    second = _record(name="Acme Plumbing Inc", email="info@acme.ca", bio_text=None, match_id=target)
+
+    rows = BulkLoader()._dedupe([first, second])
+
+    assert len(rows) == 1
+    row = rows[0]
+    assert _field(row, "id") == _field(first, "id")
+    assert _field(row, "name") == "Acme Plumbing Inc"
+    assert _field(row, "phone") == "4165550199"
+    assert _field(row, "email") == "info@acme.ca"
+    assert _field(row, "bio_text") == "Drains"
+    assert _field(row, "has_license") is True
+
+
+def test_dedupe_collapses_unresolved_rows_per_website():
+    rows = BulkLoader()._dedupe([
+        _record(name="A", website="Acme.ca", city="Toronto"),
+        _record(name="B", website="acme.ca"),
+        _record(name="C"),
+        _record(name="D"),
+    ])
+
+    assert sorted(_field(row, "name") for row in rows) == ["B", "C", "D"]
+    merged = next(row for row in rows if _field(row, "name") == "B")
+    assert _field(merged, "city") == "Toronto"
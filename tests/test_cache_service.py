@@ -0,0 +1,117 @@
+import asyncio
+
+import fakeredis
+
+from cache_service import CacheService
+from metrics import CACHE_REQUESTS
+
+
+async def _connected(server):
+    cache = CacheService(client=fakeredis.aioredis.FakeRedis(server=server))
+    await cache.connect()
+    for _ in range(100):
+        if cache._subscribed:
+            break
+        await asyncio.sleep(0.01)
+    assert cache._subscribed
+    return cache
+
+
+def test_get_is_served_from_l1():
+    async def scenario():
+        cache = await _connected(fakeredis.FakeServer())
+        try:
+            await cache.set("contractor:1", {"name": "Acme"})
+            # Gone from Redis, still served by the in-process copy
+            await cache.redis_client.delete("contractor:1")
+            hits = CACHE_REQUESTS.value(namespace="contractor", tier="l1", result="hit")
+            value = await cache.get("contractor:1")
+            return value, CACHE_REQUESTS.value(namespace="contractor", tier="l1", result="hit") - hits
+        finally:
+            await cache.disconnect()
+
+    value, l1_hits = asyncio.run(scenario())
+    assert value == {"name": "Acme"}
+    assert l1_hits == 1
+
+
+def test_mset_and_mget_use_one_pipeline_each():
+    async def scenario():
+        cache = await _connected(fakeredis.FakeServer())
+        pipelines = []
+        pipeline = cache.redis_client.pipeline
+
+        def counting_pipeline(*args, **kwargs):
+            pipelines.append(kwargs)
+            return pipeline(*args, **kwargs)
+
+        cache.redis_client.pipeline = counting_pipeline
+        try:
+            await cache.mset({"contractor:1": {"n": 1}, "contractor:2": {"n": 2}, "contractor:3": [1, 2]})
+            cache.l1.clear()
+            values = await cache.mget(["contractor:1", "contractor:missing", "contractor:3", "contractor:2"])
+            in_l1 = "contractor:1" in cache.l1
+            return values, len(pipelines), in_l1
+        finally:
+            await cache.disconnect()
+
+    values, pipelines, in_l1 = asyncio.run(scenario())
+    assert values == [{"n": 1}, None, [1, 2], {"n": 2}]
+    assert pipelines == 2
+    assert in_l1
+
+
+def test_invalidation_drops_l1_entry_in_other_workers():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        writer = await _connected(server)
+        reader = await _connected(server)
+        try:
+            await writer.cache_contractor_data("42", {"name": "Acme"})
+            assert await reader.get_cached_contractor_data("42") == {"name": "Acme"}
+            key = reader._generate_key("contractor", "42")
+            assert key in reader.l1
+
+            events = []
+            reader.on_invalidation(events.append)
+            await writer.invalidate_contractor_cache("42")
+            for _ in range(100):
+                if key not in reader.l1:
+                    break
+                await asyncio.sleep(0.01)
+            return key in reader.l1, events, await reader.get_cached_contractor_data("42")
+        finally:
+            await writer.disconnect()
+            await reader.disconnect()
+
+    still_cached, events, value = asyncio.run(scenario())
+    assert not still_cached
+    assert events and events[0]["contractor_id"] == "42"
+    assert value is None
+
+
+def test_contractor_tags_drop_expired_and_old_generation_members():
+    async def scenario():
+        cache = await _connected(fakeredis.FakeServer())
+        try:
+            results = {"contractors": [{"id": "7", "name": "Acme"}]}
+            await cache._tag_contractors("search:v0:expired", ["7"], -1)
+            await cache.cache_search_result("roofers", results)
+            old_tag = await cache.redis_client.zrange("tag:contractor:v0:7", 0, -1)
+
+            await cache.invalidate_search_cache()
+            await cache.cache_search_result("roofers", results)
+            new_tag = await cache.redis_client.zrange("tag:contractor:v1:7", 0, -1)
+
+            await cache.invalidate_contractor_cache("7")
+            cached = await cache.get_cached_search_result("roofers")
+            return old_tag, new_tag, cached, await cache.redis_client.exists("tag:contractor:v1:7")
+        finally:
+            await cache.disconnect()
+
+    old_tag, new_tag, cached, tag_exists = asyncio.run(scenario())
+    # The already-expired member was trimmed by the next write
+    assert len(old_tag) == 1 and old_tag[0].startswith(b"search:v0:")
+    assert len(new_tag) == 1 and new_tag[0].startswith(b"search:v1:")
+    assert cached is None
+    assert not tag_exists
@@ -0,0 +1,149 @@
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+import cache_codec
+import json_codec
+from cache_codec import CacheCodec
+from json_codec import EncodedRows, JSONBytesResponse, dumps, loads
+
+CODECS = [
+    ("msgpack", None), ("msgpack", "zstd"), ("msgpack", "lz4"),
+    ("json", None), ("json", "zstd"), ("json", "lz4"),
+]
+
+ROWS = [
+    {"id": uuid.UUID("11111111-1111-1111-1111-111111111111"), "name": "Acme Plumbing",
+     "created_at": datetime(2024, 5, 1, 12, 30), "hourly_rate_min": Decimal("85.50"), "rating": 4.5},
+    {"id": uuid.UUID("22222222-2222-2222-2222-222222222222"), "name": "Bright Spark Électrique",
+     "created_at": datetime(2024, 6, 2, 8, 0), "hourly_rate_min": None, "rating": np.float32(4.0)},
+]
+
+
+def _codec(serializer, compression):
+    if compression == "lz4" and cache_codec.lz4_frame is None:
+        pytest.skip("lz4 is not installed")
+    return CacheCodec(serializer=serializer, compression=compression, min_compress_bytes=64)
+
+
+@pytest.mark.parametrize("serializer, compression", CODECS)
+def test_cache_codec_round_trips_scalars_like_json_default_str(serializer, compression):
+    codec = _codec(serializer, compression)
+    value = {
+        "id": uuid.UUID("33333333-3333-3333-3333-333333333333"),
+        "at": datetime(2024, 1, 2, 3, 4, 5),
+        "day": date(2024, 1, 2),
+        "price": Decimal("19.99"),
+        "score": np.float32(0.5),
+        "nested": {"list": [1, "two", None, True]},
+    }
+
+    decoded = codec.decode(codec.encode(value))
+
+    # UUIDs and Decimals become strings and dates ISO strings, as the JSON cache always stored them
+    assert decoded["id"] == "33333333-3333-3333-3333-333333333333"
+    assert decoded["at"] == "2024-01-02T03:04:05"
+    assert decoded["day"] == "2024-01-02"
+    assert decoded["price"] == "19.99"
+    assert decoded["score"] == 0.5
+    assert decoded["nested"] == {"list": [1, "two", None, True]}
+
+
+@pytest.mark.parametrize("serializer, compression", CODECS)
+def test_cache_codec_round_trips_float32_vectors(serializer, compression):
+    codec = _codec(serializer, compression)
+    vector = np.random.default_rng(0).standard_normal(384).astype(np.float32)
+
+    decoded = codec.decode(codec.encode({"embedding": vector}))["embedding"]
+
+    if serializer == "msgpack":
+        # Raw float32 bytes, bit-exact
+        assert isinstance(decoded, np.ndarray) and decoded.dtype == np.float32
+        assert np.array_equal(decoded, vector)
+    else:
+        np.testing.assert_allclose(np.asarray(decoded, dtype=np.float32), vector, rtol=1e-6)
+
+
+@pytest.mark.parametrize("serializer, compression", CODECS)
+def test_cache_codec_compresses_large_values_only(serializer, compression):
+    codec = _codec(serializer, compression)
+    small, large = {"a": 1}, {"text": "plumbing " * 500}
+
+    assert codec.decode(codec.encode(small)) == small
+    encoded = codec.encode(large)
+    assert codec.decode(encoded) == large
+    if compression:
+        assert len(encoded) < len(dumps(large))
+
+
+def test_cache_codec_reads_plain_json_written_before_the_codec():
+    assert CacheCodec().decode(b'{"contractors": [], "total_count": 0}') == {"contractors": [], "total_count": 0}
+
+
+def test_encoded_rows_survive_msgpack_without_being_parsed():
+    codec = CacheCodec(serializer="msgpack", compression="zstd", min_compress_bytes=64)
+    rows = EncodedRows(ROWS)
+
+    decoded = codec.decode(codec.encode({"contractors": rows, "query": "plumber"}))["contractors"]
+
+    assert isinstance(decoded, EncodedRows)
+    assert len(decoded) == 2
+    assert decoded._rows is None  # counted and re-sent without parsing
+    assert decoded.json == rows.json
+    assert decoded[0]["id"] == "11111111-1111-1111-1111-111111111111"
+
+
+def test_encoded_rows_come_back_as_a_list_from_the_json_serializer():
+    codec = CacheCodec(serializer="json", compression=None)
+
+    decoded = codec.decode(codec.encode({"contractors": EncodedRows(ROWS)}))["contractors"]
+
+    assert [row["name"] for row in decoded] == ["Acme Plumbing", "Bright Spark Électrique"]
+
+
+def test_json_codec_encodes_rows_once():
+    rows = EncodedRows(ROWS)
+    encoded = rows.json
+
+    assert rows.json is encoded
+    assert loads(encoded) == [
+        {"id": "11111111-1111-1111-1111-111111111111", "name": "Acme Plumbing",
+         "created_at": "2024-05-01T12:30:00", "hourly_rate_min": "85.50", "rating": 4.5},
+        {"id": "22222222-2222-2222-2222-222222222222", "name": "Bright Spark Électrique",
+         "created_at": "2024-06-02T08:00:00", "hourly_rate_min": None, "rating": 4.0},
+    ]
+
+
+def test_encoded_rows_require_a_count_with_bytes():
+    with pytest.raises(ValueError):
+        EncodedRows(encoded=b"[]")
+    assert len(EncodedRows(encoded=b'[{"a":1}]', count=1)) == 1
+
+
+def test_response_body_embeds_encoded_rows():
+    rows = EncodedRows(encoded=b'[{"id":"x","name":"Acme"}]', count=1)
+    response = JSONBytesResponse({"contractors": rows, "total_count": len(rows), "cached": True})
+
+    assert response.media_type == "application/json"
+    assert loads(response.body) == {"contractors": [{"id": "x", "name": "Acme"}], "total_count": 1, "cached": True}
+
+
+@pytest.mark.skipif(json_codec._FRAGMENT is None, reason="orjson.Fragment needs orjson >= 3.9")
+def test_response_body_embeds_encoded_rows_verbatim():
+    # Encoded bytes as read from the cache: sent as they are, never parsed
+    rows = EncodedRows(encoded=b'[{"id":"x","name":"Acme"}]', count=1)
+    response = JSONBytesResponse({"contractors": rows, "total_count": len(rows)})
+
+    assert response.body == b'{"contractors":[{"id":"x","name":"Acme"}],"total_count":1}'
+    assert rows._rows is None
+
+
+def test_response_body_with_row_dicts():
+    response = JSONBytesResponse({"contractors": EncodedRows(ROWS), "generated_at": datetime(2024, 1, 1)})
+
+    body = loads(response.body)
+    assert body["contractors"][1]["name"] == "Bright Spark Électrique"
+    assert body["generated_at"] == "2024-01-01T00:00:00"
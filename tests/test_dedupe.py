@@ -0,0 +1,74 @@
+from dedupe import MinHashLSH, normalize_email, normalize_phone, normalize_website, shingles
+
+
+def test_normalize_phone_strips_formatting_and_country_code():
+    assert normalize_phone("(416) 555-0199") == "4165550199"
+    assert normalize_phone("+1 416.555.0199") == "4165550199"
+    assert normalize_phone("555-01") is None
+    assert normalize_phone(None) is None
+
+
+def test_normalize_email():
+    assert normalize_email("  Info@Example.COM ") == "info@example.com"
+    assert normalize_email("mailto:info@example.com?subject=Quote") == "info@example.com"
+    assert normalize_email("not an email") is None
+    assert normalize_email("") is None
+
+
+def test_normalize_website_ignores_scheme_www_and_trailing_slash():
+    assert normalize_website("https://www.Example.com/") == "example.com"
+    assert normalize_website("example.com") == "example.com"
+    assert normalize_website("http://example.com/About/") == "example.com/about"
+    assert normalize_website("https://example.com/#contact") == "example.com"
+    assert normalize_website("") is None
+
+
+def test_normalize_website_keeps_identifying_query():
+    first = normalize_website("https://directory.example.com/profile?id=1")
+    second = normalize_website("https://directory.example.com/profile?id=2")
+    assert first == "directory.example.com/profile?id=1"
+    assert first != second
+
+
+def test_normalize_website_drops_tracking_params_and_sorts_query():
+    assert normalize_website("https://example.com/?utm_source=ads&utm_campaign=spring&fbclid=abc") == "example.com"
+    assert (
+        normalize_website("https://example.com/p?b=2&gclid=x&a=1")
+        == normalize_website("example.com/p?a=1&b=2")
+        == "example.com/p?a=1&b=2"
+    )
+
+
+def _record(text):
+    return {"name": "Maple Leaf Plumbing", "bio_text": text, "services_text": "drain cleaning water heaters"}
+
+
+def test_minhash_lsh_query_finds_near_duplicate():
+    lsh = MinHashLSH(num_perm=64, bands=16, threshold=0.5)
+    bio = "family owned plumbing company serving toronto and the gta since 1998 with licensed plumbers"
+    lsh.add("a", lsh.signature(shingles(_record(bio))))
+
+    match = lsh.query(lsh.signature(shingles(_record(bio + " today"))))
+    assert match is not None
+    assert match[0] == "a"
+    assert match[1] >= 0.5
+
+    exact = lsh.query(lsh.signature(shingles(_record(bio))))
+    assert exact == ("a", 1.0)
+
+
+def test_minhash_lsh_query_misses_unrelated_and_removed():
+    lsh = MinHashLSH(num_perm=64, bands=16, threshold=0.8)
+    signature = lsh.signature(shingles(_record("residential roofing repairs shingles flat roofs and eavestroughs")))
+    lsh.add("a", signature)
+
+    other = {"name": "Bright Spark Electric", "bio_text": "panel upgrades ev chargers and lighting for homes", "services_text": "electrical"}
+    assert lsh.query(lsh.signature(shingles(other))) is None
+
+    lsh.remove("a")
+    assert len(lsh) == 0
+    assert lsh.query(signature) is None
+
+
+def test_minhash_signature_of_empty_set_is_none():
+    assert MinHashLSH().signature(set()) is None
@@ -0,0 +1,17 @@
+from geo_service import CITY_CENTROIDS, FSA_CENTROIDS, _normalize_city, geocode
+
+
+def test_normalize_city_strips_accents_hyphens_and_periods():
+    assert _normalize_city("Trois-Rivières") == "trois rivieres"
+    assert _normalize_city("  Sault Ste. Marie ") == "sault ste marie"
+    assert _normalize_city("ST. CATHARINES") == "st catharines"
+
+
+def test_centroid_keys_are_normalized():
+    assert all(_normalize_city(key) == key for key in CITY_CENTROIDS)
+
+
+def test_geocode_prefers_postal_then_city():
+    assert geocode(city="Sault Ste. Marie") == CITY_CENTROIDS["sault ste marie"]
+    assert geocode(city="Toronto", postal="k1p 1a1") == FSA_CENTROIDS["K1P"]
+    assert geocode(city="Nowhere") is None
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import ingest_service
+from config import settings
+from ingest_service import BulkScrapeJob, IngestService
+
+from helpers import load_script, serve
+
+site = load_script("scrape_test_server")
+
+
+@pytest.fixture(scope="module")
+def site_url():
+    with serve(site.app) as url:
+        yield url
+
+
+@pytest.fixture(autouse=True)
+def scrape_settings(monkeypatch):
+    monkeypatch.setattr(settings, "dedupe_enabled", False)
+    monkeypatch.setattr(settings, "scrape_per_host_rps", 0.0)
+    monkeypatch.setattr(settings, "scrape_retries", 2)
+    monkeypatch.setattr(settings, "scrape_backoff_base", 0.01)
+    monkeypatch.setattr(site, "FAIL_FIRST", 0)
+    monkeypatch.setattr(site, "RETRY_AFTER", "0")
+    site.attempts.clear()
+    site.request_times.clear()
+
+
+def _run(scenario):
+    async def with_service():
+        service = IngestService()
+        try:
+            return await scenario(service)
+        finally:
+            await service.close()
+    return asyncio.run(with_service())
+
+
+def test_per_host_rate_limit_spaces_requests(site_url, monkeypatch):
+    monkeypatch.setattr(settings, "scrape_per_host_rps", 20.0)
+
+    async def scenario(service):
+        urls = [f"{site_url}/contractor/{n}" for n in range(6)]
+        started = time.monotonic()
+        results = [result async for result in service.scrape_many(urls)]
+        return started, results
+
+    started, results = _run(scenario)
+
+    assert all(error is None for _, _, error in results)
+    assert len(site.request_times) == 6
+    # 20 requests per second on one host: the sixth slot is 250ms after the first
+    assert site.request_times[-1] - started >= 0.25
+
+
+def test_retry_after_is_honoured(site_url, monkeypatch):
+    monkeypatch.setattr(site, "FAIL_FIRST", 1)
+    monkeypatch.setattr(site, "RETRY_AFTER", "0.3")
+
+    async def scenario(service):
+        return await service.scrape_url(f"{site_url}/contractor/7")
+
+    data = _run(scenario)
+
+    assert data["name"].endswith("Pros 7")
+    assert site.attempts[7] == 2
+    assert site.request_times[1] - site.request_times[0] >= 0.3
+
+
+def test_retries_without_retry_after_use_jittered_backoff(site_url, monkeypatch):
+    monkeypatch.setattr(site, "FAIL_FIRST", 2)
+    bounds = []
+
+    def uniform(low, high):
+        bounds.append((low, high))
+        return high / 2
+
+    monkeypatch.setattr(ingest_service.random, "uniform", uniform)
+
+    async def scenario(service):
+        return await service.fetch(f"{site_url}/contractor/3")
+
+    html = _run(scenario)
+
+    assert "Pros 3" in html
+    assert site.attempts[3] == 3
+    # Full jitter over an exponentially growing window
+    assert bounds == [(0, 0.01), (0, 0.02)]
+
+
+def test_retries_give_up_after_scrape_retries(site_url, monkeypatch):
+    monkeypatch.setattr(site, "FAIL_FIRST", 10)
+
+    async def scenario(service):
+        return [result async for result in service.scrape_many([f"{site_url}/contractor/1"])]
+
+    [(url, data, error)] = _run(scenario)
+
+    assert data is None
+    assert "503" in error
+    assert site.attempts[1] == settings.scrape_retries + 1
+
+
+def test_bulk_scrape_job_status(site_url, monkeypatch):
+    monkeypatch.setattr(settings, "scrape_save_batch_size", 2)
+    saved_batches = []
+
+    async def scenario(service):
+        async def save_contractors(records):
+            saved_batches.append(len(records))
+            return [{"contractor_id": n, "action": "inserted", "bio_text": r["bio_text"], "services_text": r["services_text"]}
+                    for n, r in enumerate(records)]
+
+        service.save_contractors = save_contractors
+        urls = [f"{site_url}/contractor/{n}" for n in range(5)] + [f"{site_url}/missing", f"{site_url}/contractor/0"]
+        finished = asyncio.Event()
+
+        async def on_complete(job):
+            finished.set()
+
+        job = service.start_bulk_scrape(urls, on_complete=on_complete)
+        assert service.jobs[job.id] is job
+        assert job.to_dict()["status"] == "running"
+        await asyncio.wait_for(finished.wait(), timeout=10)
+        return job.to_dict()
+
+    status = _run(scenario)
+
+    assert status["status"] == "completed"
+    assert status["total"] == 6  # duplicate URL dropped
+    assert status["fetched"] == 5
+    assert status["failed"] == 1
+    assert status["saved"] == 5
+    assert status["errors"][0]["url"].endswith("/missing")
+    assert "404" in status["errors"][0]["error"]
+    assert status["finished_at"] is not None
+    assert sorted(saved_batches) == [1, 2, 2]
+
+
+def test_finished_jobs_are_pruned(monkeypatch):
+    monkeypatch.setattr(settings, "scrape_jobs_retained", 2)
+    monkeypatch.setattr(settings, "scrape_job_retention_seconds", 3600)
+
+    async def scenario(service):
+        now = datetime.utcnow()
+        old = BulkScrapeJob([])
+        old.finished_at = now - timedelta(hours=2)
+        running = BulkScrapeJob([])
+        finished = []
+        for minutes in (30, 20, 10):
+            job = BulkScrapeJob([])
+            job.finished_at = now - timedelta(minutes=minutes)
+            finished.append(job)
+        for job in [old, running, *finished]:
+            service.jobs[job.id] = job
+
+        new = service.start_bulk_scrape([])
+        await asyncio.sleep(0)
+        return set(service.jobs), running, finished, new
+
+    kept, running, finished, new = _run(scenario)
+
+    assert kept == {running.id, finished[1].id, finished[2].id, new.id}
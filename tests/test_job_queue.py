@@ -0,0 +1,28 @@
+import asyncio
+
+from job_queue import BatchWorker, InMemoryJobQueue
+
+
+def test_failed_batch_only_retries_the_failing_job():
+    async def scenario():
+        queue = InMemoryJobQueue("test")
+        handled = []
+
+        async def handler(payloads):
+            if any(payload["n"] == 2 for payload in payloads):
+                raise ValueError("bad payload")
+            handled.extend(payload["n"] for payload in payloads)
+
+        worker = BatchWorker(queue, handler, batch_size=10, max_attempts=1)
+        await queue.enqueue([{"n": n} for n in range(5)])
+        assert await worker.run_once() == 5
+        return handled, worker, await queue.stats()
+
+    handled, worker, stats = asyncio.run(scenario())
+    assert sorted(handled) == [0, 1, 3, 4]
+    assert worker.completed == 4
+    assert worker.dead == 1
+    assert worker.retried == 0
+    assert stats["dead"] == 1
+    assert stats["pending"] == 0
+    assert stats["leased"] == 0
@@ -0,0 +1,34 @@
+import asyncio
+
+import numpy as np
+
+from metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_WAIT_SECONDS, REGISTRY
+from micro_batcher import MicroBatcher
+
+
+def _count(histogram) -> int:
+    entry = histogram._values.get(())
+    return entry[2] if entry else 0
+
+
+def test_batches_are_recorded_as_histograms():
+    calls = []
+
+    async def encode(texts):
+        calls.append(list(texts))
+        return np.array([[float(len(text))] for text in texts], dtype=np.float32)
+
+    async def scenario():
+        batcher = MicroBatcher(encode, max_batch_size=4, max_wait_ms=20)
+        return await asyncio.gather(*(batcher.submit(text) for text in ["a", "bb", "ccc"]))
+
+    batches, waits = _count(EMBEDDING_BATCH_SIZE), _count(EMBEDDING_BATCH_WAIT_SECONDS)
+    vectors = asyncio.run(scenario())
+
+    assert calls == [["a", "bb", "ccc"]]
+    assert [float(vector[0]) for vector in vectors] == [1.0, 2.0, 3.0]
+    assert _count(EMBEDDING_BATCH_SIZE) - batches == 1
+    assert _count(EMBEDDING_BATCH_WAIT_SECONDS) - waits == 3
+    rendered = REGISTRY.render()
+    assert 'contractorsearch_embedding_batch_size_bucket{le="4"}' in rendered
+    assert "contractorsearch_embedding_batch_wait_seconds_count" in rendered
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from quantization import EmbeddingQuantizer, l2_normalize
+from vector_index import VectorIndex
+
+DIM = 64
+K = 10
+RESCORE_FACTOR = 4
+
+
+def _corpus(n=1000, latent=16, seed=0):
+    # Embeddings live near a low-dimensional subspace, like real sentence embeddings
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((latent, DIM))
+    vectors = rng.standard_normal((n, latent)) @ basis + 0.3 * rng.standard_normal((n, DIM))
+    return l2_normalize(vectors)
+
+
+VECTORS = _corpus()
+QUERIES = l2_normalize(VECTORS[:25] + 0.2 * np.random.default_rng(1).standard_normal((25, DIM)))
+
+
+def _exact_top_k(query, k=K):
+    return set(np.argsort(-(VECTORS @ query))[:k].tolist())
+
+
+def _recall(dtype, dim=None, reduction="truncate", rescore=False):
+    index = VectorIndex(DIM, ivf_min_size=10**6, quantizer=EmbeddingQuantizer(DIM, dtype=dtype, dim=dim, reduction=reduction))
+    index.build(list(range(len(VECTORS))), VECTORS)
+
+    found = 0
+    for query in QUERIES:
+        hits = [int(item_id) for item_id, _ in index.search(query, k=K * (RESCORE_FACTOR if rescore else 1))]
+        if rescore:
+            # What EmbeddingsService does with the candidates in Postgres
+            hits = sorted(hits, key=lambda i: -float(VECTORS[i] @ query))[:K]
+        found += len(set(hits) & _exact_top_k(query))
+    return found / (K * len(QUERIES))
+
+
+def test_float32_is_exact():
+    assert not EmbeddingQuantizer(DIM).is_lossy
+    assert _recall("float32") == 1.0
+
+
+@pytest.mark.parametrize("dtype, minimum", [("float16", 0.99), ("int8", 0.9)])
+def test_quantized_recall(dtype, minimum):
+    assert EmbeddingQuantizer(DIM, dtype=dtype).is_lossy
+    assert _recall(dtype) >= minimum
+    assert _recall(dtype, rescore=True) >= 0.99
+
+
+def test_reduced_dimensions_with_rescoring():
+    # Truncation drops information spread over every component, PCA keeps the
+    # subspace the data lives in; rescoring at full precision helps both
+    truncated = _recall("int8", dim=32, reduction="truncate")
+    assert _recall("int8", dim=32, reduction="truncate", rescore=True) > truncated
+    assert _recall("int8", dim=32, reduction="pca") >= 0.9
+    assert _recall("int8", dim=32, reduction="pca", rescore=True) >= 0.99
+
+
+def test_pca_keeps_more_than_truncation():
+    assert _recall("int8", dim=16, reduction="pca") > _recall("int8", dim=16, reduction="truncate")
+
+
+def test_int8_round_trip_and_scores():
+    quantizer = EmbeddingQuantizer(DIM, dtype="int8")
+    reduced = quantizer.reduce(VECTORS[:50])
+    codes, scales = quantizer.quantize(reduced)
+
+    assert codes.dtype == np.int8 and scales.dtype == np.float32
+    assert np.abs(quantizer.decode(codes, scales) - reduced).max() <= scales.max() / 2 + 1e-6
+    scores = quantizer.score(codes, scales, reduced[0])
+    np.testing.assert_allclose(scores, reduced @ reduced[0], atol=0.02)
+    assert quantizer.bytes_per_vector() == DIM + 4
+    assert EmbeddingQuantizer(DIM, dtype="float16", dim=32).bytes_per_vector() == 64
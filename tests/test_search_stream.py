@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import fakeredis
+import httpx
+import pytest
+
+import main
+from cache_service import CacheService
+from config import settings
+from models import SearchFilters
+from rag_service import AnswerFieldExtractor, RAGService
+from search_service import SearchService
+
+from helpers import load_script, serve
+
+CONTRACTORS = [
+    {"id": "11111111-1111-1111-1111-111111111111", "name": "Acme Plumbing", "city": "Toronto", "rating": 4.8},
+    {"id": "22222222-2222-2222-2222-222222222222", "name": "Bright Spark Electric", "city": "Toronto", "rating": 4.5},
+]
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    with serve(load_script("openai_stub").app) as url:
+        yield f"{url}/v1"
+
+
+def _parse_sse(body: str):
+    events = []
+    for frame in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_answer_field_extractor_yields_only_the_answer():
+    extractor = AnswerFieldExtractor()
+    document = '{"key_insights": ["answer: no"], "answer": "Use \\"Acme\\"\\nfirst \\u00e9", "sources": ["x"]}'
+    pieces = [extractor.feed(document[i:i + 3]) for i in range(0, len(document), 3)]
+
+    assert "".join(pieces) == 'Use "Acme"\nfirst é'
+    assert extractor.text == 'Use "Acme"\nfirst é'
+    assert extractor.feed('"more": "text"') == ""
+
+
+def test_search_stream_against_openai_stub(stub_url, monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "stub")
+    monkeypatch.setattr(settings, "openai_base_url", stub_url)
+
+    async def scenario():
+        cache = CacheService(client=fakeredis.aioredis.FakeRedis())
+        await cache.connect()
+
+        # Retrieval runs against Postgres; the LLM and cache paths are what is under test
+        service = SearchService.__new__(SearchService)
+        service.rag = RAGService()
+        service.cache = cache
+        service.semantic_cache = None
+
+        async def retrieve(params, filters):
+            return [dict(contractor) for contractor in CONTRACTORS]
+
+        service._retrieve = retrieve
+
+        previous, main.search_service = main.search_service, service
+        try:
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.get("/search/stream", params={"q": "plumber"})
+            key = await cache.rag_key("plumber", SearchFilters().cache_key())
+            cached = await cache.get_fresh(key)
+        finally:
+            main.search_service = previous
+            await cache.disconnect()
+        return response, cached
+
+    response, cached = asyncio.run(scenario())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(response.text)
+    names = [event for event, _ in events]
+
+    assert names[0] == "contractors"
+    assert names[-1] == "done"
+    assert set(names[1:-1]) == {"token"}
+    assert len(names) > 3  # the stub streams the answer a few characters at a time
+
+    contractors = events[0][1]
+    assert [c["name"] for c in contractors["contractors"]] == ["Acme Plumbing", "Bright Spark Electric"]
+    assert contractors["total_count"] == 2
+
+    done = events[-1][1]
+    answer = "".join(data["text"] for event, data in events if event == "token")
+    assert answer == done["answer"]
+    assert answer.startswith('For "plumber", the best matches are Acme Plumbing')
+    assert "{" not in answer and "key_insights" not in answer
+    assert done["sources"] == ["Acme Plumbing", "Bright Spark Electric"]
+
+    # Written to the RAG cache once the stream finished
+    assert cached is not None
+    value, fresh = cached
+    assert fresh
+    assert value["rag_result"]["answer"] == answer
+    assert [c["name"] for c in value["contractors"]] == ["Acme Plumbing", "Bright Spark Electric"]
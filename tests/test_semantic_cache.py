@@ -0,0 +1,46 @@
+import numpy as np
+
+from semantic_cache import SemanticAnswerCache
+
+
+def _vector(seed, dim=8):
+    return np.random.default_rng(seed).standard_normal(dim)
+
+
+def test_lookup_is_scoped():
+    cache = SemanticAnswerCache(dim=8, max_entries=4)
+    cache.put(_vector(0), {"answer": "a"}, scope="toronto")
+
+    entry, similarity = cache.lookup(_vector(0), scope="toronto")
+    assert entry["answer"] == "a"
+    assert similarity > 0.99
+    assert cache.lookup(_vector(0), scope="ottawa") is None
+
+
+def test_scope_ids_are_released_with_their_last_entry():
+    cache = SemanticAnswerCache(dim=8, max_entries=4)
+    for i in range(100):
+        cache.put(_vector(i), {"answer": str(i)}, scope=f"lat={i}", contractor_ids=[str(i)])
+        assert len(cache._scope_ids) <= 4
+
+    assert set(cache._scope_ids) == {f"lat={i}" for i in range(96, 100)}
+    assert cache.lookup(_vector(99), scope="lat=99")[0]["answer"] == "99"
+
+    cache.invalidate_contractor("99")
+    assert "lat=99" not in cache._scope_ids
+    assert cache.lookup(_vector(99), scope="lat=99") is None
+
+    cache.clear()
+    assert cache._scope_ids == {}
+    assert cache._scope_refs == {}
+
+
+def test_shared_scope_survives_until_last_entry_is_dropped():
+    cache = SemanticAnswerCache(dim=8, max_entries=4)
+    cache.put(_vector(1), {"answer": "1"}, scope="s", contractor_ids=["1"])
+    cache.put(_vector(2), {"answer": "2"}, scope="s", contractor_ids=["2"])
+
+    cache.invalidate_contractor("1")
+    assert cache.lookup(_vector(2), scope="s")[0]["answer"] == "2"
+    cache.invalidate_contractor("2")
+    assert "s" not in cache._scope_ids
@@ -0,0 +1,99 @@
+import uuid
+
+import numpy as np
+
+from quantization import l2_normalize
+from vector_index import VectorIndex
+
+
+def _matrix(n=300, dim=16, seed=0):
+    return l2_normalize(np.random.default_rng(seed).standard_normal((n, dim)))
+
+
+def _exact(vectors, query, k):
+    scores = vectors @ (query / np.linalg.norm(query))
+    return list(np.argsort(-scores)[:k])
+
+
+def test_search_returns_exact_top_k():
+    vectors = _matrix()
+    index = VectorIndex(dim=16, ivf_min_size=10**6)
+    index.build([str(i) for i in range(len(vectors))], vectors)
+
+    query = vectors[7] + 0.1 * vectors[8]
+    hits = index.search(query, k=5)
+
+    assert [int(item_id) for item_id, _ in hits] == _exact(vectors, query, 5)
+    assert hits[0][1] >= hits[-1][1]
+
+
+def test_add_replaces_and_remove_keeps_matrix_dense():
+    vectors = _matrix(n=10)
+    index = VectorIndex(dim=16, ivf_min_size=10**6)
+    for i, vector in enumerate(vectors):
+        index.add(f"c{i}", vector)
+    assert index.size == 10
+
+    # Replacing keeps one row per id
+    index.add("c3", vectors[9])
+    assert index.size == 10
+    assert {item_id for item_id, _ in index.search(vectors[9], k=2)} == {"c3", "c9"}
+
+    assert index.remove("c0")
+    assert not index.remove("c0")
+    assert index.size == 9
+    assert "c0" not in index
+    # The last row moved into the freed slot and is still found by id
+    [(item_id, score)] = index.search(vectors[9], k=2, allowed_ids=["c9"])
+    assert item_id == "c9" and score > 0.99
+    assert all(item_id != "c0" for item_id, _ in index.search(vectors[0], k=9))
+
+
+def test_allowed_ids_restrict_the_search():
+    vectors = _matrix()
+    index = VectorIndex(dim=16, ivf_min_size=10**6)
+    index.build([str(i) for i in range(len(vectors))], vectors)
+
+    allowed = [str(i) for i in range(0, 300, 3)] + ["not-indexed"]
+    hits = index.search(vectors[1], k=5, allowed_ids=allowed)
+
+    assert len(hits) == 5
+    assert all(int(item_id) % 3 == 0 for item_id, _ in hits)
+    expected = [i for i in _exact(vectors, vectors[1], 300) if i % 3 == 0][:5]
+    assert [int(item_id) for item_id, _ in hits] == expected
+    assert index.search(vectors[1], k=5, allowed_ids=["not-indexed"]) == []
+
+
+def test_uuid_and_string_ids_address_the_same_vector():
+    vectors = _matrix(n=3)
+    ids = [uuid.uuid4() for _ in range(3)]
+    index = VectorIndex(dim=16, ivf_min_size=10**6)
+    index.build(ids, vectors)
+
+    # Ids come back as strings, whatever type they were added with
+    [(hit_id, _)] = index.search(vectors[1], k=1)
+    assert hit_id == str(ids[1])
+    assert ids[1] in index and str(ids[1]) in index
+
+    index.add(str(ids[1]), vectors[0])
+    assert index.size == 3
+    assert index.search(vectors[0], k=1, allowed_ids=[ids[1]])[0][0] == str(ids[1])
+
+    assert index.remove(ids[1])
+    assert str(ids[1]) not in index
+
+
+def test_ivf_with_every_cell_probed_matches_exact_search():
+    vectors = _matrix(n=400)
+    index = VectorIndex(dim=16, nlist=8, nprobe=8, ivf_min_size=100)
+    index.build([str(i) for i in range(len(vectors))], vectors)
+    assert index.is_ivf
+
+    for q in range(10):
+        hits = index.search(vectors[q], k=10)
+        assert [int(item_id) for item_id, _ in hits] == _exact(vectors, vectors[q], 10)
+
+    # Updates keep the cells consistent
+    index.remove("0")
+    index.add("new", vectors[0])
+    assert index.search(vectors[0], k=1)[0][0] == "new"
@@ -0,0 +1,257 @@
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from quantization import EmbeddingQuantizer, l2_normalize
+
+logger = logging.getLogger(__name__)
+
+
+class VectorIndex:
+    """In-process cosine-similarity index over contractor embeddings.
+
+    Vectors are kept L2-normalized in one contiguous matrix, so a
+    matrix-vector product gives cosine similarity for every row at once.
+    The matrix holds whatever the quantizer produces (float32 by default,
+    or float16/int8 codes, optionally with fewer dimensions). Once the index
+    is large enough it is partitioned into IVF cells with a few rounds of
+    k-means and queries only scan the closest ``nprobe`` cells.
+
+    Ids are stored as strings, so UUIDs from the database and ids passed as
+    text address the same vector.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        nlist: int = 0,
+        nprobe: int = 8,
+        ivf_min_size: int = 50000,
+        quantizer: Optional[EmbeddingQuantizer] = None
+    ):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.ivf_min_size = ivf_min_size
+        self.quantizer = quantizer or EmbeddingQuantizer(dim)
+
+        self._size = 0
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._allocate(1024)
+
+        # IVF state, only populated once the index has been trained
+        self._centroids: Optional[np.ndarray] = None
+        self._cells: List[List[int]] = []
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def is_ivf(self) -> bool:
+        return self._centroids is not None
+
+    @property
+    def is_lossy(self) -> bool:
+        return self.quantizer.is_lossy
+
+    def __contains__(self, item_id: Any) -> bool:
+        return str(item_id) in self._rows
+
+    def memory_bytes(self) -> int:
+        scales = self._scales[:self._size].nbytes if self._scales is not None else 0
+        return self._codes[:self._size].nbytes + scales
+
+    def _allocate(self, capacity: int):
+        q = self.quantizer
+        self._codes = np.zeros((capacity, q.dim), dtype=q.code_dtype)
+        self._scales = np.ones(capacity, dtype=np.float32) if q.dtype == "int8" else None
+        self._cell_of_row = np.zeros(capacity, dtype=np.int32)
+
+    def _reserve(self, capacity: int):
+        if capacity <= self._codes.shape[0]:
+            return
+        codes, scales, cells = self._codes, self._scales, self._cell_of_row
+        self._allocate(max(capacity, codes.shape[0] * 2))
+        self._codes[:self._size] = codes[:self._size]
+        if scales is not None:
+            self._scales[:self._size] = scales[:self._size]
+        self._cell_of_row[:self._size] = cells[:self._size]
+
+    def _store(self, rows, reduced: np.ndarray):
+        codes, scales = self.quantizer.quantize(reduced)
+        self._codes[rows] = codes
+        if scales is not None:
+            self._scales[rows] = scales
+
+    def _decoded(self, rows) -> np.ndarray:
+        scales = self._scales[rows] if self._scales is not None else None
+        return self.quantizer.decode(self._codes[rows], scales)
+
+    def build(self, ids: List[Any], vectors: Iterable[List[float]]):
+        """Replace the index contents and retrain the IVF partitions."""
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        self.quantizer.fit(matrix)
+
+        self._allocate(max(len(ids), 1024))
+        self._size = len(ids)
+        self._ids = [str(item_id) for item_id in ids]
+        self._rows = {item_id: row for row, item_id in enumerate(self._ids)}
+        self._centroids = None
+        self._cells = []
+
+        chunk = 65536
+        for start in range(0, self._size, chunk):
+            block = self.quantizer.reduce(matrix[start:start + chunk])
+            self._store(slice(start, start + len(block)), block)
+
+        if self._size >= self.ivf_min_size:
+            self.train()
+
+        logger.info(
+            f"Built vector index with {self._size} vectors "
+            f"(ivf={self.is_ivf}, dtype={self.quantizer.dtype}, dim={self.quantizer.dim}, bytes={self.memory_bytes()})"
+        )
+
+    def train(self, iterations: int = 10, seed: int = 0):
+        """Cluster the current vectors into ``nlist`` cells with spherical k-means."""
+        if self._size == 0:
+            return
+
+        nlist = self.nlist or int(np.sqrt(self._size))
+        nlist = max(1, min(nlist, self._size))
+
+        rng = np.random.default_rng(seed)
+        sample_size = min(self._size, nlist * 64)
+        sample = l2_normalize(self._decoded(np.sort(rng.choice(self._size, size=sample_size, replace=False))))
+        centroids = sample[rng.choice(sample_size, size=nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            for cell in range(nlist):
+                members = sample[assignments == cell]
+                if len(members):
+                    centroids[cell] = members.sum(axis=0)
+            centroids = l2_normalize(centroids)
+
+        self._centroids = centroids
+        self._cells = [[] for _ in range(nlist)]
+
+        chunk = 65536
+        for start in range(0, self._size, chunk):
+            block = self._decoded(slice(start, min(start + chunk, self._size)))
+            assignments = np.argmax(block @ centroids.T, axis=1).astype(np.int32)
+            self._cell_of_row[start:start + len(block)] = assignments
+            for offset, cell in enumerate(assignments.tolist()):
+                self._cells[cell].append(start + offset)
+
+    def _assign(self, row: int, reduced: np.ndarray):
+        if self._centroids is None:
+            return
+        cell = int(np.argmax(self._centroids @ reduced))
+        self._cell_of_row[row] = cell
+        self._cells[cell].append(row)
+
+    def _unassign(self, row: int):
+        if self._centroids is None:
+            return
+        self._cells[self._cell_of_row[row]].remove(row)
+
+    def add(self, item_id: Any, vector: List[float]):
+        """Insert or replace a single vector."""
+        item_id = str(item_id)
+        reduced = self.quantizer.reduce(np.asarray(vector, dtype=np.float32).reshape(self.dim))
+
+        row = self._rows.get(item_id)
+        if row is not None:
+            self._unassign(row)
+            self._store(row, reduced)
+            self._assign(row, reduced)
+            return
+
+        self._reserve(self._size + 1)
+        row = self._size
+        self._store(row, reduced)
+        self._ids.append(item_id)
+        self._rows[item_id] = row
+        self._size += 1
+        self._assign(row, reduced)
+
+        if self._centroids is None and self._size >= self.ivf_min_size:
+            self.train()
+
+    def remove(self, item_id: Any) -> bool:
+        row = self._rows.pop(str(item_id), None)
+        if row is None:
+            return False
+
+        self._unassign(row)
+        last = self._size - 1
+        if row != last:
+            # Move the last vector into the freed slot to keep the matrix dense
+            last_id = self._ids[last]
+            if self._centroids is not None:
+                cell = self._cells[self._cell_of_row[last]]
+                cell[cell.index(last)] = row
+                self._cell_of_row[row] = self._cell_of_row[last]
+            self._codes[row] = self._codes[last]
+            if self._scales is not None:
+                self._scales[row] = self._scales[last]
+            self._ids[row] = last_id
+            self._rows[last_id] = row
+
+        self._ids.pop()
+        self._size -= 1
+        return True
+
+    def _candidate_rows(self, query: np.ndarray, nprobe: int) -> Optional[np.ndarray]:
+        if self._centroids is None:
+            return None
+
+        nprobe = max(1, min(nprobe, len(self._cells)))
+        closest = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+        rows = [np.asarray(self._cells[cell], dtype=np.int64) for cell in closest]
+        return np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+
+    def search(
+        self,
+        query: List[float],
+        k: int = 10,
+        nprobe: Optional[int] = None,
+        allowed_ids: Optional[Iterable[Any]] = None
+    ) -> List[Tuple[str, float]]:
+        """Return up to ``k`` ``(id, cosine_similarity)`` pairs, best first.
+
+        Scores are computed on the stored codes, so they are approximate
+        when the quantizer is lossy. ``allowed_ids`` restricts the search to
+        a pre-filtered set, which is scanned exactly instead of via IVF.
+        """
+        if self._size == 0 or k <= 0:
+            return []
+
+        query_vec = self.quantizer.reduce(np.asarray(query, dtype=np.float32).reshape(self.dim))
+        if allowed_ids is not None:
+            rows = np.fromiter(
+                (self._rows[item_id] for item_id in map(str, allowed_ids) if item_id in self._rows),
+                dtype=np.int64
+            )
+        else:
+            rows = self._candidate_rows(query_vec, nprobe or self.nprobe)
+
+        if rows is None:
+            scales = self._scales[:self._size] if self._scales is not None else None
+            scores = self.quantizer.score(self._codes[:self._size], scales, query_vec)
+        else:
+            if len(rows) == 0:
+                return []
+            scales = self._scales[rows] if self._scales is not None else None
+            scores = self.quantizer.score(self._codes[rows], scales, query_vec)
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        if rows is not None:
+            return [(self._ids[rows[i]], float(scores[i])) for i in top]
+        return [(self._ids[i], float(scores[i])) for i in top]